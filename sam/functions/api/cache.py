@@ -0,0 +1,211 @@
+"""
+インメモリ読み取りキャッシュ
+ウォームコンテナ間で再利用される LRU + TTL キャッシュ
+"""
+
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+def stamp_slot(key, slots):
+    """
+    キーが属するバージョンスタンプのスロット番号を取得
+
+    Processor Lambda と同じハッシュ関数を使うこと。
+    """
+    return zlib.crc32(key.encode('utf-8')) % slots
+
+
+class TTLCache:
+    """
+    LRU + TTL キャッシュ
+
+    値が None のエントリはネガティブキャッシュ（404）として扱い、
+    negative_ttl で別に有効期限を設定できる。
+
+    Args:
+        max_size: 最大エントリ数（0 でキャッシュ無効）
+        ttl: 通常エントリの有効期限（秒）
+        negative_ttl: ネガティブエントリの有効期限（秒）
+        stamp_slots: バージョンスタンプのスロット数
+        stamp_skew: スタンプと取得時刻の比較に使う許容誤差（秒）
+    """
+
+    def __init__(self, max_size, ttl, negative_ttl, stamp_slots=256, stamp_skew=1.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stamp_slots = stamp_slots
+        self.stamp_skew = stamp_skew
+
+        # key -> (value, expires_at(monotonic), fetched_at(wall clock))
+        self._entries = OrderedDict()
+        self._stamps = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """
+        キャッシュを参照
+
+        Returns:
+            tuple: (ヒットしたか, 値) - ネガティブヒットの場合は (True, None)
+        """
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            if value is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, value
+
+    def put(self, key, value):
+        """値を登録（None はネガティブエントリ）"""
+        if not self.enabled:
+            return
+
+        ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """エントリを削除"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """全エントリを削除"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def apply_stamps(self, stamps):
+        """
+        バージョンスタンプを反映し、古くなったエントリを削除
+
+        Args:
+            stamps: {スロット番号: そのスロットの最終変更時刻(UNIX秒)}
+
+        Returns:
+            int: 削除したエントリ数
+        """
+        with self._lock:
+            changed = {
+                slot: stamp for slot, stamp in stamps.items()
+                if self._stamps.get(slot) != stamp
+            }
+            self._stamps = dict(stamps)
+            if not changed:
+                return 0
+
+            stale = [
+                key for key, (_, _, fetched_at) in self._entries.items()
+                if changed.get(stamp_slot(key, self.stamp_slots), float('-inf')) >= fetched_at - self.stamp_skew
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def stats(self):
+        """ヒット/ミスなどのカウンター"""
+        with self._lock:
+            return self._stats()
+
+    def drain_stats(self):
+        """カウンターを取得して0に戻す（前回の取得以降の増分を得る）"""
+        with self._lock:
+            stats = self._stats()
+            self.hits = 0
+            self.negative_hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+            return stats
+
+    def _stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations
+        }
+
+
+# EMF のメトリクス名 -> stats() のキー
+_CACHE_METRICS = (
+    ('CacheHits', 'hits'),
+    ('CacheNegativeHits', 'negative_hits'),
+    ('CacheMisses', 'misses'),
+    ('CacheEvictions', 'evictions'),
+    ('CacheExpirations', 'expirations'),
+    ('CacheInvalidations', 'invalidations'),
+    ('CacheSize', 'size')
+)
+
+
+def emf_cache_writer(namespace, dimensions, writer=print):
+    """
+    キャッシュのカウンターを Embedded Metric Format で出力するコールバックを作成
+
+    drain_stats() の結果（前回出力以降の増分）を Cache* メトリクスとして
+    ディメンション（dimensions）付きで出力する。CacheSize は出力時点のエントリ数。
+    ヒット率は CloudWatch のメトリクス演算で CacheHits / (CacheHits + CacheMisses) として求める。
+    """
+    def on_stats(stats):
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': namespace,
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': 'Count'} for name, _ in _CACHE_METRICS]
+                }]
+            },
+            **dimensions,
+            **{name: stats[key] for name, key in _CACHE_METRICS}
+        }
+        writer(json.dumps(document))
+
+    return on_stats
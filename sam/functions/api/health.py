@@ -0,0 +1,123 @@
+"""
+ヘルスチェック
+依存サービスのプローブ結果をウォームコンテナ内で TTL 付きでキャッシュする
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class DependencyProbe:
+    """
+    1つの依存サービスに対するプローブ
+
+    check の実行結果（成功・失敗とレイテンシ）を保持し、ttl（失敗時は failure_ttl）の間は
+    再実行せずに返す。ロードバランサーや外形監視が高頻度でポーリングしても、
+    依存サービスへのリクエストはコンテナあたり TTL ごとに1回になる。
+
+    Args:
+        name: 依存サービス名（レスポンスとメトリクスのディメンションに使う）
+        check: 依存サービスに軽いリクエストを送る関数（失敗時は例外を送出）
+        ttl: 成功結果のキャッシュ期間（秒）
+        failure_ttl: 失敗結果のキャッシュ期間（秒）
+    """
+
+    def __init__(self, name, check, ttl=10.0, failure_ttl=2.0):
+        self.name = name
+        self.check = check
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+
+        self._result = None
+        self._expires_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def run(self, on_probe=None):
+        """
+        キャッシュが有効ならその結果を、切れていればプローブを実行して結果を返す
+
+        Args:
+            on_probe: プローブを実際に実行したときに結果を渡すコールバック
+
+        Returns:
+            dict: {'status', 'latency_ms', 'checked_at', 'cached'(, 'error')}
+        """
+        with self._lock:
+            if time.monotonic() < self._expires_at:
+                return dict(self._result, cached=True)
+
+            started_at = time.perf_counter()
+            try:
+                self.check()
+                result = {'status': 'healthy'}
+                ttl = self.ttl
+            except Exception as e:
+                result = {'status': 'unhealthy', 'error': f'{type(e).__name__}: {e}'}
+                ttl = self.failure_ttl
+
+            result['latency_ms'] = round((time.perf_counter() - started_at) * 1000, 2)
+            result['checked_at'] = datetime.now(timezone.utc).isoformat()
+
+            self._result = result
+            self._expires_at = time.monotonic() + ttl
+
+        if on_probe is not None:
+            on_probe(self.name, result)
+        return dict(result, cached=False)
+
+
+class HealthChecker:
+    """
+    依存サービスのプローブの集合
+
+    Args:
+        probes: DependencyProbe のリスト
+        on_probe: プローブを実際に実行したときのコールバック（メトリクス出力など）
+    """
+
+    def __init__(self, probes, on_probe=None):
+        self.probes = list(probes)
+        self.on_probe = on_probe
+
+    def check(self):
+        """
+        全プローブを実行（キャッシュが有効なものは再実行しない）
+
+        Returns:
+            tuple: (全依存サービスが healthy か, {依存サービス名: 結果})
+        """
+        results = {probe.name: probe.run(self.on_probe) for probe in self.probes}
+        healthy = all(result['status'] == 'healthy' for result in results.values())
+        return healthy, results
+
+
+def emf_probe_writer(namespace, dimensions, writer=print):
+    """
+    プローブ結果を Embedded Metric Format で出力するコールバックを作成
+
+    DependencyLatency（ミリ秒）と DependencyErrors（0 / 1）を
+    ディメンション（dimensions + Dependency）付きで出力する。
+    """
+    def on_probe(name, result):
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': namespace,
+                    'Dimensions': [list(dimensions) + ['Dependency']],
+                    'Metrics': [
+                        {'Name': 'DependencyLatency', 'Unit': 'Milliseconds'},
+                        {'Name': 'DependencyErrors', 'Unit': 'Count'}
+                    ]
+                }]
+            },
+            **dimensions,
+            'Dependency': name,
+            'DependencyLatency': result['latency_ms'],
+            'DependencyErrors': 0 if result['status'] == 'healthy' else 1
+        }
+        writer(json.dumps(document))
+
+    return on_probe
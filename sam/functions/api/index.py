@@ -5,107 +5,1294 @@ REST API エンドポイントハンドラー
 
 import json
 import os
-import logging
+import base64
+import hashlib
+import heapq
+import hmac
+import random
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
-import boto3
-from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 import traceback
 
+import aws_clients
+from cache import TTLCache, emf_cache_writer
+from ddb_json import deserialize_item, deserialize_items, serialize_item
+from health import DependencyProbe, HealthChecker, emf_probe_writer
+from search_index import POSTING_SK_PREFIX, SEARCH_PK_PREFIX, WEIGHT_ATTRIBUTE, posting_key, query_terms, term_score
+from serialization import get_serializer
+from sharding import SHARD_ATTRIBUTE, shard_for, shard_key, shard_keys
+from structured_logging import begin_invocation, configure_logging, end_invocation, payload
+from tracing import begin_timings, bind, end_timings, server_timing_header, span
+
 # ========================================
 # ロガー設定
 # ========================================
 
-logger = logging.getLogger()
-log_level = os.environ.get('LOG_LEVEL', 'INFO')
-logger.setLevel(log_level)
+# JSON 形式で出力（LOG_FORMAT / LOG_SAMPLE_RATES などは structured_logging を参照）
+logger = configure_logging()
+
+# X-Debug-Log: 1 ヘッダーのリクエストを DEBUG に昇格させるか（イベント全体がログに出るため既定は無効）
+LOG_DEBUG_HEADER_ENABLED = os.environ.get('LOG_DEBUG_HEADER_ENABLED', 'false').lower() == 'true'
 
 # ========================================
 # AWS クライアント
 # ========================================
 
-dynamodb = boto3.resource('dynamodb')
+# クライアントは初回利用時に生成する（/health などでは生成しない）
 table_name = os.environ.get('DYNAMODB_TABLE')
-table = dynamodb.Table(table_name)
+
+
+def get_table():
+    """DynamoDB テーブルリソースを取得"""
+    return aws_clients.get_table(table_name)
+
+
+def get_dynamodb():
+    """DynamoDB サービスリソースを取得"""
+    return aws_clients.get_resource('dynamodb')
+
+
+def get_dynamodb_client():
+    """DynamoDB 低レベルクライアントを取得"""
+    return aws_clients.get_client('dynamodb')
+
+
+# ========================================
+# データアクセス層
+# ========================================
+
+# true: 低レベルクライアントを使い、ワイヤー形式を JSON 互換の型（int/float など）に直接変換
+# false: boto3 Table リソースを使う（数値は Decimal、レスポンス生成時に int/float へ変換）
+USE_LOW_LEVEL_CLIENT = os.environ.get('DYNAMODB_LOW_LEVEL_CLIENT', 'true').lower() == 'true'
+
+# ワイヤー形式への変換が必要なリクエストパラメータ
+_ATTRIBUTE_MAP_PARAMS = ('Key', 'Item', 'ExclusiveStartKey', 'ExpressionAttributeValues')
+
+# Python 型への変換が必要なレスポンスの要素
+_ATTRIBUTE_MAP_RESULTS = ('Item', 'Attributes', 'LastEvaluatedKey')
+
+
+def table_request(operation, **params):
+    """
+    テーブルに対する DynamoDB 操作を実行
+
+    パラメータ・結果とも Python の値で扱い、使用する経路（低レベルクライアント /
+    Table リソース）の違いを吸収する。式は文字列で指定すること。
+
+    Args:
+        operation: 'get_item' / 'query' / 'put_item' / 'update_item' / 'delete_item'
+        params: 操作のパラメータ（TableName は不要）
+
+    Returns:
+        dict: レスポンス（Item / Items / Attributes / LastEvaluatedKey は Python の値）
+    """
+    if not USE_LOW_LEVEL_CLIENT:
+        with span(f'dynamodb.{operation}', index=params.get('IndexName', 'table')):
+            return getattr(get_table(), operation)(**params)
+
+    request = {'TableName': table_name}
+    for name, value in params.items():
+        request[name] = serialize_item(value) if name in _ATTRIBUTE_MAP_PARAMS else value
+
+    with span(f'dynamodb.{operation}', index=params.get('IndexName', 'table')):
+        response = getattr(get_dynamodb_client(), operation)(**request)
+
+    for name in _ATTRIBUTE_MAP_RESULTS:
+        if name in response:
+            response[name] = deserialize_item(response[name])
+    if 'Items' in response:
+        response['Items'] = deserialize_items(response['Items'])
+
+    return response
+
+
+def batch_get_request(keys):
+    """
+    BatchGetItem を1回実行
+
+    Returns:
+        tuple: (取得したアイテムのリスト, 未処理のキーのリスト)
+    """
+    if not USE_LOW_LEVEL_CLIENT:
+        with span('dynamodb.batch_get_item', keys=len(keys)):
+            response = get_dynamodb().batch_get_item(RequestItems={table_name: {'Keys': keys}})
+        return (
+            response.get('Responses', {}).get(table_name, []),
+            response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+        )
+
+    wire_keys = [serialize_item(key) for key in keys]
+    with span('dynamodb.batch_get_item', keys=len(keys)):
+        response = get_dynamodb_client().batch_get_item(RequestItems={table_name: {'Keys': wire_keys}})
+    return (
+        deserialize_items(response.get('Responses', {}).get(table_name, [])),
+        deserialize_items(response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', []))
+    )
+
+
+def batch_write_request(write_requests):
+    """
+    BatchWriteItem を1回実行
+
+    Returns:
+        list: 未処理のリクエスト（PutRequest / DeleteRequest）
+    """
+    if not USE_LOW_LEVEL_CLIENT:
+        with span('dynamodb.batch_write_item', requests=len(write_requests)):
+            response = get_dynamodb().batch_write_item(RequestItems={table_name: write_requests})
+        return response.get('UnprocessedItems', {}).get(table_name, [])
+
+    wire_requests = []
+    for request in write_requests:
+        if 'PutRequest' in request:
+            wire_requests.append({'PutRequest': {'Item': serialize_item(request['PutRequest']['Item'])}})
+        else:
+            wire_requests.append({'DeleteRequest': {'Key': serialize_item(request['DeleteRequest']['Key'])}})
+
+    with span('dynamodb.batch_write_item', requests=len(write_requests)):
+        response = get_dynamodb_client().batch_write_item(RequestItems={table_name: wire_requests})
+
+    unprocessed = []
+    for request in response.get('UnprocessedItems', {}).get(table_name, []):
+        if 'PutRequest' in request:
+            unprocessed.append({'PutRequest': {'Item': deserialize_item(request['PutRequest']['Item'])}})
+        else:
+            unprocessed.append({'DeleteRequest': {'Key': deserialize_item(request['DeleteRequest']['Key'])}})
+    return unprocessed
+
+
+# ========================================
+# ページネーション設定
+# ========================================
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 20))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+
+# カーソル署名用の秘密鍵（Terraform で生成した値を CursorSecret パラメータで渡す）
+# 推測できる値で署名すると改ざんを検出できないため、未設定ならコールドスタートで失敗させる
+cursor_secret = os.environ.get('CURSOR_SECRET', '')
+if not cursor_secret:
+    raise RuntimeError('CURSOR_SECRET is not configured')
+
+# ========================================
+# 一覧の書き込みシャーディング
+# ========================================
+
+# EntityShardIndex のシャード数（Item#0〜Item#<n-1>）
+# 既存アイテムは作成時のシャードに残るため、減らすと範囲外のシャードが一覧から外れる（増やす方向にのみ変更する）
+ITEM_SHARD_COUNT = max(1, int(os.environ.get('ITEM_SHARD_COUNT', 8)))
+
+# GET /items で全シャードを並列にクエリするスレッド数（ウォームコンテナ内で再利用）
+SHARD_QUERY_MAX_WORKERS = int(os.environ.get('SHARD_QUERY_MAX_WORKERS', 8))
+_shard_executor = None
+
+# カーソル内で読み終わったシャードを表す値
+SHARD_EXHAUSTED = 0
+
+# ========================================
+# 全文検索（GET /items/search）
+# ========================================
+
+# 1トークンあたりに読むポスティング数の上限（検索のレイテンシをポスティングリストの大きさで抑える）
+SEARCH_MAX_POSTINGS = int(os.environ.get('SEARCH_MAX_POSTINGS', 1000))
+# クエリから使うトークン数の上限
+SEARCH_MAX_QUERY_TERMS = int(os.environ.get('SEARCH_MAX_QUERY_TERMS', 16))
+SEARCH_MAX_QUERY_LENGTH = 200
+
+# ========================================
+# 条件付き GET
+# ========================================
+
+# GET /items, GET /items/{id} に付与する Cache-Control（no-cache: 再利用前に ETag で再検証させる）
+RESPONSE_CACHE_CONTROL = os.environ.get('RESPONSE_CACHE_CONTROL', 'no-cache')
+
+# ========================================
+# レスポンスの属性選択（fields）
+# ========================================
+
+# レスポンスから既定で除外する内部属性（fields で明示した場合のみ返す）
+INTERNAL_ATTRIBUTES = frozenset(('PK', 'SK', 'GSI1PK', 'GSI1SK', 'EntityStatus', SHARD_ATTRIBUTE))
+
+MAX_FIELDS = 50
+FIELD_NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# ========================================
+# バッチ操作設定
+# ========================================
+
+# DynamoDB の1リクエストあたりの上限
+BATCH_GET_CHUNK_SIZE = 100
+BATCH_WRITE_CHUNK_SIZE = 25
+
+# 1回のAPIリクエストで受け付ける最大件数
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 1000))
+
+# Unprocessed* の再試行（Full Jitter 指数バックオフ）
+BATCH_MAX_RETRIES = int(os.environ.get('BATCH_MAX_RETRIES', 5))
+BATCH_BACKOFF_BASE_SECONDS = 0.05
+BATCH_BACKOFF_MAX_SECONDS = 1.0
+
+# ========================================
+# 読み取りキャッシュ（ウォームコンテナ間で共有）
+# ========================================
+
+# Processor Lambda が MODIFY/REMOVE を検知したスロットの最終変更時刻を書き込むアイテム
+CACHE_STAMP_KEY = {'PK': 'SYSTEM#CACHE', 'SK': 'STAMPS'}
+CACHE_STAMP_REFRESH_SECONDS = float(os.environ.get('CACHE_STAMP_REFRESH_SECONDS', 1))
+
+item_cache = TTLCache(
+    max_size=int(os.environ.get('ITEM_CACHE_SIZE', 1000)),
+    ttl=float(os.environ.get('ITEM_CACHE_TTL_SECONDS', 30)),
+    negative_ttl=float(os.environ.get('ITEM_CACHE_NEGATIVE_TTL_SECONDS', 5)),
+    stamp_slots=int(os.environ.get('CACHE_STAMP_SLOTS', 256))
+)
+_cache_stamps_checked_at = float('-inf')
+
+# キャッシュのカウンターを EMF で出力する間隔（秒、コンテナごと。0 以下または名前空間が空で無効）
+CACHE_METRICS_INTERVAL_SECONDS = float(os.environ.get('CACHE_METRICS_INTERVAL_SECONDS', 60))
+CACHE_METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TerraformSAMDemo')
+
+cache_metrics_writer = emf_cache_writer(
+    CACHE_METRICS_NAMESPACE, {'Environment': os.environ.get('ENVIRONMENT', 'dev')}
+) if CACHE_METRICS_NAMESPACE and CACHE_METRICS_INTERVAL_SECONDS > 0 else None
+_cache_metrics_emitted_at = time.monotonic()
+
+# ========================================
+# レスポンスのシリアライズ
+# ========================================
+
+# auto: orjson がインストールされていれば使う / orjson / stdlib
+# 圧縮は API Gateway（MinimumCompressionSize）で行うため、ここではシリアライズのみ
+serializer_name, dumps_body = get_serializer(os.environ.get('RESPONSE_SERIALIZER', 'auto'))
+
+# ========================================
+# トレーシング
+# ========================================
+
+# DynamoDB 呼び出し・シリアライズ・ルートごとの所要時間を Server-Timing ヘッダーで返すか
+# （X-Ray のサブセグメントは TRACING_ENABLED で制御。tracing を参照）
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+
+# ========================================
+# ヘルスチェック
+# ========================================
+
+# GET /health?mode=deep のプローブ結果のキャッシュ期間（秒）
+HEALTH_CHECK_TTL_SECONDS = float(os.environ.get('HEALTH_CHECK_TTL_SECONDS', 10))
+HEALTH_CHECK_FAILURE_TTL_SECONDS = float(os.environ.get('HEALTH_CHECK_FAILURE_TTL_SECONDS', 2))
+
+# CloudWatch へのプローブを含めるか（cloudwatch:ListMetrics 権限が必要）
+HEALTH_CHECK_CLOUDWATCH = os.environ.get('HEALTH_CHECK_CLOUDWATCH', 'false').lower() == 'true'
+
+# プローブのレイテンシ・失敗を EMF で出力するメトリクス名前空間（空文字で無効）
+HEALTH_METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TerraformSAMDemo')
+
+
+def probe_dynamodb():
+    """データプレーンの軽い読み取り（存在しなくてもよい内部アイテムを PK だけ射影して GetItem）"""
+    table_request('get_item', Key=CACHE_STAMP_KEY, ProjectionExpression='PK')
+
+
+def probe_cloudwatch():
+    """CloudWatch への軽いリクエスト（プローブ自身のメトリクスを1ページだけ一覧）"""
+    with span('cloudwatch.list_metrics'):
+        aws_clients.get_client('cloudwatch').list_metrics(
+            Namespace=HEALTH_METRICS_NAMESPACE or 'TerraformSAMDemo',
+            MetricName='DependencyLatency'
+        )
+
+
+health_probes = [
+    DependencyProbe('dynamodb', probe_dynamodb, HEALTH_CHECK_TTL_SECONDS, HEALTH_CHECK_FAILURE_TTL_SECONDS)
+]
+if HEALTH_CHECK_CLOUDWATCH:
+    health_probes.append(
+        DependencyProbe('cloudwatch', probe_cloudwatch, HEALTH_CHECK_TTL_SECONDS, HEALTH_CHECK_FAILURE_TTL_SECONDS)
+    )
+
+health_checker = HealthChecker(
+    health_probes,
+    on_probe=emf_probe_writer(
+        HEALTH_METRICS_NAMESPACE, {'Environment': os.environ.get('ENVIRONMENT', 'dev')}
+    ) if HEALTH_METRICS_NAMESPACE else None
+)
 
 # ========================================
 # ヘルパー関数
 # ========================================
 
-class DecimalEncoder(json.JSONEncoder):
-    """DynamoDB Decimal型をJSONシリアライズ可能にする"""
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super(DecimalEncoder, self).default(obj)
+def create_response(status_code, body, headers=None):
+    """
+    API Gateway レスポンスを作成
+
+    Args:
+        status_code: HTTPステータスコード
+        body: レスポンスボディ（dict、None の場合は空）
+        headers: 追加ヘッダー（dict）
+
+    Returns:
+        dict: API Gateway レスポンス形式
+    """
+    default_headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,If-Match,If-None-Match',
+        'Access-Control-Expose-Headers': 'ETag,X-Cache',
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
+    }
+
+    if headers:
+        default_headers.update(headers)
+
+    if body is None:
+        serialized = ''
+    else:
+        with span('serialize'):
+            serialized = dumps_body(body)
+
+    return {
+        'statusCode': status_code,
+        'headers': default_headers,
+        'body': serialized
+    }
+
+
+def get_request_body(event):
+    """リクエストボディを取得（base64 エンコードされている場合はデコード）"""
+    body = event.get('body')
+    if body is not None and event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+    return body
+
+
+def add_server_timing(response):
+    """収集したスパンを Server-Timing ヘッダーとしてレスポンスに付ける（無効時はそのまま返す）"""
+    header = server_timing_header()
+    if header is None:
+        return response
+
+    headers = response['headers']
+    headers['Server-Timing'] = header
+    headers['Timing-Allow-Origin'] = '*'
+    headers['Access-Control-Expose-Headers'] += ',Server-Timing'
+    return response
+
+
+def get_current_timestamp():
+    """現在のUNIXタイムスタンプを取得"""
+    return int(datetime.utcnow().timestamp())
+
+
+class InvalidCursorError(ValueError):
+    """カーソルが不正（改ざん・形式不正・クエリ条件の不一致）"""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(payload):
+    return hmac.new(cursor_secret.encode('utf-8'), payload, hashlib.sha256).digest()
+
+
+def _encode_key(key):
+    """キーを数値の精度を失わないワイヤー形式（{'N': '...'} / {'S': '...'}）に変換"""
+    encoded = {}
+    for name, value in key.items():
+        if isinstance(value, (Decimal, int)):
+            encoded[name] = {'N': str(value)}
+        else:
+            encoded[name] = {'S': value}
+    return encoded
+
+
+def _decode_key(encoded):
+    key = {}
+    for name, value in encoded.items():
+        if 'N' in value:
+            key[name] = Decimal(value['N'])
+        else:
+            key[name] = value['S']
+    return key
+
+
+def _pack_cursor(data, query_fingerprint):
+    payload = json.dumps(
+        dict(data, q=query_fingerprint),
+        separators=(',', ':'),
+        sort_keys=True
+    ).encode('utf-8')
+
+    return f'{_b64encode(payload)}.{_b64encode(_sign(payload))}'
+
+
+def _unpack_cursor(cursor, query_fingerprint):
+    try:
+        encoded_payload, encoded_signature = cursor.split('.', 1)
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except (ValueError, TypeError):
+        raise InvalidCursorError('Malformed cursor')
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidCursorError('Cursor signature mismatch')
+
+    data = json.loads(payload)
+    if data.get('q') != query_fingerprint:
+        raise InvalidCursorError('Cursor does not match query parameters')
+    return data
+
+
+def encode_cursor(last_evaluated_key, query_fingerprint):
+    """
+    LastEvaluatedKey を署名付きの不透明なカーソル文字列に変換
+
+    数値は精度を失わないよう DynamoDB のワイヤー形式（{'N': '...'}）で保持する。
+
+    Args:
+        last_evaluated_key: DynamoDB の LastEvaluatedKey
+        query_fingerprint: カーソルを発行したクエリ条件（別条件での再利用を防ぐ）
+
+    Returns:
+        str: next_cursor として返す文字列
+    """
+    return _pack_cursor({'k': _encode_key(last_evaluated_key)}, query_fingerprint)
+
+
+def decode_cursor(cursor, query_fingerprint):
+    """
+    カーソル文字列を検証して ExclusiveStartKey に戻す
+
+    Args:
+        cursor: クライアントから受け取ったカーソル
+        query_fingerprint: 現在のクエリ条件
+
+    Returns:
+        dict: ExclusiveStartKey
+
+    Raises:
+        InvalidCursorError: 署名不一致・形式不正・クエリ条件の不一致
+    """
+    data = _unpack_cursor(cursor, query_fingerprint)
+    if 'k' not in data:
+        raise InvalidCursorError('Malformed cursor')
+    return _decode_key(data['k'])
+
+
+def encode_shard_cursor(positions, query_fingerprint):
+    """
+    シャードごとの再開位置を署名付きのカーソル文字列に変換
+
+    Args:
+        positions: シャード番号順の再開位置（None: 先頭から / SHARD_EXHAUSTED: 読み終わり / dict: ExclusiveStartKey）
+        query_fingerprint: カーソルを発行したクエリ条件
+
+    Returns:
+        str: next_cursor として返す文字列
+    """
+    encoded = [
+        position if position is None or position == SHARD_EXHAUSTED else _encode_key(position)
+        for position in positions
+    ]
+    return _pack_cursor({'s': encoded}, query_fingerprint)
+
+
+def decode_shard_cursor(cursor, query_fingerprint, shard_count):
+    """
+    カーソル文字列を検証してシャードごとの再開位置に戻す
+
+    Raises:
+        InvalidCursorError: 署名不一致・形式不正・クエリ条件やシャード数の不一致
+    """
+    data = _unpack_cursor(cursor, query_fingerprint)
+    positions = data.get('s')
+    if not isinstance(positions, list):
+        raise InvalidCursorError('Malformed cursor')
+    if len(positions) != shard_count:
+        raise InvalidCursorError('Cursor was issued for a different shard count')
+    return [
+        position if position is None or position == SHARD_EXHAUSTED else _decode_key(position)
+        for position in positions
+    ]
+
+
+def get_header(event, name):
+    """リクエストヘッダーを大文字小文字を区別せずに取得"""
+    headers = event.get('headers') or {}
+    lowered = name.lower()
+    for key, value in headers.items():
+        if key.lower() == lowered:
+            return value
+    return None
+
+
+def parse_if_match(event):
+    """
+    If-Match ヘッダーから書き込みの前提条件を取得
+
+    item_etag() が返す ETag を受け付ける。Version を持たない古いアイテムの
+    弱い ETag（W/"t<UpdatedAt>"）は UpdatedAt の一致として扱う。
+
+    Returns:
+        tuple | None: ('version', バージョン) または ('updated_at', UNIX秒)
+                      （未指定または '*' の場合は None）
+
+    Raises:
+        ValueError: ETag として解釈できない場合
+    """
+    value = get_header(event, 'If-Match')
+    if value is None:
+        return None
+
+    value = value.strip()
+    if value == '*':
+        return None
+    if value.startswith('W/'):
+        value = value[2:]
+    value = value.strip('"')
+
+    try:
+        if value.startswith('t'):
+            return 'updated_at', int(value[1:])
+        return 'version', int(value)
+    except ValueError:
+        raise ValueError('If-Match must be an ETag returned by this API')
+
+
+def if_match_condition(precondition):
+    """
+    parse_if_match() の前提条件を条件式に変換
+
+    Returns:
+        tuple: (条件式, ExpressionAttributeNames, ExpressionAttributeValues)
+    """
+    kind, value = precondition
+    if kind == 'version':
+        return '#version = :expected_version', {'#version': 'Version'}, {':expected_version': value}
+    # 古いアイテムは最初の更新で Version が付くため、同じ UpdatedAt の ETag は1回しか一致しない
+    return (
+        'attribute_not_exists(#version) AND #updated_at = :expected_updated_at',
+        {'#version': 'Version', '#updated_at': 'UpdatedAt'},
+        {':expected_updated_at': value}
+    )
+
+
+def item_etag(item):
+    """
+    アイテムの ETag を取得
+
+    Version（更新ごとに加算）から強い ETag を作る。Version を持たない古いアイテムは
+    UpdatedAt から弱い ETag を作る。どちらもない場合は None。
+    """
+    version = item.get('Version')
+    if version is not None:
+        return f'"{int(version)}"'
+    updated_at = item.get('UpdatedAt')
+    if updated_at is not None:
+        return f'W/"t{int(updated_at)}"'
+    return None
+
+
+def listing_etag(items, next_cursor, fields):
+    """
+    一覧ページの ETag を取得
+
+    ページ内アイテムの ItemId / Version / UpdatedAt と次ページカーソル・fields から
+    ウォーターマークを計算する（属性値そのものは含めないため弱い ETag）。
+    """
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(f"{item.get('ItemId')}:{item.get('Version')}:{item.get('UpdatedAt')}\n".encode('utf-8'))
+    digest.update(f"{next_cursor}|{','.join(fields or ())}".encode('utf-8'))
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(event, etag):
+    """
+    If-None-Match ヘッダーが ETag に一致するか（弱い比較）
+    """
+    value = get_header(event, 'If-None-Match')
+    if value is None or etag is None:
+        return False
+
+    value = value.strip()
+    if value == '*':
+        return True
+
+    def opaque(tag):
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+
+    target = opaque(etag)
+    return any(opaque(tag) == target for tag in value.split(','))
+
+
+def not_modified_response(etag, headers=None):
+    """
+    304 Not Modified レスポンスを作成（ボディはシリアライズしない）
+    """
+    return create_response(304, None, headers={**(headers or {}), 'ETag': etag})
+
+
+def is_conditional_check_failed(error):
+    """ClientError が ConditionalCheckFailedException かどうか"""
+    return error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+
+def conditional_failure_response(error, item_id):
+    """
+    条件付き書き込みの失敗をレスポンスに変換
+
+    ReturnValuesOnConditionCheckFailure=ALL_OLD により、アイテムが存在すれば
+    失敗レスポンスに現在のアイテムが含まれるため、追加の読み取りなしで
+    404（存在しない）と 412（バージョン不一致）を区別できる。
+    """
+    # キャッシュ上の値は古いため破棄
+    item_cache.invalidate(item_id)
+
+    current = error.response.get('Item')
+    if not current:
+        return create_response(404, {
+            'error': 'Not found',
+            'message': f'Item {item_id} not found'
+        })
+
+    current_version = current.get('Version', {}).get('N')
+    return create_response(412, {
+        'error': 'Precondition failed',
+        'message': f'Item {item_id} has been modified',
+        'current_version': int(current_version) if current_version is not None else None
+    })
+
+
+def refresh_cache_stamps():
+    """
+    Processor Lambda が公開したバージョンスタンプを読み込み、キャッシュに反映
+
+    CACHE_STAMP_REFRESH_SECONDS ごとに最大1回だけ読み込む（0 以下で無効）。
+    """
+    global _cache_stamps_checked_at
+
+    if not item_cache.enabled or CACHE_STAMP_REFRESH_SECONDS <= 0:
+        return
+
+    now = time.monotonic()
+    if now - _cache_stamps_checked_at < CACHE_STAMP_REFRESH_SECONDS:
+        return
+    _cache_stamps_checked_at = now
+
+    try:
+        response = table_request('get_item', Key=CACHE_STAMP_KEY)
+    except Exception as e:
+        # 読み込めなくても TTL で鮮度は保証されるため処理は継続
+        logger.warning('Failed to refresh cache stamps: %s', e)
+        return
+
+    stamps = {
+        int(name[len('Slot'):]): float(value)
+        for name, value in response.get('Item', {}).items()
+        if name.startswith('Slot')
+    }
+    evicted = item_cache.apply_stamps(stamps)
+    if evicted:
+        logger.debug('Evicted %s cached items by version stamps', evicted)
+
+
+def emit_cache_metrics():
+    """
+    前回の出力以降のキャッシュのカウンターを EMF で出力
+
+    CACHE_METRICS_INTERVAL_SECONDS ごとに最大1回だけ出力する（カウンターは出力時に0に戻す）。
+    """
+    global _cache_metrics_emitted_at
+
+    if cache_metrics_writer is None or not item_cache.enabled:
+        return
+
+    now = time.monotonic()
+    if now - _cache_metrics_emitted_at < CACHE_METRICS_INTERVAL_SECONDS:
+        return
+    _cache_metrics_emitted_at = now
+
+    try:
+        cache_metrics_writer(item_cache.drain_stats())
+    except Exception as e:
+        logger.warning('Failed to emit cache metrics: %s', e)
+
+
+def item_key(item_id):
+    """アイテムIDからプライマリキーを生成"""
+    return {
+        'PK': f'ITEM#{item_id}',
+        'SK': 'METADATA'
+    }
+
+
+def entity_status_key(status):
+    """StatusIndex のパーティションキー（EntityType#Status）を取得"""
+    return f'Item#{status}'
+
+
+def build_new_item(body, current_time):
+    """
+    リクエストボディから新規アイテムを構築
+
+    Args:
+        body: バリデーション済みのリクエストボディ（dict）
+        current_time: 作成時刻（UNIXタイムスタンプ）
+
+    Returns:
+        dict: DynamoDBアイテム
+    """
+    item_id = str(uuid.uuid4())
+
+    item = {
+        'PK': f'ITEM#{item_id}',
+        'SK': 'METADATA',
+        'EntityType': 'Item',
+        'ItemId': item_id,
+        'Name': body['name'],
+        'Description': body.get('description', ''),
+        'Status': body.get('status', 'active'),
+        'EntityStatus': entity_status_key(body.get('status', 'active')),
+        SHARD_ATTRIBUTE: shard_key('Item', shard_for(item_id, ITEM_SHARD_COUNT)),
+        'CreatedAt': current_time,
+        'UpdatedAt': current_time,
+        'Version': 1,
+        'GSI1PK': f'ITEM#{item_id}',
+        'GSI1SK': f'CREATED#{current_time}'
+    }
+
+    # 有効期限（TTL）の設定例（30日後）
+    # item['ExpiresAt'] = current_time + (30 * 24 * 60 * 60)
+
+    return item
+
+
+def chunked(values, size):
+    """リストを size 件ずつに分割"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def backoff_sleep(attempt):
+    """Full Jitter 指数バックオフで待機"""
+    delay = min(BATCH_BACKOFF_MAX_SECONDS, BATCH_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    time.sleep(random.uniform(0, delay))
+
+
+def batch_get_keys(keys):
+    """
+    BatchGetItem で複数キーを取得（UnprocessedKeys は再試行）
+
+    Args:
+        keys: プライマリキーのリスト（重複なし、100件以下）
+
+    Returns:
+        tuple: (取得したアイテムのリスト, 再試行後も未処理のキーのリスト)
+    """
+    found = []
+
+    for attempt in range(BATCH_MAX_RETRIES + 1):
+        items, keys = batch_get_request(keys)
+        found.extend(items)
+
+        if not keys:
+            return found, []
+        if attempt < BATCH_MAX_RETRIES:
+            backoff_sleep(attempt)
+
+    return found, keys
+
+
+def batch_write_requests(write_requests):
+    """
+    BatchWriteItem で書き込み（UnprocessedItems は再試行）
+
+    Args:
+        write_requests: PutRequest / DeleteRequest のリスト（25件以下）
+
+    Returns:
+        list: 再試行後も未処理のリクエスト
+    """
+    for attempt in range(BATCH_MAX_RETRIES + 1):
+        write_requests = batch_write_request(write_requests)
+
+        if not write_requests:
+            return []
+        if attempt < BATCH_MAX_RETRIES:
+            backoff_sleep(attempt)
+
+    return write_requests
+
+
+def parse_batch_body(event, field):
+    """
+    バッチリクエストのボディから配列フィールドを取り出す
+
+    Raises:
+        ValueError: 形式不正・件数超過の場合
+    """
+    body = json.loads(get_request_body(event) or '{}')
+    values = body.get(field) if isinstance(body, dict) else None
+
+    if not isinstance(values, list) or not values:
+        raise ValueError(f'{field} must be a non-empty array')
+    if len(values) > MAX_BATCH_ITEMS:
+        raise ValueError(f'{field} must contain at most {MAX_BATCH_ITEMS} entries')
+
+    return values
+
+
+def parse_batch_ids(event):
+    """
+    バッチリクエストのボディから重複を除いたIDリストを取り出す
+
+    BatchGetItem / BatchWriteItem は同一キーの重複を受け付けないため、
+    リクエスト順を保ったまま重複を除く。
+    """
+    ids = parse_batch_body(event, 'ids')
+    if not all(isinstance(item_id, str) and item_id for item_id in ids):
+        raise ValueError('ids must be non-empty strings')
+    return list(dict.fromkeys(ids))
+
+
+def parse_int_param(query_params, name, minimum=None):
+    """
+    整数のクエリパラメータを取得（未指定なら None）
+
+    Raises:
+        ValueError: 整数として解釈できない場合、minimum より小さい場合
+    """
+    value = query_params.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if minimum is not None and parsed < minimum:
+        raise ValueError(f'{name} must be greater than or equal to {minimum}')
+    return parsed
+
+
+def parse_fields(query_params):
+    """
+    fields クエリパラメータ（カンマ区切りの属性名）を取得（未指定なら None）
+
+    Raises:
+        ValueError: 属性名が不正・件数超過の場合
+    """
+    value = query_params.get('fields')
+    if value is None:
+        return None
+
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not fields:
+        raise ValueError('fields must contain at least one attribute name')
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f'fields must contain at most {MAX_FIELDS} attribute names')
+    for field in fields:
+        if not FIELD_NAME_PATTERN.match(field):
+            raise ValueError(f'Invalid field name: {field}')
+    return fields
+
+
+def build_projection(fields):
+    """
+    属性名のリストから ProjectionExpression を生成
+
+    予約語と衝突しないよう、全ての属性名をプレースホルダー（#f0, #f1, ...）で参照する。
+
+    Returns:
+        tuple: (ProjectionExpression, ExpressionAttributeNames)
+    """
+    names = {f'#f{i}': field for i, field in enumerate(fields)}
+    return ', '.join(names), names
+
+
+def shape_item(item, fields=None):
+    """
+    レスポンス用にアイテムの属性を絞り込む
+
+    Args:
+        item: アイテム（None 可）
+        fields: 返す属性名のリスト（None の場合は内部属性以外の全属性）
+    """
+    if item is None:
+        return None
+    if fields is None:
+        return {name: value for name, value in item.items() if name not in INTERNAL_ATTRIBUTES}
+    return {name: item[name] for name in fields if name in item}
+
+
+def get_shard_executor():
+    """並列クエリ（一覧のシャード・検索のトークン）用スレッドプールを取得（生成は初回のみ）"""
+    global _shard_executor
+    if _shard_executor is None:
+        _shard_executor = ThreadPoolExecutor(max_workers=SHARD_QUERY_MAX_WORKERS, thread_name_prefix='shard-query')
+    return _shard_executor
+
+
+def parallel_map(func, values):
+    """values の各要素に func を適用（低レベルクライアントの場合はスレッドプールで並列に実行）"""
+    # Table リソースはスレッドセーフではないため、並列にするのは低レベルクライアントの場合のみ
+    if USE_LOW_LEVEL_CLIENT and len(values) > 1:
+        return list(get_shard_executor().map(bind(func), values))
+    return [func(value) for value in values]
+
+
+def query_shards(query_kwargs, shard_values, positions):
+    """
+    全シャードを並列にクエリし、CreatedAt の降順に k-way マージする
+
+    どのシャードに偏っていても1ページ分を埋められるよう各シャードから Limit 件ずつ読み、
+    マージ結果の先頭 Limit 件を返す。シャードの次の再開位置は、そのシャードから返した
+    最後のアイテム（読んだ分をすべて返した場合は LastEvaluatedKey）になる。
+
+    Args:
+        query_kwargs: シャード共通の Query パラメータ（キー条件のシャードは :shard で参照する）
+        shard_values: シャード番号順の :shard の値
+        positions: シャード番号順の再開位置（decode_shard_cursor の戻り値）
+
+    Returns:
+        tuple: (アイテムのリスト, 次の再開位置のリスト。全シャードを読み終わった場合は None)
+    """
+    limit = query_kwargs['Limit']
+    active = [shard for shard, position in enumerate(positions) if position != SHARD_EXHAUSTED]
+
+    def query_shard(shard):
+        kwargs = dict(query_kwargs)
+        kwargs['ExpressionAttributeValues'] = dict(query_kwargs['ExpressionAttributeValues'], **{
+            ':shard': shard_values[shard]
+        })
+        if positions[shard] is not None:
+            kwargs['ExclusiveStartKey'] = positions[shard]
+        return table_request('query', **kwargs)
+
+    responses = parallel_map(query_shard, active)
+
+    pages = {shard: response.get('Items', []) for shard, response in zip(active, responses)}
+    merged = heapq.merge(
+        *[[(item, shard) for item in pages[shard]] for shard in active],
+        key=lambda entry: entry[0]['CreatedAt'],
+        reverse=True
+    )
+
+    items = []
+    consumed = dict.fromkeys(active, 0)
+    for item, shard in merged:
+        if len(items) >= limit:
+            break
+        items.append(item)
+        consumed[shard] += 1
+
+    next_positions = list(positions)
+    for shard, response in zip(active, responses):
+        page = pages[shard]
+        if consumed[shard] == len(page):
+            next_positions[shard] = response.get('LastEvaluatedKey') or SHARD_EXHAUSTED
+        elif consumed[shard] > 0:
+            last_item = page[consumed[shard] - 1]
+            next_positions[shard] = {
+                'PK': last_item['PK'],
+                'SK': last_item['SK'],
+                SHARD_ATTRIBUTE: shard_values[shard],
+                'CreatedAt': last_item['CreatedAt']
+            }
+
+    if all(position == SHARD_EXHAUSTED for position in next_positions):
+        return items, None
+    return items, next_positions
+
+
+# ========================================
+# CRUD操作
+# ========================================
+
+def get_items(event):
+    """
+    GET /items - アイテム一覧取得
+
+    status 未指定時は EntityShardIndex の全シャードを並列にクエリし、CreatedAt の降順にマージする。
+
+    クエリパラメータ:
+        limit: 1ページの件数（1〜MAX_PAGE_SIZE にクランプ）
+        cursor: 前ページの next_cursor
+        since / until: CreatedAt（UNIXタイムスタンプ）の範囲指定
+        status: Status で絞り込む（StatusIndex をクエリ）
+        fields: 返す属性名（カンマ区切り、ProjectionExpression で読み取る）
+    """
+    try:
+        query_params = event.get('queryStringParameters') or {}
+
+        try:
+            limit = parse_int_param(query_params, 'limit')
+            since = parse_int_param(query_params, 'since')
+            until = parse_int_param(query_params, 'until')
+            fields = parse_fields(query_params)
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
+
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        status = query_params.get('status')
+        if status is not None and not status.strip():
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': 'status must not be empty'
+            })
+
+        # シャード（status 指定時は EntityType#Status）+ CreatedAt の範囲でキー条件を構築
+        if status is None:
+            index_name = 'EntityShardIndex'
+            key_condition = f'{SHARD_ATTRIBUTE} = :shard'
+            expression_attribute_values = {}
+        else:
+            index_name = 'StatusIndex'
+            key_condition = 'EntityStatus = :entity_status'
+            expression_attribute_values = {':entity_status': entity_status_key(status)}
+        if since is not None and until is not None:
+            if since > until:
+                return create_response(400, {
+                    'error': 'Bad request',
+                    'message': 'since must be less than or equal to until'
+                })
+            key_condition += ' AND CreatedAt BETWEEN :since AND :until'
+        elif since is not None:
+            key_condition += ' AND CreatedAt >= :since'
+        elif until is not None:
+            key_condition += ' AND CreatedAt <= :until'
+        if since is not None:
+            expression_attribute_values[':since'] = since
+        if until is not None:
+            expression_attribute_values[':until'] = until
+
+        query_kwargs = {
+            'IndexName': index_name,
+            'KeyConditionExpression': key_condition,
+            'ExpressionAttributeValues': expression_attribute_values,
+            'ScanIndexForward': False,  # CreatedAt の降順
+            'Limit': limit
+        }
+        if fields is not None:
+            # ETag の計算とシャードの再開位置に使う属性は fields に関係なく読む（レスポンスからは shape_item で除く）
+            query_kwargs['ProjectionExpression'], query_kwargs['ExpressionAttributeNames'] = build_projection(
+                list(dict.fromkeys(fields + ['ItemId', 'Version', 'UpdatedAt', 'PK', 'SK', 'CreatedAt']))
+            )
+
+        # カーソルは同じ since/until（と status）のクエリでのみ有効
+        query_fingerprint = [since, until]
+        if status is not None:
+            query_fingerprint.append(status)
+        cursor = query_params.get('cursor')
+        positions = [None] * ITEM_SHARD_COUNT
+        if cursor:
+            try:
+                if status is None:
+                    positions = decode_shard_cursor(cursor, query_fingerprint, ITEM_SHARD_COUNT)
+                else:
+                    query_kwargs['ExclusiveStartKey'] = decode_cursor(cursor, query_fingerprint)
+            except InvalidCursorError as e:
+                return create_response(400, {
+                    'error': 'Bad request',
+                    'message': f'Invalid cursor: {str(e)}'
+                })
+
+        if status is None:
+            # 全シャードを並列にクエリしてマージ（カーソルはシャードごとの再開位置）
+            items, next_positions = query_shards(query_kwargs, shard_keys('Item', ITEM_SHARD_COUNT), positions)
+            next_cursor = encode_shard_cursor(next_positions, query_fingerprint) if next_positions else None
+        else:
+            response = table_request('query', **query_kwargs)
+            items = response.get('Items', [])
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            next_cursor = encode_cursor(last_evaluated_key, query_fingerprint) if last_evaluated_key else None
+
+        etag = listing_etag(items, next_cursor, fields)
+        headers = {'ETag': etag, 'Cache-Control': RESPONSE_CACHE_CONTROL}
+        if etag_matches(event, etag):
+            logger.info('Items not modified (%s items)', len(items))
+            return not_modified_response(etag, headers=headers)
+
+        items = [shape_item(item, fields) for item in items]
+
+        logger.info('Retrieved %s items (has_more=%s)', len(items), next_cursor is not None)
+
+        return create_response(200, {
+            'items': items,
+            'count': len(items),
+            'next_cursor': next_cursor
+        }, headers=headers)
+
+    except Exception as e:
+        logger.error('Error getting items: %s', e)
+        logger.error(traceback.format_exc())
+        return create_response(500, {
+            'error': 'Internal server error',
+            'message': str(e)
+        })
+
+
+def get_item(event):
+    """
+    GET /items/{id} - 特定アイテム取得
 
+    ウォームコンテナ内の読み取りキャッシュを優先し、ミス時のみ DynamoDB を読む。
+    If-None-Match がバージョンと一致する場合は 304 を返す。
 
-def create_response(status_code, body, headers=None):
+    クエリパラメータ:
+        fields: 返す属性名（カンマ区切り）
     """
-    API Gateway レスポンスを作成
+    try:
+        item_id = event['pathParameters']['id']
 
-    Args:
-        status_code: HTTPステータスコード
-        body: レスポンスボディ（dict）
-        headers: 追加ヘッダー（dict）
+        try:
+            fields = parse_fields(event.get('queryStringParameters') or {})
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
 
-    Returns:
-        dict: API Gateway レスポンス形式
-    """
-    default_headers = {
-        'Content-Type': 'application/json',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key',
-        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
-    }
+        key = {
+            'PK': f'ITEM#{item_id}',
+            'SK': 'METADATA'
+        }
 
-    if headers:
-        default_headers.update(headers)
+        refresh_cache_stamps()
+        hit, item = item_cache.get(item_id)
+        cache_header = {'X-Cache': 'HIT' if hit else 'MISS'}
+        loaded = hit
+
+        if not loaded and get_header(event, 'If-None-Match') is not None:
+            # 条件付き GET はまず Version / UpdatedAt だけを読み、一致すれば本体を読まずに 304 を返す
+            current = table_request(
+                'get_item',
+                Key=key,
+                ProjectionExpression='#version, UpdatedAt',
+                ExpressionAttributeNames={'#version': 'Version'}
+            ).get('Item')
+
+            if current is None:
+                item, loaded = None, True
+                item_cache.put(item_id, None)
+            else:
+                etag = item_etag(current)
+                if etag_matches(event, etag):
+                    logger.info('Item not modified: %s (version check)', item_id)
+                    return not_modified_response(etag, headers={**cache_header, 'Cache-Control': RESPONSE_CACHE_CONTROL})
+
+        if not loaded:
+            get_kwargs = {'Key': key}
+            # GetItem の消費 RCU は射影しても変わらないため、キャッシュ有効時は全属性を読んでキャッシュする
+            if fields is not None and not item_cache.enabled:
+                get_kwargs['ProjectionExpression'], get_kwargs['ExpressionAttributeNames'] = build_projection(
+                    list(dict.fromkeys(fields + ['Version', 'UpdatedAt']))
+                )
+
+            response = table_request('get_item', **get_kwargs)
+            item = response.get('Item')
+            if 'ProjectionExpression' not in get_kwargs:
+                item_cache.put(item_id, item)
+
+        if item is None:
+            return create_response(404, {
+                'error': 'Not found',
+                'message': f'Item {item_id} not found'
+            }, headers=cache_header)
 
-    return {
-        'statusCode': status_code,
-        'headers': default_headers,
-        'body': json.dumps(body, cls=DecimalEncoder, ensure_ascii=False)
-    }
+        headers = {**cache_header, 'Cache-Control': RESPONSE_CACHE_CONTROL}
+        etag = item_etag(item)
+        if etag is not None:
+            headers['ETag'] = etag
+            if etag_matches(event, etag):
+                logger.info('Item not modified: %s (cache %s)', item_id, cache_header['X-Cache'])
+                return not_modified_response(etag, headers=headers)
 
+        logger.info('Retrieved item: %s (cache %s)', item_id, cache_header['X-Cache'])
 
-def get_current_timestamp():
-    """現在のUNIXタイムスタンプを取得"""
-    return int(datetime.utcnow().timestamp())
+        return create_response(200, {
+            'item': shape_item(item, fields)
+        }, headers=headers)
 
+    except Exception as e:
+        logger.error('Error getting item: %s', e)
+        logger.error(traceback.format_exc())
+        return create_response(500, {
+            'error': 'Internal server error',
+            'message': str(e)
+        })
 
-# ========================================
-# CRUD操作
-# ========================================
 
-def get_items(event):
+def get_item_stats(event):
     """
-    GET /items - アイテム一覧取得
+    GET /items/stats - アイテムの集計値取得
+
+    Processor Lambda が維持している集計アイテムを1回の GetItem で返す。
+    days を指定すると直近 N 日分の作成件数（日別バケット）も返す。
     """
     try:
-        # クエリパラメータから制限を取得
         query_params = event.get('queryStringParameters') or {}
-        limit = int(query_params.get('limit', 20))
-
-        # EntityType でクエリ（GSI使用）
-        response = table.query(
-            IndexName='EntityTypeIndex',
-            KeyConditionExpression=Key('EntityType').eq('Item'),
-            ScanIndexForward=False,  # CreatedAt の降順
-            Limit=limit
-        )
-
-        items = response.get('Items', [])
+        try:
+            days = parse_int_param(query_params, 'days', minimum=0)
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
 
-        logger.info(f"Retrieved {len(items)} items")
+        response = table_request(
+            'get_item',
+            Key={
+                'PK': 'STATS#Item',
+                'SK': 'SUMMARY'
+            }
+        )
+        summary = response.get('Item', {})
+
+        stats = {
+            'entity_type': 'Item',
+            'total': int(summary.get('ItemCount', 0)),
+            'by_status': {
+                name[len('Status#'):]: int(count)
+                for name, count in summary.items()
+                if name.startswith('Status#') and count
+            },
+            'updated_at': int(summary['UpdatedAt']) if 'UpdatedAt' in summary else None
+        }
 
-        return create_response(200, {
-            'items': items,
-            'count': len(items)
-        })
+        if days:
+            daily = table_request(
+                'query',
+                KeyConditionExpression='PK = :pk AND begins_with(SK, :day_prefix)',
+                ExpressionAttributeValues={':pk': 'STATS#Item', ':day_prefix': 'DAY#'},
+                ScanIndexForward=False,  # 新しい日付順
+                Limit=max(1, min(days, 366))
+            )
+            stats['daily'] = [
+                {'date': bucket['SK'][len('DAY#'):], 'count': int(bucket.get('ItemCount', 0))}
+                for bucket in daily.get('Items', [])
+            ]
+
+        return create_response(200, stats)
 
     except Exception as e:
-        logger.error(f"Error getting items: {str(e)}")
+        logger.error('Error getting item stats: %s', e)
         logger.error(traceback.format_exc())
         return create_response(500, {
             'error': 'Internal server error',
@@ -113,35 +1300,166 @@ def get_items(event):
         })
 
 
-def get_item(event):
+def read_postings(term):
     """
-    GET /items/{id} - 特定アイテム取得
+    1トークンのポスティングを最大 SEARCH_MAX_POSTINGS 件読む
+
+    Returns:
+        tuple: ({アイテムID: 重み}, 上限で打ち切った場合 True)
+    """
+    postings = {}
+    query_kwargs = {
+        'KeyConditionExpression': 'PK = :pk',
+        'ExpressionAttributeValues': {':pk': f'{SEARCH_PK_PREFIX}{term}'},
+        'ProjectionExpression': 'SK, #weight',
+        'ExpressionAttributeNames': {'#weight': WEIGHT_ATTRIBUTE}
+    }
+
+    while True:
+        query_kwargs['Limit'] = SEARCH_MAX_POSTINGS - len(postings)
+        response = table_request('query', **query_kwargs)
+        for posting in response.get('Items', []):
+            postings[posting['SK'][len(POSTING_SK_PREFIX):]] = posting.get(WEIGHT_ATTRIBUTE, 1)
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if last_evaluated_key is None:
+            return postings, False
+        if len(postings) >= SEARCH_MAX_POSTINGS:
+            return postings, True
+        query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+
+def lookup_postings(term, item_ids):
+    """
+    候補アイテムについてトークンのポスティングを BatchGetItem で直接確認
+
+    Returns:
+        dict: {アイテムID: 重み}（ポスティングのあるアイテムのみ）
+    """
+    found = {}
+    for chunk in chunked(item_ids, BATCH_GET_CHUNK_SIZE):
+        postings, unprocessed = batch_get_keys([posting_key(term, item_id) for item_id in chunk])
+        if unprocessed:
+            raise RuntimeError(f'{len(unprocessed)} postings could not be read')
+        for posting in postings:
+            found[posting['SK'][len(POSTING_SK_PREFIX):]] = posting.get(WEIGHT_ATTRIBUTE, 1)
+    return found
+
+
+def search_items(event):
+    """
+    GET /items/search - 全文検索
+
+    クエリを Processor と同じトークナイザーで分解し、全トークンを含むアイテム（AND）を
+    BM25 風のスコア順に返す。ポスティングは全トークン分を並列に読み、短いリストから順に
+    積集合を取る。SEARCH_MAX_POSTINGS で打ち切ったリストは、候補アイテムについて
+    ポスティングを直接確認する。全トークンのリストが打ち切られた場合は truncated=true。
+
+    クエリパラメータ:
+        q: 検索語（必須）
+        limit: 返す件数（1〜MAX_PAGE_SIZE にクランプ）
+        fields: 返す属性名（カンマ区切り）
     """
     try:
-        item_id = event['pathParameters']['id']
+        query_params = event.get('queryStringParameters') or {}
 
-        response = table.get_item(
-            Key={
-                'PK': f'ITEM#{item_id}',
-                'SK': 'METADATA'
-            }
-        )
+        try:
+            limit = parse_int_param(query_params, 'limit')
+            fields = parse_fields(query_params)
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
 
-        if 'Item' not in response:
-            return create_response(404, {
-                'error': 'Not found',
-                'message': f'Item {item_id} not found'
+        if limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        query = (query_params.get('q') or '').strip()
+        if not query:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': 'q is required'
+            })
+        if len(query) > SEARCH_MAX_QUERY_LENGTH:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': f'q must be at most {SEARCH_MAX_QUERY_LENGTH} characters'
+            })
+
+        terms = query_terms(query)[:SEARCH_MAX_QUERY_TERMS]
+        if not terms:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': 'q must contain at least one searchable term'
             })
 
-        item = response['Item']
-        logger.info(f"Retrieved item: {item_id}")
+        # 全トークンのポスティングと、IDF 用の総件数（集計アイテム）を並列に読む
+        def read(task):
+            if task is None:
+                return table_request('get_item', Key={'PK': 'STATS#Item', 'SK': 'SUMMARY'}).get('Item') or {}
+            return read_postings(task)
+
+        *posting_lists, summary = parallel_map(read, terms + [None])
+        document_frequencies = {term: len(postings) for term, (postings, _) in zip(terms, posting_lists)}
+        document_count = max([int(summary.get('ItemCount', 0))] + list(document_frequencies.values()))
+
+        # 打ち切られていない、短いリストから順に積集合を取る
+        ordered = sorted(zip(terms, posting_lists), key=lambda entry: (entry[1][1], len(entry[1][0])))
+        base_term, (base_postings, truncated) = ordered[0]
+        candidates = {item_id: {base_term: weight} for item_id, weight in base_postings.items()}
+
+        for term, (postings, term_truncated) in ordered[1:]:
+            if not candidates:
+                break
+            for item_id in list(candidates):
+                if item_id in postings:
+                    candidates[item_id][term] = postings[item_id]
+                elif not term_truncated:
+                    del candidates[item_id]
+            if term_truncated:
+                missing = [item_id for item_id in candidates if term not in candidates[item_id]]
+                found = lookup_postings(term, missing) if missing else {}
+                for item_id in missing:
+                    if item_id in found:
+                        candidates[item_id][term] = found[item_id]
+                    else:
+                        del candidates[item_id]
+
+        scores = {
+            item_id: sum(
+                term_score(weight, document_count, document_frequencies[term])
+                for term, weight in weights.items()
+            )
+            for item_id, weights in candidates.items()
+        }
+        top_ids = sorted(scores, key=lambda item_id: (-scores[item_id], item_id))[:limit]
+
+        found = {}
+        if top_ids:
+            items, _ = batch_get_keys([{'PK': f'ITEM#{item_id}', 'SK': 'METADATA'} for item_id in top_ids])
+            found = {item['ItemId']: item for item in items}
+
+        # ポスティングの反映前に削除されたアイテムは除く
+        results = []
+        for item_id in top_ids:
+            if item_id in found:
+                results.append(shape_item(found[item_id], fields))
+
+        logger.info(
+            'Search %s: %s matches, returned %s (truncated=%s)', terms, len(candidates), len(results), truncated
+        )
 
         return create_response(200, {
-            'item': item
+            'items': results,
+            'count': len(results),
+            'total_matches': len(candidates),
+            'truncated': truncated
         })
 
     except Exception as e:
-        logger.error(f"Error getting item: {str(e)}")
+        logger.error('Error searching items: %s', e)
         logger.error(traceback.format_exc())
         return create_response(500, {
             'error': 'Internal server error',
@@ -154,7 +1472,7 @@ def create_item(event):
     POST /items - アイテム作成
     """
     try:
-        body = json.loads(event['body'])
+        body = json.loads(get_request_body(event))
 
         # バリデーション
         if 'name' not in body:
@@ -163,38 +1481,17 @@ def create_item(event):
                 'message': 'name is required'
             })
 
-        # アイテムID生成（簡易版、本番ではUUIDなどを使用）
-        import uuid
-        item_id = str(uuid.uuid4())
-
-        current_time = get_current_timestamp()
-
-        # DynamoDBアイテム作成
-        item = {
-            'PK': f'ITEM#{item_id}',
-            'SK': 'METADATA',
-            'EntityType': 'Item',
-            'ItemId': item_id,
-            'Name': body['name'],
-            'Description': body.get('description', ''),
-            'Status': body.get('status', 'active'),
-            'CreatedAt': current_time,
-            'UpdatedAt': current_time,
-            'GSI1PK': f'ITEM#{item_id}',
-            'GSI1SK': f'CREATED#{current_time}'
-        }
-
-        # 有効期限（TTL）の設定例（30日後）
-        # item['ExpiresAt'] = current_time + (30 * 24 * 60 * 60)
+        item = build_new_item(body, get_current_timestamp())
+        item_id = item['ItemId']
 
-        table.put_item(Item=item)
+        table_request('put_item', Item=item)
 
-        logger.info(f"Created item: {item_id}")
+        logger.info('Created item: %s', item_id)
 
         return create_response(201, {
             'message': 'Item created successfully',
-            'item': item
-        })
+            'item': shape_item(item)
+        }, headers={'ETag': '"1"'})
 
     except json.JSONDecodeError:
         return create_response(400, {
@@ -202,7 +1499,7 @@ def create_item(event):
             'message': 'Invalid JSON'
         })
     except Exception as e:
-        logger.error(f"Error creating item: {str(e)}")
+        logger.error('Error creating item: %s', e)
         logger.error(traceback.format_exc())
         return create_response(500, {
             'error': 'Internal server error',
@@ -213,23 +1510,20 @@ def create_item(event):
 def update_item(event):
     """
     PUT /items/{id} - アイテム更新
+
+    存在確認は ConditionExpression で行い、1回の UpdateItem で完結させる。
+    If-Match ヘッダーに ETag を指定すると楽観的排他制御を行う。
     """
     try:
         item_id = event['pathParameters']['id']
-        body = json.loads(event['body'])
-
-        # 存在確認
-        response = table.get_item(
-            Key={
-                'PK': f'ITEM#{item_id}',
-                'SK': 'METADATA'
-            }
-        )
+        body = json.loads(get_request_body(event))
 
-        if 'Item' not in response:
-            return create_response(404, {
-                'error': 'Not found',
-                'message': f'Item {item_id} not found'
+        try:
+            precondition = parse_if_match(event)
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
             })
 
         current_time = get_current_timestamp()
@@ -253,10 +1547,15 @@ def update_item(event):
             update_expression_parts.append('#status = :status')
             expression_attribute_values[':status'] = body['status']
             expression_attribute_names['#status'] = 'Status'
+            # StatusIndex のキーも同時に更新する
+            update_expression_parts.append('EntityStatus = :entity_status')
+            expression_attribute_values[':entity_status'] = entity_status_key(body['status'])
 
-        # UpdatedAt は常に更新
+        # UpdatedAt は常に更新、Version はインクリメント
         update_expression_parts.append('UpdatedAt = :updated_at')
         expression_attribute_values[':updated_at'] = current_time
+        expression_attribute_names['#version'] = 'Version'
+        expression_attribute_values[':one'] = 1
 
         if not update_expression_parts:
             return create_response(400, {
@@ -264,26 +1563,44 @@ def update_item(event):
                 'message': 'No fields to update'
             })
 
-        update_expression = 'SET ' + ', '.join(update_expression_parts)
+        update_expression = 'SET ' + ', '.join(update_expression_parts) + ' ADD #version :one'
 
-        # 更新実行
-        response = table.update_item(
-            Key={
-                'PK': f'ITEM#{item_id}',
-                'SK': 'METADATA'
-            },
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values,
-            ExpressionAttributeNames=expression_attribute_names if expression_attribute_names else None,
-            ReturnValues='ALL_NEW'
-        )
+        # 存在確認（と任意のバージョン確認）を書き込みと同時に行う
+        condition_expression = 'attribute_exists(PK)'
+        if precondition is not None:
+            expression, names, values = if_match_condition(precondition)
+            condition_expression += f' AND {expression}'
+            expression_attribute_names.update(names)
+            expression_attribute_values.update(values)
 
-        logger.info(f"Updated item: {item_id}")
+        # 更新実行
+        try:
+            response = table_request(
+                'update_item',
+                Key={
+                    'PK': f'ITEM#{item_id}',
+                    'SK': 'METADATA'
+                },
+                UpdateExpression=update_expression,
+                ConditionExpression=condition_expression,
+                ExpressionAttributeValues=expression_attribute_values,
+                ExpressionAttributeNames=expression_attribute_names,
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except ClientError as e:
+            if is_conditional_check_failed(e):
+                return conditional_failure_response(e, item_id)
+            raise
+
+        item = response['Attributes']
+        item_cache.put(item_id, item)
+        logger.info('Updated item: %s', item_id)
 
         return create_response(200, {
             'message': 'Item updated successfully',
-            'item': response['Attributes']
-        })
+            'item': shape_item(item)
+        }, headers={'ETag': f'"{item["Version"]}"'})
 
     except json.JSONDecodeError:
         return create_response(400, {
@@ -291,7 +1608,7 @@ def update_item(event):
             'message': 'Invalid JSON'
         })
     except Exception as e:
-        logger.error(f"Error updating item: {str(e)}")
+        logger.error('Error updating item: %s', e)
         logger.error(traceback.format_exc())
         return create_response(500, {
             'error': 'Internal server error',
@@ -302,40 +1619,53 @@ def update_item(event):
 def delete_item(event):
     """
     DELETE /items/{id} - アイテム削除
+
+    存在確認は ConditionExpression で行い、1回の DeleteItem で完結させる。
+    If-Match ヘッダーに ETag を指定すると楽観的排他制御を行う。
     """
     try:
         item_id = event['pathParameters']['id']
 
-        # 存在確認
-        response = table.get_item(
-            Key={
+        try:
+            precondition = parse_if_match(event)
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
+
+        delete_kwargs = {
+            'Key': {
                 'PK': f'ITEM#{item_id}',
                 'SK': 'METADATA'
-            }
-        )
+            },
+            'ConditionExpression': 'attribute_exists(PK)',
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }
 
-        if 'Item' not in response:
-            return create_response(404, {
-                'error': 'Not found',
-                'message': f'Item {item_id} not found'
-            })
+        if precondition is not None:
+            expression, names, values = if_match_condition(precondition)
+            delete_kwargs['ConditionExpression'] += f' AND {expression}'
+            delete_kwargs['ExpressionAttributeNames'] = names
+            delete_kwargs['ExpressionAttributeValues'] = values
 
         # 削除実行
-        table.delete_item(
-            Key={
-                'PK': f'ITEM#{item_id}',
-                'SK': 'METADATA'
-            }
-        )
+        try:
+            table_request('delete_item', **delete_kwargs)
+        except ClientError as e:
+            if is_conditional_check_failed(e):
+                return conditional_failure_response(e, item_id)
+            raise
 
-        logger.info(f"Deleted item: {item_id}")
+        item_cache.invalidate(item_id)
+        logger.info('Deleted item: %s', item_id)
 
         return create_response(200, {
             'message': 'Item deleted successfully'
         })
 
     except Exception as e:
-        logger.error(f"Error deleting item: {str(e)}")
+        logger.error('Error deleting item: %s', e)
         logger.error(traceback.format_exc())
         return create_response(500, {
             'error': 'Internal server error',
@@ -343,32 +1673,259 @@ def delete_item(event):
         })
 
 
-def health_check(event):
+# ========================================
+# バッチ操作
+# ========================================
+
+def batch_get_items(event):
     """
-    GET /health - ヘルスチェック
+    POST /items:batchGet - 複数アイテム一括取得
+
+    リクエスト: {"ids": ["id1", "id2", ...]}
+    レスポンスの results はリクエストの順序（重複除去後）で返す。
+    """
+    try:
+        try:
+            item_ids = parse_batch_ids(event)
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
+
+        found = {}
+        unprocessed = set()
+
+        for chunk in chunked(item_ids, BATCH_GET_CHUNK_SIZE):
+            items, unprocessed_keys = batch_get_keys([item_key(item_id) for item_id in chunk])
+            for item in items:
+                found[item['ItemId']] = item
+            for key in unprocessed_keys:
+                unprocessed.add(key['PK'][len('ITEM#'):])
+
+        results = []
+        for item_id in item_ids:
+            if item_id in found:
+                results.append({'id': item_id, 'status': 'found', 'item': shape_item(found[item_id])})
+            elif item_id in unprocessed:
+                results.append({'id': item_id, 'status': 'unprocessed'})
+            else:
+                results.append({'id': item_id, 'status': 'not_found'})
+
+        logger.info('Batch get: %s found, %s unprocessed of %s', len(found), len(unprocessed), len(item_ids))
+
+        return create_response(200, {
+            'results': results,
+            'found': len(found),
+            'unprocessed': len(unprocessed)
+        })
+
+    except json.JSONDecodeError:
+        return create_response(400, {
+            'error': 'Bad request',
+            'message': 'Invalid JSON'
+        })
+    except Exception as e:
+        logger.error('Error batch getting items: %s', e)
+        logger.error(traceback.format_exc())
+        return create_response(500, {
+            'error': 'Internal server error',
+            'message': str(e)
+        })
+
+
+def batch_create_items(event):
+    """
+    POST /items:batchCreate - 複数アイテム一括作成
+
+    リクエスト: {"items": [{"name": ..., "description": ..., "status": ...}, ...]}
+    レスポンスの results はリクエストと同じ順序・件数で返す。
+    """
+    try:
+        try:
+            bodies = parse_batch_body(event, 'items')
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
+
+        current_time = get_current_timestamp()
+
+        results = [None] * len(bodies)
+        pending = []  # (リクエスト内の位置, アイテム)
+
+        for index, body in enumerate(bodies):
+            if not isinstance(body, dict) or 'name' not in body:
+                results[index] = {
+                    'index': index,
+                    'status': 'invalid',
+                    'message': 'name is required'
+                }
+                continue
+            pending.append((index, build_new_item(body, current_time)))
+
+        for chunk in chunked(pending, BATCH_WRITE_CHUNK_SIZE):
+            unprocessed = batch_write_requests([
+                {'PutRequest': {'Item': item}} for _, item in chunk
+            ])
+            unprocessed_ids = {request['PutRequest']['Item']['ItemId'] for request in unprocessed}
+
+            for index, item in chunk:
+                if item['ItemId'] in unprocessed_ids:
+                    results[index] = {'index': index, 'status': 'unprocessed'}
+                else:
+                    results[index] = {'index': index, 'status': 'created', 'item': shape_item(item)}
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        logger.info('Batch create: %s created of %s', created, len(bodies))
+
+        return create_response(200, {
+            'results': results,
+            'created': created,
+            'failed': len(bodies) - created
+        })
+
+    except json.JSONDecodeError:
+        return create_response(400, {
+            'error': 'Bad request',
+            'message': 'Invalid JSON'
+        })
+    except Exception as e:
+        logger.error('Error batch creating items: %s', e)
+        logger.error(traceback.format_exc())
+        return create_response(500, {
+            'error': 'Internal server error',
+            'message': str(e)
+        })
+
+
+def batch_delete_items(event):
+    """
+    POST /items:batchDelete - 複数アイテム一括削除
+
+    リクエスト: {"ids": ["id1", "id2", ...]}
+    BatchWriteItem は条件式を持てないため削除は冪等で、存在しないIDも deleted を返す。
     """
     try:
-        # DynamoDB接続確認
-        table.table_status
+        try:
+            item_ids = parse_batch_ids(event)
+        except ValueError as e:
+            return create_response(400, {
+                'error': 'Bad request',
+                'message': str(e)
+            })
+
+        unprocessed_ids = set()
+
+        for chunk in chunked(item_ids, BATCH_WRITE_CHUNK_SIZE):
+            unprocessed = batch_write_requests([
+                {'DeleteRequest': {'Key': item_key(item_id)}} for item_id in chunk
+            ])
+            for item_id in chunk:
+                item_cache.invalidate(item_id)
+            for request in unprocessed:
+                unprocessed_ids.add(request['DeleteRequest']['Key']['PK'][len('ITEM#'):])
+
+        results = [
+            {'id': item_id, 'status': 'unprocessed' if item_id in unprocessed_ids else 'deleted'}
+            for item_id in item_ids
+        ]
+
+        logger.info('Batch delete: %s deleted of %s', len(item_ids) - len(unprocessed_ids), len(item_ids))
 
         return create_response(200, {
-            'status': 'healthy',
-            'timestamp': datetime.utcnow().isoformat(),
-            'environment': os.environ.get('ENVIRONMENT'),
-            'version': os.environ.get('API_VERSION', 'v1')
+            'results': results,
+            'deleted': len(item_ids) - len(unprocessed_ids),
+            'unprocessed': len(unprocessed_ids)
+        })
+
+    except json.JSONDecodeError:
+        return create_response(400, {
+            'error': 'Bad request',
+            'message': 'Invalid JSON'
         })
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return create_response(503, {
-            'status': 'unhealthy',
-            'error': str(e)
+        logger.error('Error batch deleting items: %s', e)
+        logger.error(traceback.format_exc())
+        return create_response(500, {
+            'error': 'Internal server error',
+            'message': str(e)
+        })
+
+
+def health_check(event):
+    """
+    GET /health - ヘルスチェック
+
+    shallow（既定）は I/O なしで Lambda が応答できることだけを返す。
+    deep は依存サービスごとにデータプレーンの軽いリクエストでプローブし、
+    結果（キャッシュ済みかどうか・レイテンシ）を返す。1つでも unhealthy なら 503。
+
+    クエリパラメータ:
+        mode: shallow / deep
+    """
+    query_params = event.get('queryStringParameters') or {}
+    mode = query_params.get('mode', 'shallow')
+    if mode not in ('shallow', 'deep'):
+        return create_response(400, {
+            'error': 'Bad request',
+            'message': 'mode must be shallow or deep'
         })
 
+    body = {
+        'status': 'healthy',
+        'mode': mode,
+        'timestamp': datetime.utcnow().isoformat(),
+        'environment': os.environ.get('ENVIRONMENT'),
+        'version': os.environ.get('API_VERSION', 'v1')
+    }
+    headers = {'Cache-Control': 'no-store'}
+
+    if mode == 'shallow':
+        return create_response(200, body, headers=headers)
+
+    healthy, dependencies = health_checker.check()
+    body['dependencies'] = dependencies
+    if not healthy:
+        body['status'] = 'unhealthy'
+        logger.error('Health check failed: %s', dependencies)
+        return create_response(503, body, headers=headers)
+
+    return create_response(200, body, headers=headers)
+
 
 # ========================================
 # Lambda Handler
 # ========================================
 
+def resolve_route(http_method, path):
+    """メソッドとパスに対応するハンドラーを返す（該当なしは None）"""
+    if path == '/health' and http_method == 'GET':
+        return health_check
+    if path == '/items' and http_method == 'GET':
+        return get_items
+    if path == '/items' and http_method == 'POST':
+        return create_item
+    if path == '/items:batchGet' and http_method == 'POST':
+        return batch_get_items
+    if path == '/items:batchCreate' and http_method == 'POST':
+        return batch_create_items
+    if path == '/items:batchDelete' and http_method == 'POST':
+        return batch_delete_items
+    if path == '/items/stats' and http_method == 'GET':
+        return get_item_stats
+    if path == '/items/search' and http_method == 'GET':
+        return search_items
+    if path.startswith('/items/') and http_method == 'GET':
+        return get_item
+    if path.startswith('/items/') and http_method == 'PUT':
+        return update_item
+    if path.startswith('/items/') and http_method == 'DELETE':
+        return delete_item
+    return None
+
+
 def lambda_handler(event, context):
     """
     Lambda エントリーポイント
@@ -380,35 +1937,37 @@ def lambda_handler(event, context):
     Returns:
         dict: API Gateway レスポンス
     """
-    logger.info(f"Received event: {json.dumps(event)}")
+    begin_invocation(context, debug=LOG_DEBUG_HEADER_ENABLED and get_header(event, 'X-Debug-Log') == '1')
+    begin_timings(SERVER_TIMING_ENABLED)
 
     try:
         http_method = event['httpMethod']
         path = event['path']
 
+        logger.info('Request %s %s', http_method, path)
+        logger.debug('Received event: %s', payload(event))
+
         # ルーティング
-        if path == '/health' and http_method == 'GET':
-            return health_check(event)
-        elif path == '/items' and http_method == 'GET':
-            return get_items(event)
-        elif path == '/items' and http_method == 'POST':
-            return create_item(event)
-        elif path.startswith('/items/') and http_method == 'GET':
-            return get_item(event)
-        elif path.startswith('/items/') and http_method == 'PUT':
-            return update_item(event)
-        elif path.startswith('/items/') and http_method == 'DELETE':
-            return delete_item(event)
-        else:
-            return create_response(404, {
+        route = resolve_route(http_method, path)
+        if route is None:
+            response = create_response(404, {
                 'error': 'Not found',
                 'message': f'Route not found: {http_method} {path}'
             })
+        else:
+            with span(f'route.{route.__name__}', method=http_method):
+                response = route(event)
+
+        return add_server_timing(response)
 
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error('Unexpected error: %s', e)
         logger.error(traceback.format_exc())
-        return create_response(500, {
+        return add_server_timing(create_response(500, {
             'error': 'Internal server error',
             'message': str(e)
-        })
+        }))
+    finally:
+        emit_cache_metrics()
+        end_timings()
+        end_invocation()
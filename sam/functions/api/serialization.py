@@ -0,0 +1,60 @@
+"""
+レスポンスボディのシリアライズ
+orjson はインストールされていれば使い、なければ標準ライブラリにフォールバックする
+"""
+
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    # Decimal は整数値なら int、それ以外は float（ddb_json と同じ表現）
+    if isinstance(obj, Decimal):
+        if obj == obj.to_integral_value():
+            return int(obj)
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def _orjson_dumps(obj):
+    try:
+        return orjson.dumps(obj, default=_default).decode('utf-8')
+    except orjson.JSONEncodeError:
+        # 64ビットを超える整数など orjson が扱えない値は標準ライブラリで処理
+        return _stdlib_dumps(obj)
+
+
+def get_serializer(name='auto'):
+    """
+    JSON シリアライザーを取得
+
+    Args:
+        name: 'auto'（orjson があれば orjson）/ 'orjson' / 'stdlib'
+
+    Returns:
+        tuple: (実際に使うバックエンド名, obj -> str の関数)
+
+    Raises:
+        ValueError: 未知のバックエンド名、または orjson が未インストールの場合
+    """
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+
+    if name == 'orjson':
+        if orjson is None:
+            raise ValueError('orjson is not installed')
+        return name, _orjson_dumps
+    if name == 'stdlib':
+        return name, _stdlib_dumps
+    raise ValueError(f'Unknown serializer: {name}')
@@ -0,0 +1,143 @@
+"""
+Streams レコードの冪等性管理
+処理済みの eventID をメモリとシングルテーブル上の台帳で記録する
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from botocore.exceptions import ClientError
+
+from tracing import span
+
+logger = logging.getLogger()
+
+# 台帳アイテムのキー
+LEDGER_PK_PREFIX = 'STREAM#'
+LEDGER_SK = 'PROCESSED'
+
+# BatchGetItem の1リクエストあたりの上限
+BATCH_GET_CHUNK_SIZE = 100
+BATCH_GET_MAX_RETRIES = 3
+
+
+class IdempotencyStore:
+    """
+    処理済みレコードの記録
+
+    ウォームコンテナ内では直近の eventID をメモリに保持し、
+    コンテナをまたぐ再試行に対しては台帳アイテム（PK=STREAM#<eventID>）を
+    条件付き PutItem で書き込む。台帳は ExpiresAt（TTL）で自動削除される。
+
+    Args:
+        client_factory: DynamoDB 低レベルクライアントを返す関数（スレッドセーフ）
+        table_name: テーブル名
+        ttl_seconds: 台帳アイテムの保持期間（Streams の保持期間 24時間以上を推奨）
+        memory_size: メモリに保持する eventID の最大数
+    """
+
+    def __init__(self, client_factory, table_name, ttl_seconds=86400, memory_size=10000):
+        self.client_factory = client_factory
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+        self.memory_size = memory_size
+
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ledger_key(event_id):
+        return {
+            'PK': {'S': f'{LEDGER_PK_PREFIX}{event_id}'},
+            'SK': {'S': LEDGER_SK}
+        }
+
+    def _remember(self, event_id):
+        with self._lock:
+            self._recent[event_id] = True
+            self._recent.move_to_end(event_id)
+            while len(self._recent) > self.memory_size:
+                self._recent.popitem(last=False)
+
+    def find_processed(self, event_ids):
+        """
+        処理済みの eventID を取得
+
+        メモリにないものだけを台帳から BatchGetItem でまとめて確認する。
+        台帳の読み取りに失敗した場合は未処理として扱う（重複処理は許容し、取りこぼさない）。
+
+        Args:
+            event_ids: 確認する eventID のリスト
+
+        Returns:
+            set: 処理済みの eventID
+        """
+        with self._lock:
+            processed = {event_id for event_id in event_ids if event_id in self._recent}
+
+        unknown = list(dict.fromkeys(event_id for event_id in event_ids if event_id not in processed))
+        if not unknown:
+            return processed
+
+        client = self.client_factory()
+        for start in range(0, len(unknown), BATCH_GET_CHUNK_SIZE):
+            request_items = {
+                self.table_name: {
+                    'Keys': [self._ledger_key(event_id) for event_id in unknown[start:start + BATCH_GET_CHUNK_SIZE]],
+                    'ProjectionExpression': 'PK'
+                }
+            }
+            try:
+                for _ in range(BATCH_GET_MAX_RETRIES):
+                    with span('dynamodb.batch_get_item', purpose='idempotency'):
+                        response = client.batch_get_item(RequestItems=request_items)
+                    for item in response.get('Responses', {}).get(self.table_name, []):
+                        event_id = item['PK']['S'][len(LEDGER_PK_PREFIX):]
+                        processed.add(event_id)
+                        self._remember(event_id)
+
+                    request_items = response.get('UnprocessedKeys')
+                    if not request_items:
+                        break
+            except Exception as e:
+                logger.warning('Failed to read idempotency ledger: %s', e)
+
+        return processed
+
+    def mark_processed(self, event_id, sequence_number=None):
+        """
+        eventID を処理済みとして記録
+
+        Returns:
+            bool: 新たに記録した場合 True、既に記録済みだった場合 False
+        """
+        self._remember(event_id)
+
+        now = int(time.time())
+        item = {
+            **self._ledger_key(event_id),
+            'ProcessedAt': {'N': str(now)},
+            'ExpiresAt': {'N': str(now + self.ttl_seconds)}
+        }
+        if sequence_number is not None:
+            item['SequenceNumber'] = {'S': sequence_number}
+
+        try:
+            with span('dynamodb.put_item', purpose='idempotency'):
+                self.client_factory().put_item(
+                    TableName=self.table_name,
+                    Item=item,
+                    ConditionExpression='attribute_not_exists(PK)'
+                )
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                logger.info('Record %s was already marked as processed', event_id)
+                return False
+            logger.warning('Failed to write idempotency ledger: %s', e)
+        except Exception as e:
+            # 処理自体は成功しているため、台帳の書き込み失敗では再試行させない
+            logger.warning('Failed to write idempotency ledger: %s', e)
+        return True
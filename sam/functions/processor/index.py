@@ -5,117 +5,321 @@ DynamoDB Streams イベント処理
 
 import json
 import os
-import logging
-from datetime import datetime
-import boto3
+import random
+import time
+import zlib
+import base64
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait
 from decimal import Decimal
 
+import aws_clients
+from aggregates import AggregateCounters
+from ddb_json import serialize_item
+from idempotency import IdempotencyStore
+from metrics import MetricsAggregator
+from search_index import SEARCH_PK_PREFIX, WEIGHT_ATTRIBUTE, diff_postings, posting_key
+from stream_image import LazyImage, deserialize_image
+from structured_logging import begin_invocation, configure_logging, end_invocation, lazy, payload
+from tracing import bind, span
+
 # ========================================
 # ロガー設定
 # ========================================
 
-logger = logging.getLogger()
-log_level = os.environ.get('LOG_LEVEL', 'INFO')
-logger.setLevel(log_level)
+# JSON 形式で出力（LOG_FORMAT / LOG_SAMPLE_RATES などは structured_logging を参照）
+# 画像データは DEBUG でのみ、出力時に整形する
+logger = configure_logging()
 
 # ========================================
 # AWS クライアント
 # ========================================
 
-# CloudWatch Metricsへの記録用（オプション）
-cloudwatch = boto3.client('cloudwatch')
+# クライアントは初回利用時に生成し、ウォームコンテナ内で再利用する
+table_name = os.environ.get('DYNAMODB_TABLE')
 environment = os.environ.get('ENVIRONMENT', 'dev')
 
+
+def get_table():
+    """DynamoDB テーブルリソースを取得（メインスレッドからのみ使用）"""
+    return aws_clients.get_table(table_name)
+
+
+# メトリクスは呼び出し中に集約し、呼び出しごとに1回だけ送信する
+# METRICS_MODE=emf: 標準出力に EMF で出力（API呼び出しなし）
+# METRICS_MODE=api: PutMetricData をまとめて1回呼び出す
+metrics = MetricsAggregator(
+    namespace=os.environ.get('METRICS_NAMESPACE', 'TerraformSAMDemo'),
+    default_dimensions={'Environment': environment},
+    mode=os.environ.get('METRICS_MODE', 'emf'),
+    # CloudWatch Metricsへの記録用（METRICS_MODE=api の場合のみ生成）
+    client_factory=lambda: aws_clients.get_client('cloudwatch')
+)
+
+# API Lambda の読み取りキャッシュ無効化用バージョンスタンプ
+CACHE_STAMP_KEY = {'PK': 'SYSTEM#CACHE', 'SK': 'STAMPS'}
+CACHE_STAMP_SLOTS = int(os.environ.get('CACHE_STAMP_SLOTS', 256))
+PUBLISH_CACHE_STAMPS = os.environ.get('PUBLISH_CACHE_STAMPS', 'true').lower() == 'true'
+
+# ========================================
+# 冪等性（処理済みレコードのスキップ）
+# ========================================
+
+IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+
+idempotency = IdempotencyStore(
+    # ワーカースレッドから使うためスレッドセーフな低レベルクライアントを使う
+    client_factory=lambda: aws_clients.get_client('dynamodb'),
+    table_name=table_name,
+    ttl_seconds=int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400)),
+    memory_size=int(os.environ.get('IDEMPOTENCY_MEMORY_SIZE', 10000))
+)
+
+# Processor 自身が書き込む内部アイテム（台帳・キャッシュスタンプ・集計・検索インデックス）のキー接頭辞
+# これらの変更もストリームに流れるため、処理すると書き込みが連鎖する
+# 通常はイベントソースマッピングの FilterCriteria（ITEM# のみ）で呼び出し前に除かれる。
+# ここではフィルターのない環境（ローカル実行・手動設定）向けに同じレコードを読み飛ばす
+INTERNAL_PK_PREFIXES = ('STREAM#', 'SYSTEM#', 'STATS#', SEARCH_PK_PREFIX)
+
+# EntityType / Status / 作成日ごとの件数（バッチごとにまとめて ADD 更新）
+aggregates = AggregateCounters()
+
+# 画像データを参照された属性だけ変換するか
+LAZY_STREAM_IMAGES = os.environ.get('LAZY_STREAM_IMAGES', 'false').lower() == 'true'
+
+# ========================================
+# 全文検索インデックス
+# ========================================
+
+# Name / Description のポスティング（PK=SEARCH#<トークン>）を更新するか
+SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+# 1アイテムあたりのトークン数の上限（重みの大きい順に残す）
+SEARCH_MAX_TERMS_PER_ITEM = int(os.environ.get('SEARCH_MAX_TERMS_PER_ITEM', 256))
+
+# BatchWriteItem の1リクエストあたりの上限
+BATCH_WRITE_CHUNK_SIZE = 25
+
+# UnprocessedItems の再試行（Full Jitter 指数バックオフ）
+BATCH_WRITE_MAX_RETRIES = 5
+BATCH_BACKOFF_BASE_SECONDS = 0.05
+BATCH_BACKOFF_MAX_SECONDS = 1.0
+
+# ========================================
+# 並行処理設定
+# ========================================
+
+# パーティションキー（PK）ごとのグループを並行処理するスレッド数（1 で逐次処理）
+PROCESSOR_CONCURRENCY = int(os.environ.get('PROCESSOR_CONCURRENCY', 8))
+
+# 1レコードの処理に見込む時間。残り時間がこれを下回るレコードは開始せず再試行に回す
+RECORD_TIMEOUT_MS = int(os.environ.get('RECORD_TIMEOUT_MS', 1000))
+
+# Lambda のタイムアウト前に結果を返すための余裕
+TIMEOUT_SAFETY_MARGIN_MS = int(os.environ.get('TIMEOUT_SAFETY_MARGIN_MS', 2000))
+
 # ========================================
 # ヘルパー関数
 # ========================================
 
 class DecimalEncoder(json.JSONEncoder):
-    """DynamoDB Decimal型をJSONシリアライズ可能にする"""
+    """DynamoDB Decimal型・セット型・バイナリ型をJSONシリアライズ可能にする"""
     def default(self, obj):
         if isinstance(obj, Decimal):
             return float(obj)
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        if isinstance(obj, bytes):
+            return base64.b64encode(obj).decode('ascii')
+        if isinstance(obj, Mapping):
+            return dict(obj)
         return super(DecimalEncoder, self).default(obj)
 
 
-def parse_dynamodb_image(image):
+def parse_dynamodb_image(image, lazy=None):
     """
     DynamoDB Streams の画像データをパース
 
     Args:
         image: DynamoDB画像データ
+        lazy: True の場合は参照された属性だけ変換する LazyImage を返す
+              （None の場合は LAZY_STREAM_IMAGES に従う）
 
     Returns:
-        dict: パースされたデータ
+        dict | LazyImage: パースされたデータ
     """
     if not image:
         return None
 
-    result = {}
-    for key, value in image.items():
-        # DynamoDB型からPython型に変換
-        if 'S' in value:
-            result[key] = value['S']
-        elif 'N' in value:
-            result[key] = Decimal(value['N'])
-        elif 'BOOL' in value:
-            result[key] = value['BOOL']
-        elif 'M' in value:
-            result[key] = parse_dynamodb_image(value['M'])
-        elif 'L' in value:
-            result[key] = [parse_dynamodb_image({'item': item})['item'] for item in value['L']]
-        elif 'NULL' in value:
-            result[key] = None
+    if lazy is None:
+        lazy = LAZY_STREAM_IMAGES
 
-    return result
+    if lazy:
+        return LazyImage(image)
+    return deserialize_image(image)
 
 
-def send_metric(metric_name, value, unit='Count'):
+def send_metric(metric_name, value, unit='Count', buffer=None):
     """
-    CloudWatch Metrics に メトリクスを送信
+    メトリクスを集約バッファに記録（送信は flush_metrics で行う）
 
     Args:
         metric_name: メトリクス名
         value: 値
         unit: 単位
+        buffer: 記録先（レコード単位のバッファ。省略時は呼び出し全体の metrics）
+    """
+    (metrics if buffer is None else buffer).add(metric_name, value, unit)
+    logger.debug('Recorded metric: %s = %s', metric_name, value)
+
+
+def flush_metrics():
+    """集約したメトリクスを送信"""
+    try:
+        with span('metrics.flush'):
+            sent = metrics.flush()
+        logger.debug('Flushed %s metrics', sent)
+    except Exception as e:
+        logger.error('Failed to send metrics: %s', e)
+
+
+def flush_aggregates():
+    """
+    バッチ内で集約した件数の増減を集計アイテムに書き込む
+
+    失敗した場合はカウンターがずれるが、定期メンテナンスで再計算して補正する。
     """
     try:
-        cloudwatch.put_metric_data(
-            Namespace='TerraformSAMDemo',
-            MetricData=[
-                {
-                    'MetricName': metric_name,
-                    'Value': value,
-                    'Unit': unit,
-                    'Timestamp': datetime.utcnow(),
-                    'Dimensions': [
-                        {
-                            'Name': 'Environment',
-                            'Value': environment
-                        }
-                    ]
-                }
-            ]
-        )
-        logger.debug(f"Sent metric: {metric_name} = {value}")
+        with span('aggregates.flush'):
+            updated = aggregates.flush(get_table(), int(time.time()))
+        logger.debug('Updated %s aggregate items', updated)
     except Exception as e:
-        logger.error(f"Failed to send metric: {str(e)}")
+        logger.error('Failed to update aggregates: %s', e)
+        send_metric('AggregateUpdateErrors', 1)
+
+
+def publish_cache_stamps(changed_items):
+    """
+    変更・削除されたアイテムのバージョンスタンプを公開
+
+    API Lambda の読み取りキャッシュはスタンプのスロットが更新されると該当エントリを破棄する。
+    バッチ内の変更はスロット単位に集約し、1回の UpdateItem で書き込む。
+    スロットのハッシュ関数は API Lambda（cache.stamp_slot）と揃えること。
+
+    Args:
+        changed_items: {アイテムID: 変更時刻(UNIX秒)}
+    """
+    if not PUBLISH_CACHE_STAMPS or not changed_items:
+        return
+
+    slots = {}
+    for item_id, changed_at in changed_items.items():
+        slot = zlib.crc32(item_id.encode('utf-8')) % CACHE_STAMP_SLOTS
+        slots[slot] = max(slots.get(slot, 0), changed_at)
+
+    update_expression_parts = []
+    expression_attribute_names = {}
+    expression_attribute_values = {}
+    for i, (slot, changed_at) in enumerate(sorted(slots.items())):
+        update_expression_parts.append(f'#s{i} = :s{i}')
+        expression_attribute_names[f'#s{i}'] = f'Slot{slot:03d}'
+        expression_attribute_values[f':s{i}'] = Decimal(str(changed_at))
+
+    try:
+        with span('dynamodb.update_item', purpose='cache_stamps'):
+            get_table().update_item(
+                Key=CACHE_STAMP_KEY,
+                UpdateExpression='SET ' + ', '.join(update_expression_parts),
+                ExpressionAttributeNames=expression_attribute_names,
+                ExpressionAttributeValues=expression_attribute_values
+            )
+        logger.debug('Published cache stamps for %s items (%s slots)', len(changed_items), len(slots))
+    except Exception as e:
+        # 失敗しても API 側のキャッシュは TTL で失効するため処理は継続
+        logger.error('Failed to publish cache stamps: %s', e)
+
+
+def write_postings(write_requests):
+    """
+    ポスティングの PutRequest / DeleteRequest を書き込む（UnprocessedItems は再試行）
+
+    Raises:
+        RuntimeError: 再試行後も未処理のリクエストが残った場合
+    """
+    client = aws_clients.get_client('dynamodb')
+
+    for start in range(0, len(write_requests), BATCH_WRITE_CHUNK_SIZE):
+        pending = write_requests[start:start + BATCH_WRITE_CHUNK_SIZE]
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            with span('dynamodb.batch_write_item', purpose='search_postings', requests=len(pending)):
+                response = client.batch_write_item(RequestItems={table_name: pending})
+            pending = response.get('UnprocessedItems', {}).get(table_name, [])
+            if not pending:
+                break
+            if attempt < BATCH_WRITE_MAX_RETRIES:
+                cap = min(BATCH_BACKOFF_MAX_SECONDS, BATCH_BACKOFF_BASE_SECONDS * (2 ** attempt))
+                time.sleep(random.uniform(0, cap))
+        else:
+            raise RuntimeError(f"{len(pending)} search postings were not written")
+
+
+def update_search_index(old_image, new_image, record_metrics=None):
+    """
+    Name / Description の変更を検索インデックスに反映
+
+    変更前後のトークンの差分だけを書き込む。書き込みは冪等なため、失敗した場合は
+    例外を送出してレコードごと再試行させる。
+
+    Args:
+        old_image: 変更前のアイテム（INSERT の場合は None）
+        new_image: 変更後のアイテム（REMOVE の場合は None）
+        record_metrics: メトリクスの記録先（レコード単位のバッファ）
+
+    Returns:
+        int: 書き込んだポスティング数
+    """
+    if not SEARCH_INDEX_ENABLED:
+        return 0
+
+    item_id = (new_image or old_image or {}).get('ItemId')
+    if not item_id:
+        return 0
+
+    puts, deletes = diff_postings(old_image, new_image, SEARCH_MAX_TERMS_PER_ITEM)
+
+    write_requests = [
+        {'PutRequest': {'Item': serialize_item(dict(posting_key(term, item_id), **{WEIGHT_ATTRIBUTE: weight}))}}
+        for term, weight in puts.items()
+    ]
+    write_requests.extend(
+        {'DeleteRequest': {'Key': serialize_item(posting_key(term, item_id))}}
+        for term in deletes
+    )
+    if not write_requests:
+        return 0
+
+    write_postings(write_requests)
+    send_metric('SearchPostingsWritten', len(write_requests), buffer=record_metrics)
+    logger.debug('Updated search index for %s: %s put, %s deleted', item_id, len(puts), len(deletes))
+    return len(write_requests)
 
 
 # ========================================
 # イベント処理ハンドラー
 # ========================================
 
-def process_insert_event(record):
+def process_insert_event(record, counters, record_metrics=None):
     """
     INSERT イベント処理
 
     Args:
         record: DynamoDB Streams レコード
+        counters: このレコードの集計カウンターの増減を記録するバッファ
+        record_metrics: このレコードのメトリクスを記録するバッファ
     """
     new_image = parse_dynamodb_image(record['dynamodb'].get('NewImage', {}))
 
-    logger.info(f"Processing INSERT event: {json.dumps(new_image, cls=DecimalEncoder)}")
+    logger.debug('Processing INSERT event: %s', payload(new_image))
 
     # 新規アイテムに対する処理を実装
     # 例: 通知送信、別システムへの連携、集計処理など
@@ -124,14 +328,19 @@ def process_insert_event(record):
 
     if entity_type == 'Item':
         # アイテム作成時の処理
-        logger.info(f"New item created: {new_image.get('ItemId')}")
+        logger.info('New item created: %s', new_image.get('ItemId'))
 
         # メトリクス送信
-        send_metric('ItemsCreated', 1)
+        send_metric('ItemsCreated', 1, buffer=record_metrics)
 
-        # 追加の処理（例: 通知、検索インデックス更新など）
+        # 検索インデックス更新
+        update_search_index(None, new_image, record_metrics)
+
+        # 追加の処理（例: 通知など）
         # send_notification(new_image)
-        # update_search_index(new_image)
+
+    # 集計カウンター（書き込みはバッチ単位）
+    counters.add_item(new_image, 1)
 
     return {
         'status': 'success',
@@ -140,48 +349,57 @@ def process_insert_event(record):
     }
 
 
-def process_modify_event(record):
+def process_modify_event(record, counters, record_metrics=None):
     """
     MODIFY イベント処理
 
     Args:
         record: DynamoDB Streams レコード
+        counters: このレコードの集計カウンターの増減を記録するバッファ
+        record_metrics: このレコードのメトリクスを記録するバッファ
     """
     old_image = parse_dynamodb_image(record['dynamodb'].get('OldImage', {}))
     new_image = parse_dynamodb_image(record['dynamodb'].get('NewImage', {}))
 
-    logger.info(f"Processing MODIFY event")
-    logger.debug(f"Old: {json.dumps(old_image, cls=DecimalEncoder)}")
-    logger.debug(f"New: {json.dumps(new_image, cls=DecimalEncoder)}")
+    logger.debug('Processing MODIFY event: old=%s new=%s', payload(old_image), payload(new_image))
 
     # 変更内容の分析
     changed_fields = []
     for key in new_image.keys():
         if key in old_image and old_image[key] != new_image[key]:
             changed_fields.append(key)
-            logger.info(f"Field changed: {key} = {old_image[key]} -> {new_image[key]}")
+
+    logger.debug('Field changes: %s', lazy(lambda: payload({
+        key: {'old': old_image[key], 'new': new_image[key]} for key in changed_fields
+    })))
 
     entity_type = new_image.get('EntityType')
 
     if entity_type == 'Item':
         # アイテム更新時の処理
-        logger.info(f"Item updated: {new_image.get('ItemId')}")
-        logger.info(f"Changed fields: {changed_fields}")
+        logger.info('Item updated: %s (changed fields: %s)', new_image.get('ItemId'), changed_fields)
 
         # メトリクス送信
-        send_metric('ItemsModified', 1)
+        send_metric('ItemsModified', 1, buffer=record_metrics)
 
         # ステータス変更の検出
         if 'Status' in changed_fields:
             old_status = old_image.get('Status')
             new_status = new_image.get('Status')
-            logger.info(f"Status changed: {old_status} -> {new_status}")
+            logger.info('Status changed: %s -> %s', old_status, new_status)
 
             # ステータスに応じた処理
             if new_status == 'inactive':
                 logger.info("Item deactivated")
                 # 非アクティブ化時の処理
 
+        # 検索インデックス更新（Name / Description が変わっていなければ書き込みなし）
+        update_search_index(old_image, new_image, record_metrics)
+
+    # 集計カウンター（書き込みはバッチ単位）
+    if 'Status' in changed_fields:
+        counters.add_status_change(entity_type, old_image.get('Status'), new_image.get('Status'))
+
     return {
         'status': 'success',
         'event_type': 'MODIFY',
@@ -190,29 +408,37 @@ def process_modify_event(record):
     }
 
 
-def process_remove_event(record):
+def process_remove_event(record, counters, record_metrics=None):
     """
     REMOVE イベント処理
 
     Args:
         record: DynamoDB Streams レコード
+        counters: このレコードの集計カウンターの増減を記録するバッファ
+        record_metrics: このレコードのメトリクスを記録するバッファ
     """
     old_image = parse_dynamodb_image(record['dynamodb'].get('OldImage', {}))
 
-    logger.info(f"Processing REMOVE event: {json.dumps(old_image, cls=DecimalEncoder)}")
+    logger.debug('Processing REMOVE event: %s', payload(old_image))
 
     entity_type = old_image.get('EntityType')
 
     if entity_type == 'Item':
         # アイテム削除時の処理
-        logger.info(f"Item deleted: {old_image.get('ItemId')}")
+        logger.info('Item deleted: %s', old_image.get('ItemId'))
 
         # メトリクス送信
-        send_metric('ItemsDeleted', 1)
+        send_metric('ItemsDeleted', 1, buffer=record_metrics)
+
+        # 検索インデックスから削除
+        update_search_index(old_image, None, record_metrics)
 
         # 削除に伴うクリーンアップ処理
         # cleanup_related_resources(old_image)
 
+    # 集計カウンター（書き込みはバッチ単位）
+    counters.add_item(old_image, -1)
+
     return {
         'status': 'success',
         'event_type': 'REMOVE',
@@ -224,77 +450,295 @@ def process_remove_event(record):
 # Lambda Handler
 # ========================================
 
-def lambda_handler(event, context):
+def process_record(record, counters, record_metrics=None):
     """
-    Lambda エントリーポイント
+    1レコードをイベントタイプに応じて処理
 
     Args:
-        event: DynamoDB Streams イベント
-        context: Lambda コンテキスト
+        record: DynamoDB Streams レコード
+        counters: 集計カウンターの増減を記録するバッファ（結果を採用した場合のみバッチに加算する）
+        record_metrics: メトリクスを記録するバッファ（同上）
 
     Returns:
         dict: 処理結果
     """
-    logger.info(f"Processing {len(event['Records'])} records")
+    event_name = record['eventName']
+    logger.debug('Processing event: %s', event_name)
+
+    # イベントタイプに応じた処理
+    if event_name == 'INSERT':
+        return process_insert_event(record, counters, record_metrics)
+    elif event_name == 'MODIFY':
+        return process_modify_event(record, counters, record_metrics)
+    elif event_name == 'REMOVE':
+        return process_remove_event(record, counters, record_metrics)
+
+    logger.warning('Unknown event type: %s', event_name)
+    return {
+        'status': 'skipped',
+        'event_type': event_name
+    }
 
-    results = []
-    successful_count = 0
-    failed_count = 0
 
-    for record in event['Records']:
-        try:
-            event_name = record['eventName']
-            logger.info(f"Processing event: {event_name}")
-
-            # イベントタイプに応じた処理
-            if event_name == 'INSERT':
-                result = process_insert_event(record)
-            elif event_name == 'MODIFY':
-                result = process_modify_event(record)
-            elif event_name == 'REMOVE':
-                result = process_remove_event(record)
-            else:
-                logger.warning(f"Unknown event type: {event_name}")
-                result = {
-                    'status': 'skipped',
-                    'event_type': event_name
-                }
-
-            results.append(result)
-            successful_count += 1
+def is_internal_record(record):
+    """Processor 自身が書き込んだ内部アイテムのレコードかどうか"""
+    pk = record.get('dynamodb', {}).get('Keys', {}).get('PK', {}).get('S', '')
+    return pk.startswith(INTERNAL_PK_PREFIXES)
+
+
+def group_records_by_key(records):
+    """
+    レコードをパーティションキー（PK）ごとにグループ化
+
+    グループ内はストリームの順序を保つ。キーを持たないレコードは単独のグループにする。
+
+    Returns:
+        list: レコード位置のリストのリスト
+    """
+    groups = {}
+    for position, record in enumerate(records):
+        pk = record.get('dynamodb', {}).get('Keys', {}).get('PK', {}).get('S')
+        groups.setdefault(pk if pk is not None else ('position', position), []).append(position)
+    return list(groups.values())
+
+
+class BatchOutcomes:
+    """
+    位置ごとの処理結果の収集
+
+    close() で結果を確定した後に届いた結果は記録しない。レコードの集計カウンターの増減と
+    メトリクスは結果と同時にバッチのバッファ（aggregates / metrics）へ加算するため、
+    打ち切り後も処理を続けたワーカーの分が後の呼び出しの flush に混ざることはない。
+    """
 
+    def __init__(self, size):
+        self._outcomes = [None] * size
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def record(self, position, outcome, counters=None, record_metrics=None):
+        """
+        結果を記録
+
+        Returns:
+            bool: 記録した場合 True、既に確定済みで破棄した場合 False
+        """
+        with self._lock:
+            if self.closed:
+                return False
+            self._outcomes[position] = outcome
+            if counters is not None:
+                aggregates.merge(counters)
+            if record_metrics is not None:
+                metrics.merge(record_metrics)
+            return True
+
+    def close(self):
+        """結果を確定して返す（未処理は None）"""
+        with self._lock:
+            self.closed = True
+            return list(self._outcomes)
+
+
+def process_record_group(records, positions, outcomes, deadline, processed_ids=frozenset()):
+    """
+    同じキーのレコードを順番に処理
+
+    失敗したレコード以降は同じキーの順序を守るため処理しない。
+    残り時間が RECORD_TIMEOUT_MS を下回った場合や、呼び出し元が結果を確定した場合も
+    処理を打ち切る（未処理は再試行される）。冪等性台帳・集計・メトリクスには
+    結果が採用されたレコードの分のみ反映する。
+
+    Args:
+        records: バッチ内の全レコード
+        positions: このグループのレコード位置
+        outcomes: 処理結果の収集先（BatchOutcomes、('success', result) / ('failed', error)）
+        deadline: 処理を打ち切る時刻（time.monotonic 基準）
+        processed_ids: 処理済みの eventID（スキップする）
+    """
+    for index, position in enumerate(positions):
+        if outcomes.closed or time.monotonic() + RECORD_TIMEOUT_MS / 1000 > deadline:
+            logger.warning('Time budget exhausted, deferring %d records', len(positions) - index)
+            return
+
+        record = records[position]
+
+        if is_internal_record(record):
+            outcomes.record(position, ('success', {'status': 'skipped', 'event_type': record.get('eventName')}))
+            continue
+
+        # メトリクスも集計カウンターと同様に、結果を採用した場合のみ呼び出しのバッファに加える
+        record_metrics = metrics.buffer()
+
+        event_id = record.get('eventID')
+        if event_id in processed_ids:
+            logger.info('Skipping already processed record: %s', event_id)
+            send_metric('DuplicateRecordsSkipped', 1, buffer=record_metrics)
+            outcomes.record(
+                position, ('success', {'status': 'duplicate', 'event_type': record.get('eventName')}),
+                record_metrics=record_metrics
+            )
+            continue
+
+        started_at = time.perf_counter()
+        counters = AggregateCounters()
+        try:
+            with span(f"record.{record.get('eventName', 'UNKNOWN')}"):
+                result = process_record(record, counters, record_metrics)
         except Exception as e:
-            logger.error(f"Error processing record: {str(e)}")
-            logger.error(f"Record: {json.dumps(record)}")
+            logger.error('Error processing record: %s', e)
+            logger.error('Record: %s', payload(record))
             import traceback
             logger.error(traceback.format_exc())
 
-            results.append({
-                'status': 'failed',
-                'error': str(e)
-            })
-            failed_count += 1
-
             # エラーをメトリクスとして記録
-            send_metric('ProcessingErrors', 1)
+            send_metric('ProcessingErrors', 1, buffer=record_metrics)
+            record_metrics.observe('RecordProcessingTime', (time.perf_counter() - started_at) * 1000)
+
+            outcomes.record(position, ('failed', e), record_metrics=record_metrics)
+            return
+
+        record_metrics.observe('RecordProcessingTime', (time.perf_counter() - started_at) * 1000)
+        if not outcomes.record(position, ('success', result), counters, record_metrics):
+            # 打ち切り後に完了したレコードは再試行されるため、処理済みとして記録しない
+            return
+
+        if IDEMPOTENCY_ENABLED and event_id:
+            idempotency.mark_processed(event_id, record.get('dynamodb', {}).get('SequenceNumber'))
+
+
+def run_record_groups(records, groups, deadline, processed_ids=frozenset()):
+    """
+    レコードグループを処理（PROCESSOR_CONCURRENCY > 1 ならスレッドプールで並行処理）
+
+    Returns:
+        list: 位置ごとの処理結果（未処理は None）
+    """
+    outcomes = BatchOutcomes(len(records))
+
+    workers = min(PROCESSOR_CONCURRENCY, len(groups))
+    if workers <= 1:
+        for positions in groups:
+            process_record_group(records, positions, outcomes, deadline, processed_ids)
+        return outcomes.close()
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='record-group')
+    try:
+        futures = [
+            executor.submit(bind(process_record_group), records, positions, outcomes, deadline, processed_ids)
+            for positions in groups
+        ]
+        timeout = None if deadline == float('inf') else max(0.0, deadline - time.monotonic())
+        _, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            logger.warning('%d record groups did not finish within the time budget', len(not_done))
+    finally:
+        # 打ち切り後に完了した結果（と集計の増減）は使わない（未処理として再試行させる）
+        results = outcomes.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def process_batch(event, context):
+    """
+    Streams のバッチを処理
+
+    レコードをパーティションキーごとにグループ化し、グループ間は並行、
+    グループ内は順番に処理する。
+    失敗・未処理のレコードのうち最も前のもののシーケンス番号を batchItemFailures として返す
+    （イベントソースマッピングの ReportBatchItemFailures を使用）。
+    Streams はその位置からシャードを再試行する。
+
+    Args:
+        event: DynamoDB Streams イベント
+        context: Lambda コンテキスト
+
+    Returns:
+        dict: {'batchItemFailures': [{'itemIdentifier': シーケンス番号}]}
+    """
+    records = event['Records']
+    logger.info('Processing %s records', len(records))
+
+    if context is not None:
+        remaining_ms = context.get_remaining_time_in_millis() - TIMEOUT_SAFETY_MARGIN_MS
+        deadline = time.monotonic() + max(0, remaining_ms) / 1000
+    else:
+        deadline = float('inf')
+
+    # 再試行などで既に処理済みのレコードを、処理を始める前にまとめて確認
+    processed_ids = frozenset()
+    if IDEMPOTENCY_ENABLED:
+        processed_ids = idempotency.find_processed([
+            record['eventID'] for record in records
+            if record.get('eventID') and not is_internal_record(record)
+        ])
+
+    groups = group_records_by_key(records)
+    outcomes = run_record_groups(records, groups, deadline, processed_ids)
+
+    successful_count = 0
+    first_retry_position = None
+    changed_items = {}
+
+    for position, (record, outcome) in enumerate(zip(records, outcomes)):
+        if outcome is None or outcome[0] == 'failed':
+            if first_retry_position is None:
+                first_retry_position = position
+            continue
+
+        successful_count += 1
+        result = outcome[1]
+
+        # 変更・削除されたアイテムはキャッシュ無効化の対象
+        if record['eventName'] in ('MODIFY', 'REMOVE') and result.get('entity_type') == 'Item':
+            item_id = record['dynamodb']['Keys']['PK']['S'][len('ITEM#'):]
+            changed_at = float(record['dynamodb'].get('ApproximateCreationDateTime', time.time()))
+            changed_items[item_id] = max(changed_items.get(item_id, 0), changed_at)
+
+    publish_cache_stamps(changed_items)
+    flush_aggregates()
+
+    batch_item_failures = []
+    if first_retry_position is not None:
+        sequence_number = records[first_retry_position].get('dynamodb', {}).get('SequenceNumber')
+        if sequence_number is None:
+            # 再試行位置を特定できないためバッチ全体を失敗させる
+            flush_metrics()
+            raise RuntimeError(f"Record at position {first_retry_position} failed and has no SequenceNumber")
+
+        batch_item_failures.append({'itemIdentifier': sequence_number})
+
+        # 失敗位置以降のレコードはまとめて再試行される
+        send_metric('RecordsRetried', len(records) - first_retry_position)
 
     # 処理結果のメトリクス送信
     send_metric('RecordsProcessed', successful_count)
+    flush_metrics()
 
-    logger.info(f"Processing complete: {successful_count} successful, {failed_count} failed")
+    logger.info(
+        'Processing complete: %s successful, %s not completed, %s key groups',
+        successful_count, len(records) - successful_count, len(groups)
+    )
 
     return {
-        'statusCode': 200,
-        'body': json.dumps({
-            'message': 'Processing complete',
-            'total_records': len(event['Records']),
-            'successful': successful_count,
-            'failed': failed_count,
-            'results': results
-        }, cls=DecimalEncoder)
+        'batchItemFailures': batch_item_failures
     }
 
 
+def lambda_handler(event, context):
+    """
+    Lambda エントリーポイント
+
+    この呼び出しのログレベル（サンプリング・DEBUG 昇格）を決めてからバッチを処理する。
+    """
+    begin_invocation(context)
+    try:
+        return process_batch(event, context)
+    finally:
+        end_invocation()
+
+
 # ========================================
 # 高度な処理の例
 # ========================================
@@ -316,20 +760,6 @@ def send_notification(item):
     pass
 
 
-def update_search_index(item):
-    """
-    検索インデックス更新の例（OpenSearch、Elasticsearchなど）
-
-    Args:
-        item: DynamoDBアイテム
-    """
-    # OpenSearch への インデックス登録例
-    # from opensearchpy import OpenSearch
-    # client = OpenSearch([{'host': 'localhost', 'port': 9200}])
-    # client.index(index='items', id=item['ItemId'], body=item)
-    pass
-
-
 def cleanup_related_resources(item):
     """
     関連リソースのクリーンアップ例
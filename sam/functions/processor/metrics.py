@@ -0,0 +1,171 @@
+"""
+メトリクス集約
+呼び出し中のメトリクスをメモリ上で集約し、1回の呼び出しにつき1回だけ送信する
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+
+# PutMetricData の1リクエストあたりの最大データ数
+MAX_DATUMS_PER_REQUEST = 1000
+
+# EMF の1ドキュメントあたりの最大メトリクス数・1メトリクスあたりの最大値数
+MAX_EMF_METRICS_PER_DOCUMENT = 100
+MAX_EMF_VALUES_PER_METRIC = 100
+
+
+class MetricsAggregator:
+    """
+    カウンターとヒストグラム（統計セット）を集約するメトリクスバッファ
+
+    flush() の送信方式:
+        emf: CloudWatch Embedded Metric Format を標準出力に書き出す（API呼び出しなし）
+        api: PutMetricData を最大1000データ単位でまとめて呼び出す
+
+    Args:
+        namespace: CloudWatch Metrics の名前空間
+        default_dimensions: 全メトリクスに付与するディメンション（dict）
+        mode: 'emf' または 'api'
+        client_factory: api モードで使う CloudWatch クライアントを返す関数
+        writer: emf モードの出力先（既定は print）
+    """
+
+    def __init__(self, namespace, default_dimensions=None, mode='emf', client_factory=None, writer=print):
+        self.namespace = namespace
+        self.default_dimensions = dict(default_dimensions or {})
+        self.mode = mode
+        self.client_factory = client_factory
+        self.writer = writer
+
+        # (メトリクス名, 単位, ディメンション) -> 合計値
+        self._counters = {}
+        # (メトリクス名, 単位, ディメンション) -> 観測値のリスト
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name, unit, dimensions):
+        merged = dict(self.default_dimensions)
+        if dimensions:
+            merged.update(dimensions)
+        return name, unit, tuple(sorted(merged.items()))
+
+    def add(self, name, value=1, unit='Count', dimensions=None):
+        """カウンターに加算"""
+        key = self._key(name, unit, dimensions)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, unit='Milliseconds', dimensions=None):
+        """ヒストグラムに観測値を追加（レイテンシなど）"""
+        key = self._key(name, unit, dimensions)
+        with self._lock:
+            self._histograms.setdefault(key, []).append(value)
+
+    def buffer(self):
+        """同じ名前空間・ディメンションの空のバッファ（merge() で取り込む。自身は送信しない）"""
+        return MetricsAggregator(self.namespace, self.default_dimensions, self.mode)
+
+    def merge(self, other):
+        """別のバッファ（1レコード分など）のカウンターと観測値を加える"""
+        with other._lock:
+            counters = dict(other._counters)
+            histograms = {key: list(values) for key, values in other._histograms.items()}
+        with self._lock:
+            for key, value in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, values in histograms.items():
+                self._histograms.setdefault(key, []).extend(values)
+
+    def __len__(self):
+        return len(self._counters) + len(self._histograms)
+
+    def flush(self):
+        """
+        集約したメトリクスを送信してバッファをリセット
+
+        Returns:
+            int: 送信したメトリクス（名前・ディメンションの組）の数
+        """
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+
+        if not counters and not histograms:
+            return 0
+
+        if self.mode == 'api':
+            self._flush_api(counters, histograms)
+        else:
+            self._flush_emf(counters, histograms)
+
+        return len(counters) + len(histograms)
+
+    def _flush_emf(self, counters, histograms):
+        # ディメンションの組ごとに1つ以上の EMF ドキュメントを出力
+        by_dimensions = {}
+        for (name, unit, dimensions), value in counters.items():
+            by_dimensions.setdefault(dimensions, []).append((name, unit, value))
+        for (name, unit, dimensions), values in histograms.items():
+            for start in range(0, len(values), MAX_EMF_VALUES_PER_METRIC):
+                by_dimensions.setdefault(dimensions, []).append(
+                    (name, unit, values[start:start + MAX_EMF_VALUES_PER_METRIC])
+                )
+
+        timestamp = int(time.time() * 1000)
+        for dimensions, metrics in by_dimensions.items():
+            document = None
+            for name, unit, value in metrics:
+                # 同名メトリクスの分割や上限超過時は新しいドキュメントに書く
+                if document is None or name in document or len(document['_aws']['CloudWatchMetrics'][0]['Metrics']) >= MAX_EMF_METRICS_PER_DOCUMENT:
+                    if document is not None:
+                        self.writer(json.dumps(document))
+                    document = {
+                        '_aws': {
+                            'Timestamp': timestamp,
+                            'CloudWatchMetrics': [{
+                                'Namespace': self.namespace,
+                                'Dimensions': [[dimension for dimension, _ in dimensions]],
+                                'Metrics': []
+                            }]
+                        },
+                        **dict(dimensions)
+                    }
+                document['_aws']['CloudWatchMetrics'][0]['Metrics'].append({'Name': name, 'Unit': unit})
+                document[name] = value
+            self.writer(json.dumps(document))
+
+    def _flush_api(self, counters, histograms):
+        timestamp = datetime.utcnow()
+        metric_data = []
+
+        for (name, unit, dimensions), value in counters.items():
+            metric_data.append({
+                'MetricName': name,
+                'Value': value,
+                'Unit': unit,
+                'Timestamp': timestamp,
+                'Dimensions': [{'Name': k, 'Value': v} for k, v in dimensions]
+            })
+
+        for (name, unit, dimensions), values in histograms.items():
+            metric_data.append({
+                'MetricName': name,
+                'StatisticValues': {
+                    'SampleCount': len(values),
+                    'Sum': sum(values),
+                    'Minimum': min(values),
+                    'Maximum': max(values)
+                },
+                'Unit': unit,
+                'Timestamp': timestamp,
+                'Dimensions': [{'Name': k, 'Value': v} for k, v in dimensions]
+            })
+
+        client = self.client_factory()
+        for start in range(0, len(metric_data), MAX_DATUMS_PER_REQUEST):
+            client.put_metric_data(
+                Namespace=self.namespace,
+                MetricData=metric_data[start:start + MAX_DATUMS_PER_REQUEST]
+            )
@@ -0,0 +1,117 @@
+"""
+DynamoDB Streams 画像データのデシリアライザー
+型記述子ごとの変換関数テーブルで DynamoDB 型を Python 型に変換する
+"""
+
+import base64
+from collections.abc import Mapping
+from decimal import Decimal
+
+
+def _deserialize_list(values):
+    return [_deserialize(value) for value in values]
+
+
+def _deserialize_map(attributes):
+    return {key: _deserialize(value) for key, value in attributes.items()}
+
+
+def _deserialize_null(_):
+    return None
+
+
+def _identity(value):
+    return value
+
+
+# 型記述子 -> 変換関数
+# Streams イベントの B / BS は base64 文字列で渡される
+_DESERIALIZERS = {
+    'S': _identity,
+    'N': Decimal,
+    'BOOL': _identity,
+    'NULL': _deserialize_null,
+    'B': base64.b64decode,
+    'M': _deserialize_map,
+    'L': _deserialize_list,
+    'SS': set,
+    'NS': lambda values: {Decimal(value) for value in values},
+    'BS': lambda values: {base64.b64decode(value) for value in values},
+}
+
+
+def _deserialize(attribute_value):
+    # 最も多い S 型は関数呼び出しなしで返す
+    value = attribute_value.get('S')
+    if value is not None:
+        return value
+
+    # 属性値は必ず {型記述子: 値} の1要素 dict
+    type_descriptor = next(iter(attribute_value))
+    return _DESERIALIZERS[type_descriptor](attribute_value[type_descriptor])
+
+
+def deserialize_value(attribute_value):
+    """
+    DynamoDB 属性値を Python 型に変換
+
+    Raises:
+        KeyError: 未知の型記述子の場合
+    """
+    return _deserialize(attribute_value)
+
+
+def deserialize_image(image):
+    """
+    DynamoDB 画像データ全体を dict に変換
+
+    Args:
+        image: {属性名: 属性値} 形式の画像データ
+
+    Returns:
+        dict: 変換後のデータ
+    """
+    return {key: _deserialize(value) for key, value in image.items()}
+
+
+class LazyImage(Mapping):
+    """
+    参照された属性だけを変換する画像データ
+
+    ハンドラーが読む属性が一部だけの場合、大きなネストした属性の変換コストを省ける。
+    変換結果はキャッシュされ、同じ属性の再参照では再変換しない。
+    """
+
+    __slots__ = ('_raw', '_decoded')
+
+    def __init__(self, image):
+        self._raw = image
+        self._decoded = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._decoded[key]
+        except KeyError:
+            value = _deserialize(self._raw[key])
+            self._decoded[key] = value
+            return value
+
+    def __contains__(self, key):
+        return key in self._raw
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def to_dict(self):
+        """全属性を変換した dict を返す"""
+        decoded = self._decoded
+        return {
+            key: decoded[key] if key in decoded else _deserialize(value)
+            for key, value in self._raw.items()
+        }
+
+    def __repr__(self):
+        return f'LazyImage({list(self._raw)})'
@@ -0,0 +1,286 @@
+"""
+テーブルの NDJSON エクスポート
+並列 Scan（Segment / TotalSegments）の結果をパート単位でシンクに書き出す
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from ddb_json import deserialize_item
+
+logger = logging.getLogger()
+
+# シンク上のレイアウト（export_id ごと）
+#   <export_id>/segment-0000/part-00000.ndjson[.gz] : データ
+#   <export_id>/_checkpoints/segment-0000.json      : セグメントごとの再開位置
+#   <export_id>/_manifest.json                      : 全セグメント完了時のサマリー
+CHECKPOINT_DIR = '_checkpoints'
+MANIFEST_NAME = '_manifest.json'
+
+
+class LocalSink:
+    """
+    ローカルファイルシステムへの書き出し（テスト・開発用）
+
+    Args:
+        directory: 出力先ディレクトリ
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, key, data):
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 書きかけのファイルが見えないよう一時ファイルから置き換える
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def read(self, key):
+        try:
+            with open(os.path.join(self.directory, key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def __repr__(self):
+        return f'LocalSink({self.directory!r})'
+
+
+class S3Sink:
+    """
+    S3（互換ストレージ）への書き出し
+
+    S3 互換ストレージを使う場合は AWS_ENDPOINT_URL_S3 でエンドポイントを指定する。
+
+    Args:
+        client_factory: S3 クライアントを返す関数（スレッドセーフ）
+        bucket: バケット名
+        prefix: キーのプレフィックス
+    """
+
+    def __init__(self, client_factory, bucket, prefix=''):
+        self.client_factory = client_factory
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def write(self, key, data):
+        self.client_factory().put_object(Bucket=self.bucket, Key=f'{self.prefix}{key}', Body=data)
+
+    def read(self, key):
+        try:
+            response = self.client_factory().get_object(Bucket=self.bucket, Key=f'{self.prefix}{key}')
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+                return None
+            raise
+        return response['Body'].read()
+
+    def __repr__(self):
+        return f'S3Sink(s3://{self.bucket}/{self.prefix})'
+
+
+class TableExporter:
+    """
+    並列 Scan によるテーブルエクスポート
+
+    セグメントごとにワーカーが Scan を進め、バッファが part_bytes に達したページ境界で
+    パートを書き出してからチェックポイント（次の ExclusiveStartKey）を保存する。
+    同じ export_id で再実行するとチェックポイントから再開する。パートのキーは
+    決定的なため、チェックポイント保存前に中断しても同じパートが上書きされるだけになる。
+
+    Args:
+        client_factory: DynamoDB 低レベルクライアントを返す関数（スレッドセーフ）
+        table_name: テーブル名
+        sink: 出力先（LocalSink / S3Sink）
+        total_segments: 並列 Scan のセグメント数
+        max_workers: 同時に実行するセグメント数
+        part_bytes: 1パートの目安サイズ（圧縮前のバイト数）
+        compression: 'gzip' または 'none'
+        entity_type: 出力する EntityType（None の場合は全アイテム）
+        page_size: Scan の Limit（None の場合は 1MB ごと）
+    """
+
+    def __init__(self, client_factory, table_name, sink, total_segments=8, max_workers=8,
+                 part_bytes=8 * 1024 * 1024, compression='gzip', entity_type='Item', page_size=None):
+        if compression not in ('gzip', 'none'):
+            raise ValueError(f'Unsupported compression: {compression}')
+
+        self.client_factory = client_factory
+        self.table_name = table_name
+        self.sink = sink
+        self.total_segments = total_segments
+        self.max_workers = max(1, min(max_workers, total_segments))
+        self.part_bytes = part_bytes
+        self.compression = compression
+        self.entity_type = entity_type
+        self.page_size = page_size
+
+    def _part_key(self, export_id, segment, part):
+        suffix = '.ndjson.gz' if self.compression == 'gzip' else '.ndjson'
+        return f'{export_id}/segment-{segment:04d}/part-{part:05d}{suffix}'
+
+    @staticmethod
+    def _checkpoint_key(export_id, segment):
+        return f'{export_id}/{CHECKPOINT_DIR}/segment-{segment:04d}.json'
+
+    def load_checkpoint(self, export_id, segment):
+        """セグメントのチェックポイントを取得（未開始なら初期状態）"""
+        data = self.sink.read(self._checkpoint_key(export_id, segment))
+        if data is not None:
+            return json.loads(data)
+        return {
+            'segment': segment,
+            'total_segments': self.total_segments,
+            'last_evaluated_key': None,
+            'parts': [],
+            'items': 0,
+            'bytes': 0,
+            'done': False
+        }
+
+    def _save_checkpoint(self, export_id, checkpoint):
+        self.sink.write(
+            self._checkpoint_key(export_id, checkpoint['segment']),
+            json.dumps(checkpoint).encode('utf-8')
+        )
+
+    def _flush_part(self, export_id, checkpoint, lines):
+        data = ''.join(lines).encode('utf-8')
+        if self.compression == 'gzip':
+            data = gzip.compress(data, compresslevel=6)
+
+        key = self._part_key(export_id, checkpoint['segment'], len(checkpoint['parts']))
+        self.sink.write(key, data)
+
+        checkpoint['parts'].append(key)
+        checkpoint['items'] += len(lines)
+        checkpoint['bytes'] += len(data)
+
+    def export_segment(self, export_id, segment, deadline=float('inf'), stop_event=None):
+        """
+        1セグメントをエクスポート
+
+        Args:
+            export_id: エクスポートID（出力先のプレフィックス）
+            segment: セグメント番号
+            deadline: 打ち切り時刻（time.monotonic() 基準）
+            stop_event: 他のワーカーからの停止指示（threading.Event）
+
+        Returns:
+            dict: セグメントのチェックポイント
+        """
+        checkpoint = self.load_checkpoint(export_id, segment)
+        if checkpoint['done']:
+            return checkpoint
+        if checkpoint['total_segments'] != self.total_segments:
+            raise ValueError(
+                f"Export {export_id} was started with total_segments={checkpoint['total_segments']}"
+            )
+
+        client = self.client_factory()
+        scan_kwargs = {
+            'TableName': self.table_name,
+            'Segment': segment,
+            'TotalSegments': self.total_segments
+        }
+        if self.entity_type is not None:
+            scan_kwargs['FilterExpression'] = 'EntityType = :entity_type'
+            scan_kwargs['ExpressionAttributeValues'] = {':entity_type': {'S': self.entity_type}}
+        if self.page_size:
+            scan_kwargs['Limit'] = self.page_size
+
+        last_evaluated_key = checkpoint['last_evaluated_key']
+        lines = []
+        buffered = 0
+
+        while True:
+            # 残り時間がなければバッファを書き出して中断（次回はここから再開）
+            if time.monotonic() >= deadline or (stop_event is not None and stop_event.is_set()):
+                if lines:
+                    self._flush_part(export_id, checkpoint, lines)
+                checkpoint['last_evaluated_key'] = last_evaluated_key
+                self._save_checkpoint(export_id, checkpoint)
+                return checkpoint
+
+            if last_evaluated_key:
+                scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+            response = client.scan(**scan_kwargs)
+
+            for item in response.get('Items', []):
+                line = json.dumps(deserialize_item(item), ensure_ascii=False, separators=(',', ':')) + '\n'
+                lines.append(line)
+                buffered += len(line)
+
+            last_evaluated_key = response.get('LastEvaluatedKey')
+
+            if last_evaluated_key is None:
+                if lines:
+                    self._flush_part(export_id, checkpoint, lines)
+                checkpoint['last_evaluated_key'] = None
+                checkpoint['done'] = True
+                self._save_checkpoint(export_id, checkpoint)
+                return checkpoint
+
+            if buffered >= self.part_bytes:
+                self._flush_part(export_id, checkpoint, lines)
+                checkpoint['last_evaluated_key'] = last_evaluated_key
+                self._save_checkpoint(export_id, checkpoint)
+                lines = []
+                buffered = 0
+
+    def run(self, export_id, deadline=float('inf')):
+        """
+        全セグメントをワーカープールでエクスポート
+
+        全セグメントが完了した場合はマニフェストを書き出す。
+
+        Args:
+            export_id: エクスポートID
+            deadline: 打ち切り時刻（time.monotonic() 基準）
+
+        Returns:
+            dict: 実行結果のサマリー
+        """
+        stop_event = threading.Event()
+
+        def worker(segment):
+            try:
+                return self.export_segment(export_id, segment, deadline, stop_event)
+            except Exception:
+                # 1セグメントの失敗で他のセグメントも打ち切る（チェックポイントは各自保存済み）
+                stop_event.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            checkpoints = list(executor.map(worker, range(self.total_segments)))
+
+        summary = {
+            'export_id': export_id,
+            'complete': all(checkpoint['done'] for checkpoint in checkpoints),
+            'total_segments': self.total_segments,
+            'segments_done': sum(1 for checkpoint in checkpoints if checkpoint['done']),
+            'items': sum(checkpoint['items'] for checkpoint in checkpoints),
+            'parts': sum(len(checkpoint['parts']) for checkpoint in checkpoints),
+            'bytes': sum(checkpoint['bytes'] for checkpoint in checkpoints)
+        }
+
+        if summary['complete']:
+            manifest = dict(summary)
+            manifest['table_name'] = self.table_name
+            manifest['entity_type'] = self.entity_type
+            manifest['compression'] = self.compression
+            manifest['files'] = [key for checkpoint in checkpoints for key in checkpoint['parts']]
+            self.sink.write(f'{export_id}/{MANIFEST_NAME}', json.dumps(manifest, indent=2).encode('utf-8'))
+
+        logger.info('Export %s: %s', export_id, summary)
+        return summary
@@ -0,0 +1,271 @@
+"""
+Scheduled Lambda Function
+EventBridge スケジュールで実行する定期タスクのハンドラー
+"""
+
+import json
+import os
+import time
+import traceback
+from datetime import datetime, timezone
+
+import aws_clients
+from export import LocalSink, S3Sink, TableExporter
+from maintenance import AdaptiveRateLimiter, MaintenanceJob
+from structured_logging import begin_invocation, configure_logging, end_invocation, payload
+
+# ========================================
+# ロガー設定
+# ========================================
+
+# JSON 形式で出力（LOG_FORMAT / LOG_SAMPLE_RATES などは structured_logging を参照）
+logger = configure_logging()
+
+# ========================================
+# 設定
+# ========================================
+
+table_name = os.environ.get('DYNAMODB_TABLE')
+environment = os.environ.get('ENVIRONMENT', 'dev')
+
+# 残り実行時間がこれを下回ったら処理を打ち切る（チェックポイント保存の猶予）
+TIME_BUDGET_SAFETY_MARGIN_MS = int(os.environ.get('TIME_BUDGET_SAFETY_MARGIN_MS', 15000))
+
+# 時間切れで未完了の場合は自身を非同期で再呼び出しして続きを処理する
+REINVOKE_ENABLED = os.environ.get('REINVOKE_ENABLED', 'true').lower() == 'true'
+# 1回の実行（run）あたりの最大呼び出し回数（無限ループ防止）
+MAX_INVOCATIONS = int(os.environ.get('MAX_INVOCATIONS', 20))
+
+# ========================================
+# エクスポート設定
+# ========================================
+
+# エクスポート・アーカイブの出力先バケット
+# EXPORT_LOCAL_DIR はテスト用（明示した場合のみローカルに書き出す）。/tmp は実行環境の
+# 破棄とともに消えるため、どちらも未設定の場合はエクスポート・アーカイブを実行しない
+EXPORT_BUCKET = os.environ.get('EXPORT_BUCKET', '')
+EXPORT_PREFIX = os.environ.get('EXPORT_PREFIX', 'exports/')
+EXPORT_LOCAL_DIR = os.environ.get('EXPORT_LOCAL_DIR', '')
+
+EXPORT_TOTAL_SEGMENTS = int(os.environ.get('EXPORT_TOTAL_SEGMENTS', 8))
+EXPORT_MAX_WORKERS = int(os.environ.get('EXPORT_MAX_WORKERS', 8))
+EXPORT_PART_BYTES = int(os.environ.get('EXPORT_PART_BYTES', 8 * 1024 * 1024))
+EXPORT_COMPRESSION = os.environ.get('EXPORT_COMPRESSION', 'gzip')
+EXPORT_ENTITY_TYPE = os.environ.get('EXPORT_ENTITY_TYPE', 'Item')
+
+# ========================================
+# メンテナンス設定
+# ========================================
+
+MAINTENANCE_TOTAL_SEGMENTS = int(os.environ.get('MAINTENANCE_TOTAL_SEGMENTS', 8))
+MAINTENANCE_MAX_WORKERS = int(os.environ.get('MAINTENANCE_MAX_WORKERS', 8))
+
+# inactive アイテムの処理: none / archive（S3 に書き出してから削除、EXPORT_BUCKET が必要）/ purge（削除のみ）
+MAINTENANCE_INACTIVE_ACTION = os.environ.get('MAINTENANCE_INACTIVE_ACTION', 'none')
+MAINTENANCE_INACTIVE_DAYS = int(os.environ.get('MAINTENANCE_INACTIVE_DAYS', 90))
+MAINTENANCE_ARCHIVE_PREFIX = os.environ.get('MAINTENANCE_ARCHIVE_PREFIX', 'archive/')
+MAINTENANCE_BACKFILL_INDEX_KEYS = os.environ.get('MAINTENANCE_BACKFILL_INDEX_KEYS', 'true').lower() == 'true'
+# EntityShard の補完に使うシャード数（API と同じ値）
+ITEM_SHARD_COUNT = int(os.environ.get('ITEM_SHARD_COUNT', 8))
+MAINTENANCE_REPAIR_AGGREGATES = os.environ.get('MAINTENANCE_REPAIR_AGGREGATES', 'true').lower() == 'true'
+
+# 消費キャパシティの上限（ユニット/秒）。スロットリング時は自動的に下げる
+MAINTENANCE_MAX_READ_UNITS = float(os.environ.get('MAINTENANCE_MAX_READ_UNITS', 200))
+MAINTENANCE_MAX_WRITE_UNITS = float(os.environ.get('MAINTENANCE_MAX_WRITE_UNITS', 100))
+
+
+# ========================================
+# ヘルパー関数
+# ========================================
+
+def get_deadline(context):
+    """打ち切り時刻（time.monotonic() 基準）を取得"""
+    if context is None or not hasattr(context, 'get_remaining_time_in_millis'):
+        return float('inf')
+    remaining_ms = context.get_remaining_time_in_millis() - TIME_BUDGET_SAFETY_MARGIN_MS
+    return time.monotonic() + max(remaining_ms, 0) / 1000
+
+
+def get_export_sink(prefix=EXPORT_PREFIX):
+    """
+    エクスポート・アーカイブの出力先を取得
+
+    Raises:
+        ValueError: EXPORT_BUCKET（テストでは EXPORT_LOCAL_DIR）が設定されていない場合
+    """
+    if EXPORT_BUCKET:
+        return S3Sink(lambda: aws_clients.get_client('s3'), EXPORT_BUCKET, prefix)
+    if EXPORT_LOCAL_DIR:
+        return LocalSink(os.path.join(EXPORT_LOCAL_DIR, prefix))
+    raise ValueError('EXPORT_BUCKET is not configured')
+
+
+def reinvoke(event, context):
+    """
+    同じ関数を非同期で再呼び出しして未完了のタスクを続行
+
+    Returns:
+        bool: 再呼び出しした場合 True
+    """
+    invocation = int(event.get('invocation', 1))
+    if not REINVOKE_ENABLED or context is None:
+        return False
+    if invocation >= MAX_INVOCATIONS:
+        logger.warning('Task %s is still incomplete after %s invocations', event.get('task'), invocation)
+        return False
+
+    next_event = dict(event, invocation=invocation + 1)
+    aws_clients.get_client('lambda').invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(next_event).encode('utf-8')
+    )
+    logger.info('Re-invoked task %s (invocation %s)', event.get('task'), invocation + 1)
+    return True
+
+
+def resolve_run_id(event):
+    """
+    実行ID（エクスポートID・メンテナンスの実行ID）を決定
+
+    明示されていなければスケジュールの実行時刻（EventBridge の time）の日付を使う。
+    エクスポートは同じ日の再実行でチェックポイントから再開される。
+    """
+    export_id = event.get('export_id')
+    if export_id:
+        return export_id
+
+    scheduled_at = event.get('time')
+    if scheduled_at:
+        return scheduled_at[:10]
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+# ========================================
+# タスク
+# ========================================
+
+def run_export(event, context):
+    """
+    Item 全件を NDJSON でエクスポート
+
+    イベントで上書きできる設定:
+        export_id, total_segments, compression, entity_type
+    """
+    exporter = TableExporter(
+        client_factory=lambda: aws_clients.get_client('dynamodb'),
+        table_name=table_name,
+        sink=get_export_sink(),
+        total_segments=int(event.get('total_segments', EXPORT_TOTAL_SEGMENTS)),
+        max_workers=EXPORT_MAX_WORKERS,
+        part_bytes=EXPORT_PART_BYTES,
+        compression=event.get('compression', EXPORT_COMPRESSION),
+        entity_type=event.get('entity_type', EXPORT_ENTITY_TYPE)
+    )
+
+    export_id = resolve_run_id(event)
+    logger.info('Starting export %s to %s', export_id, exporter.sink)
+
+    summary = exporter.run(export_id, deadline=get_deadline(context))
+    if not summary['complete']:
+        summary['reinvoked'] = reinvoke(dict(event, export_id=export_id), context)
+    return summary
+
+
+def run_maintenance(event, context):
+    """
+    テーブルメンテナンス
+
+    inactive アイテムのアーカイブ・削除、インデックスキー（GSI1 / StatusIndex / EntityShardIndex）の補完を並列 Scan で行い、
+    全セグメントの走査が終わったら集計カウンターを再計算する。
+    時間切れの場合は state（セグメントごとの再開位置と途中の集計）を
+    イベントに載せて自身を再呼び出しする。
+
+    archive は書き出し先のバケットがなければ実行しない（削除したアイテムを復元できなくなるため）。
+    """
+    inactive_action = event.get('inactive_action', MAINTENANCE_INACTIVE_ACTION)
+    archive_sink = get_export_sink(MAINTENANCE_ARCHIVE_PREFIX) if inactive_action == 'archive' else None
+
+    job = MaintenanceJob(
+        client_factory=lambda: aws_clients.get_client('dynamodb'),
+        table_name=table_name,
+        total_segments=MAINTENANCE_TOTAL_SEGMENTS,
+        max_workers=MAINTENANCE_MAX_WORKERS,
+        inactive_action=inactive_action,
+        inactive_days=MAINTENANCE_INACTIVE_DAYS,
+        archive_sink=archive_sink,
+        backfill_index_keys=MAINTENANCE_BACKFILL_INDEX_KEYS,
+        shard_count=ITEM_SHARD_COUNT,
+        read_limiter=AdaptiveRateLimiter(MAINTENANCE_MAX_READ_UNITS),
+        write_limiter=AdaptiveRateLimiter(MAINTENANCE_MAX_WRITE_UNITS)
+    )
+
+    state = event.get('state')
+    if state is None:
+        # 集計は走査開始時点との差分で補正するため、走査の前に現在値を読み込む
+        baseline = job.snapshot_aggregates() if MAINTENANCE_REPAIR_AGGREGATES else None
+        state = job.new_state(resolve_run_id(event), baseline=baseline)
+    logger.info('Running maintenance %s (invocation %s)', state['run_id'], event.get('invocation', 1))
+
+    state = job.run(state, deadline=get_deadline(context))
+
+    summary = {
+        'run_id': state['run_id'],
+        'complete': state['complete'],
+        'segments_done': sum(1 for segment_state in state['segments'] if segment_state['done']),
+        'total_segments': state['total_segments'],
+        **state['results']
+    }
+
+    if not state['complete']:
+        summary['reinvoked'] = reinvoke(dict(event, state=state), context)
+    elif MAINTENANCE_REPAIR_AGGREGATES and state.get('baseline') is not None:
+        summary['aggregates_written'] = job.repair_aggregates(state['counts'], state['baseline'])
+        # 集計は削除したアイテムも走査時点の状態として数えている
+        summary['item_count'] = state['counts']['total'] - state['results']['archived'] - state['results']['purged']
+
+    logger.info('Maintenance %s: %s', state['run_id'], summary)
+    return summary
+
+
+TASKS = {
+    'export': run_export,
+    'maintenance': run_maintenance,
+}
+
+
+# ========================================
+# Lambda ハンドラー
+# ========================================
+
+def lambda_handler(event, context):
+    """
+    Lambda エントリーポイント
+
+    Args:
+        event: {"task": "<タスク名>", ...}（EventBridge スケジュールの Input）
+        context: Lambda コンテキスト
+
+    Returns:
+        dict: タスクの実行結果
+    """
+    task = event.get('task', 'export')
+    handler = TASKS.get(task)
+    if handler is None:
+        raise ValueError(f'Unknown task: {task}')
+
+    begin_invocation(context)
+    try:
+        # 再呼び出しのイベントにはメンテナンスの途中状態が載るため、全体は DEBUG でのみ出力
+        logger.info('Running task %s (invocation %s)', task, event.get('invocation', 1))
+        logger.debug('Received event: %s', payload(event))
+
+        result = handler(event, context)
+        return {'task': task, 'result': result}
+
+    except Exception as e:
+        logger.error('Error running task %s: %s', task, e)
+        logger.error(traceback.format_exc())
+        raise
+    finally:
+        end_invocation()
@@ -0,0 +1,516 @@
+"""
+テーブルメンテナンス
+並列 Scan で Item を走査し、非アクティブアイテムのアーカイブ・削除、インデックスキーの補完、
+集計カウンターの再計算を行う
+"""
+
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from aggregates import DAY_SK_PREFIX, STATS_PK_PREFIX, STATUS_ATTRIBUTE_PREFIX, SUMMARY_SK, TOTAL_ATTRIBUTE, day_bucket
+from ddb_json import deserialize_item
+from sharding import SHARD_ATTRIBUTE, shard_for, shard_key
+
+logger = logging.getLogger()
+
+# BatchWriteItem の1リクエストあたりの上限
+BATCH_WRITE_CHUNK_SIZE = 25
+
+# スロットリング時の再試行（Full Jitter 指数バックオフ）
+MAX_THROTTLE_RETRIES = 8
+BACKOFF_BASE_SECONDS = 0.1
+BACKOFF_MAX_SECONDS = 5.0
+
+THROTTLE_ERROR_CODES = (
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+)
+
+INACTIVE_ACTIONS = ('none', 'archive', 'purge')
+
+
+def backoff_sleep(attempt):
+    """Full Jitter 指数バックオフで待機"""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    time.sleep(random.uniform(0, delay))
+
+
+class AdaptiveRateLimiter:
+    """
+    消費キャパシティに基づくレートリミッター（AIMD）
+
+    consume() で消費したキャパシティユニット分だけ次の実行可能時刻を進め、
+    レートを超える場合は呼び出し元を待たせる。スロットリングを検知すると
+    レートを半減し、成功が続くと max_rate まで少しずつ戻す。
+
+    Args:
+        max_rate: 最大レート（キャパシティユニット/秒）
+        min_rate: 最小レート
+        increase_ratio: 成功1回あたりの増加量（max_rate に対する割合）
+    """
+
+    def __init__(self, max_rate, min_rate=1.0, increase_ratio=0.02):
+        self.max_rate = float(max_rate)
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self.increase = self.max_rate * increase_ratio
+        self.rate = self.max_rate
+
+        self._next_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, units):
+        """消費したキャパシティを記録し、必要なら待機"""
+        if units <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next_at, now)
+            self._next_at = start + units / self.rate
+            wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttled(self):
+        """スロットリングを検知（レートを半減）"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def succeeded(self):
+        """成功を記録（レートを加算的に回復）"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+def _consumed_units(response):
+    consumed = response.get('ConsumedCapacity')
+    if consumed is None:
+        return 0.0
+    if isinstance(consumed, list):
+        return sum(entry.get('CapacityUnits', 0.0) for entry in consumed)
+    return consumed.get('CapacityUnits', 0.0)
+
+
+def new_counts():
+    """集計カウンターの再計算用の空の集計"""
+    return {'total': 0, 'status': {}, 'days': {}}
+
+
+def merge_counts(target, source):
+    """集計を target に加算"""
+    target['total'] += source['total']
+    for name in ('status', 'days'):
+        for key, count in source[name].items():
+            target[name][key] = target[name].get(key, 0) + count
+    return target
+
+
+class MaintenanceJob:
+    """
+    並列 Scan によるメンテナンスジョブ
+
+    状態（state）は JSON で表現でき、時間切れの場合はセグメントごとの
+    ExclusiveStartKey と途中までの集計を保存した state で再開できる。
+    各処理は冪等（削除・条件付き更新・決定的なキーでのアーカイブ）のため、
+    同じ state からのやり直しで結果が変わらない。
+
+    Args:
+        client_factory: DynamoDB 低レベルクライアントを返す関数（スレッドセーフ）
+        table_name: テーブル名
+        total_segments: 並列 Scan のセグメント数
+        max_workers: 同時に実行するセグメント数
+        inactive_action: 非アクティブアイテムの処理（'none' / 'archive' / 'purge'）
+        inactive_days: UpdatedAt からこの日数を過ぎた inactive アイテムを対象にする
+        archive_sink: アーカイブの出力先（inactive_action='archive' の場合に必須）
+        backfill_index_keys: GSI1PK / GSI1SK・EntityStatus（StatusIndex）・EntityShard（EntityShardIndex）のないアイテムを補完するか
+        shard_count: EntityShard のシャード数（API の ITEM_SHARD_COUNT と同じ値）
+        read_limiter: Scan 用の AdaptiveRateLimiter
+        write_limiter: 書き込み用の AdaptiveRateLimiter
+        page_size: Scan の Limit（None の場合は 1MB ごと）
+    """
+
+    def __init__(self, client_factory, table_name, total_segments=8, max_workers=8,
+                 inactive_action='none', inactive_days=90, archive_sink=None, backfill_index_keys=True,
+                 shard_count=8, read_limiter=None, write_limiter=None, page_size=None):
+        if inactive_action not in INACTIVE_ACTIONS:
+            raise ValueError(f'Unsupported inactive action: {inactive_action}')
+        if inactive_action == 'archive' and archive_sink is None:
+            raise ValueError('archive_sink is required for inactive_action=archive')
+
+        self.client_factory = client_factory
+        self.table_name = table_name
+        self.total_segments = total_segments
+        self.max_workers = max(1, min(max_workers, total_segments))
+        self.inactive_action = inactive_action
+        self.inactive_days = inactive_days
+        self.archive_sink = archive_sink
+        self.backfill_index_keys = backfill_index_keys
+        self.shard_count = max(1, shard_count)
+        self.read_limiter = read_limiter or AdaptiveRateLimiter(float('inf'))
+        self.write_limiter = write_limiter or AdaptiveRateLimiter(float('inf'))
+        self.page_size = page_size
+
+    def new_state(self, run_id, now=None, baseline=None):
+        """
+        初回実行時の状態を作成
+
+        Args:
+            run_id: 実行ID
+            now: 基準時刻（UNIX秒）
+            baseline: 走査開始時点の集計アイテムの値（snapshot_aggregates() の結果）。
+                      None の場合は repair_aggregates() で集計を補正しない
+        """
+        now = int(now if now is not None else time.time())
+        return {
+            'run_id': run_id,
+            'started_at': now,
+            # inactive の判定基準は再開後も変えない
+            'inactive_before': now - self.inactive_days * 86400,
+            'total_segments': self.total_segments,
+            'segments': [
+                {'segment': segment, 'last_evaluated_key': None, 'pages': 0, 'done': False}
+                for segment in range(self.total_segments)
+            ],
+            'counts': new_counts(),
+            'baseline': baseline,
+            'results': {'scanned': 0, 'archived': 0, 'purged': 0, 'backfilled': 0},
+            'complete': False
+        }
+
+    # ----------------------------------------
+    # DynamoDB 呼び出し
+    # ----------------------------------------
+
+    def _call(self, limiter, operation, **kwargs):
+        """スロットリング時はレートを下げて再試行し、消費キャパシティ分だけ待機する"""
+        client = self.client_factory()
+        kwargs['ReturnConsumedCapacity'] = 'TOTAL'
+
+        for attempt in range(MAX_THROTTLE_RETRIES):
+            try:
+                response = getattr(client, operation)(**kwargs)
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in THROTTLE_ERROR_CODES:
+                    raise
+                limiter.throttled()
+                backoff_sleep(attempt)
+                continue
+
+            limiter.consume(_consumed_units(response))
+            limiter.succeeded()
+            return response
+
+        raise RuntimeError(f'{operation} was throttled {MAX_THROTTLE_RETRIES} times')
+
+    def _batch_write(self, requests):
+        """BatchWriteItem を25件ずつ実行（UnprocessedItems はレートを下げて再試行）"""
+        for start in range(0, len(requests), BATCH_WRITE_CHUNK_SIZE):
+            chunk = requests[start:start + BATCH_WRITE_CHUNK_SIZE]
+
+            for attempt in range(MAX_THROTTLE_RETRIES):
+                response = self._call(self.write_limiter, 'batch_write_item', RequestItems={self.table_name: chunk})
+                chunk = response.get('UnprocessedItems', {}).get(self.table_name, [])
+                if not chunk:
+                    break
+                # UnprocessedItems はキャパシティ不足のサイン
+                self.write_limiter.throttled()
+                backoff_sleep(attempt)
+            else:
+                raise RuntimeError(f'{len(chunk)} write requests remained unprocessed')
+
+    def _backfill_index_keys(self, item):
+        """
+        欠けているインデックスキーを条件付き UpdateItem で補完
+
+        Returns:
+            bool: 補完した場合 True
+        """
+        set_parts = []
+        conditions = ['attribute_exists(PK)']
+        values = {}
+        names = {}
+
+        if 'GSI1PK' not in item and 'CreatedAt' in item:
+            set_parts.append('GSI1PK = :gsi1pk, GSI1SK = :gsi1sk')
+            conditions.append('attribute_not_exists(GSI1PK)')
+            values[':gsi1pk'] = {'S': f"ITEM#{item['ItemId']['S']}"}
+            values[':gsi1sk'] = {'S': f"CREATED#{item['CreatedAt']['N']}"}
+
+        status = item.get('Status', {}).get('S')
+        if 'EntityStatus' not in item and status:
+            # 走査後に Status が変わっていれば更新側で設定済みのため補完しない
+            set_parts.append('EntityStatus = :entity_status')
+            conditions.append('#status = :status')
+            values[':entity_status'] = {'S': f"{item['EntityType']['S']}#{status}"}
+            values[':status'] = {'S': status}
+            names['#status'] = 'Status'
+
+        if SHARD_ATTRIBUTE not in item:
+            set_parts.append(f'{SHARD_ATTRIBUTE} = :shard')
+            conditions.append(f'attribute_not_exists({SHARD_ATTRIBUTE})')
+            values[':shard'] = {'S': shard_key(item['EntityType']['S'], shard_for(item['ItemId']['S'], self.shard_count))}
+
+        if not set_parts:
+            return False
+
+        update_kwargs = {
+            'TableName': self.table_name,
+            'Key': {'PK': item['PK'], 'SK': item['SK']},
+            'UpdateExpression': 'SET ' + ', '.join(set_parts),
+            'ConditionExpression': ' AND '.join(conditions),
+            'ExpressionAttributeValues': values
+        }
+        if names:
+            update_kwargs['ExpressionAttributeNames'] = names
+
+        try:
+            self._call(self.write_limiter, 'update_item', **update_kwargs)
+            return True
+        except ClientError as e:
+            # 走査後に削除・補完・更新された場合
+            if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    # ----------------------------------------
+    # 走査
+    # ----------------------------------------
+
+    def _is_expired_inactive(self, item, inactive_before):
+        if item.get('Status', {}).get('S') != 'inactive':
+            return False
+        updated_at = item.get('UpdatedAt', item.get('CreatedAt'))
+        return updated_at is not None and int(updated_at['N']) < inactive_before
+
+    def _process_page(self, state, segment_state, items, counts, results):
+        expired = []
+        for item in items:
+            results['scanned'] += 1
+
+            # 削除するアイテムも走査時点の状態として数える（削除分は Streams 経由で集計から引かれる）
+            counts['total'] += 1
+            status = item.get('Status', {}).get('S')
+            if status:
+                counts['status'][status] = counts['status'].get(status, 0) + 1
+            created_at = item.get('CreatedAt')
+            if created_at is not None:
+                day = day_bucket(created_at['N'])
+                counts['days'][day] = counts['days'].get(day, 0) + 1
+
+            if self.inactive_action != 'none' and self._is_expired_inactive(item, state['inactive_before']):
+                expired.append(item)
+                continue
+
+            if self.backfill_index_keys and 'ItemId' in item and any(
+                    name not in item for name in ('GSI1PK', 'EntityStatus', SHARD_ATTRIBUTE)):
+                if self._backfill_index_keys(item):
+                    results['backfilled'] += 1
+
+        if not expired:
+            return
+
+        if self.inactive_action == 'archive':
+            # 削除前に書き出す（キーはページ番号から決まるため、やり直しでも同じパートを上書きする）
+            lines = ''.join(
+                json.dumps(deserialize_item(item), ensure_ascii=False, separators=(',', ':')) + '\n'
+                for item in expired
+            )
+            self.archive_sink.write(
+                f"{state['run_id']}/segment-{segment_state['segment']:04d}/page-{segment_state['pages']:06d}.ndjson.gz",
+                gzip.compress(lines.encode('utf-8'), compresslevel=6)
+            )
+
+        self._batch_write([{'DeleteRequest': {'Key': {'PK': item['PK'], 'SK': item['SK']}}} for item in expired])
+        results['archived' if self.inactive_action == 'archive' else 'purged'] += len(expired)
+
+    def _run_segment(self, state, segment_state, deadline, stop_event):
+        counts = new_counts()
+        results = {name: 0 for name in state['results']}
+
+        scan_kwargs = {
+            'TableName': self.table_name,
+            'Segment': segment_state['segment'],
+            'TotalSegments': state['total_segments'],
+            'FilterExpression': 'EntityType = :entity_type',
+            'ExpressionAttributeValues': {':entity_type': {'S': 'Item'}}
+        }
+        if self.page_size:
+            scan_kwargs['Limit'] = self.page_size
+
+        while not segment_state['done']:
+            if time.monotonic() >= deadline or stop_event.is_set():
+                break
+
+            if segment_state['last_evaluated_key']:
+                scan_kwargs['ExclusiveStartKey'] = segment_state['last_evaluated_key']
+            response = self._call(self.read_limiter, 'scan', **scan_kwargs)
+
+            self._process_page(state, segment_state, response.get('Items', []), counts, results)
+
+            segment_state['pages'] += 1
+            segment_state['last_evaluated_key'] = response.get('LastEvaluatedKey')
+            segment_state['done'] = segment_state['last_evaluated_key'] is None
+
+        return counts, results
+
+    def run(self, state, deadline=float('inf')):
+        """
+        未完了のセグメントを走査し、更新した state を返す
+
+        Args:
+            state: new_state() または前回の run() が返した状態
+            deadline: 打ち切り時刻（time.monotonic() 基準）
+
+        Returns:
+            dict: 更新後の状態（全セグメント完了時は complete=True）
+        """
+        stop_event = threading.Event()
+        pending = [segment_state for segment_state in state['segments'] if not segment_state['done']]
+
+        def worker(segment_state):
+            try:
+                return self._run_segment(state, segment_state, deadline, stop_event)
+            except Exception:
+                stop_event.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            outcomes = list(executor.map(worker, pending))
+
+        # 集計は呼び出しの最後にまとめて state に反映する（失敗時は前回の state からやり直す）
+        for counts, results in outcomes:
+            merge_counts(state['counts'], counts)
+            for name, value in results.items():
+                state['results'][name] += value
+
+        state['complete'] = all(segment_state['done'] for segment_state in state['segments'])
+        return state
+
+    # ----------------------------------------
+    # 集計カウンターの再計算
+    # ----------------------------------------
+
+    def _stats_key(self, entity_type):
+        return f'{STATS_PK_PREFIX}{entity_type}'
+
+    def snapshot_aggregates(self, entity_type='Item'):
+        """
+        現在の集計アイテムの値を読み込む（走査の開始前に呼び、new_state() の baseline に渡す）
+
+        Returns:
+            dict: new_counts() と同じ形式の集計
+        """
+        counts = new_counts()
+        query_kwargs = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': 'PK = :pk',
+            'ExpressionAttributeValues': {':pk': {'S': self._stats_key(entity_type)}},
+            # 直前に Processor が ADD した分も含める
+            'ConsistentRead': True
+        }
+        while True:
+            response = self._call(self.read_limiter, 'query', **query_kwargs)
+            for item in response.get('Items', []):
+                sort_key = item['SK']['S']
+                if sort_key == SUMMARY_SK:
+                    counts['total'] = int(item.get(TOTAL_ATTRIBUTE, {'N': '0'})['N'])
+                    for name, value in item.items():
+                        if name.startswith(STATUS_ATTRIBUTE_PREFIX):
+                            counts['status'][name[len(STATUS_ATTRIBUTE_PREFIX):]] = int(value['N'])
+                elif sort_key.startswith(DAY_SK_PREFIX):
+                    counts['days'][sort_key[len(DAY_SK_PREFIX):]] = int(item.get(TOTAL_ATTRIBUTE, {'N': '0'})['N'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        return counts
+
+    def _add_counters(self, pk, sort_key, deltas, updated_at):
+        """
+        集計アイテムに ADD で増減を加える（Processor の flush と同じ更新式）
+
+        Returns:
+            dict: 更新後の値（UPDATED_NEW）
+        """
+        add_parts = []
+        names = {}
+        values = {':updated_at': {'N': str(updated_at)}}
+        for i, (name, delta) in enumerate(sorted(deltas.items())):
+            add_parts.append(f'#a{i} :a{i}')
+            names[f'#a{i}'] = name
+            values[f':a{i}'] = {'N': str(delta)}
+
+        response = self._call(
+            self.write_limiter, 'update_item',
+            TableName=self.table_name,
+            Key={'PK': {'S': pk}, 'SK': {'S': sort_key}},
+            UpdateExpression='SET UpdatedAt = :updated_at ADD ' + ', '.join(add_parts),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='UPDATED_NEW'
+        )
+        return response.get('Attributes', {})
+
+    def _delete_empty_day(self, pk, sort_key):
+        """件数が0になった日別アイテムを削除（その間に Processor が加算していれば残す）"""
+        try:
+            self._call(
+                self.write_limiter, 'delete_item',
+                TableName=self.table_name,
+                Key={'PK': {'S': pk}, 'SK': {'S': sort_key}},
+                ConditionExpression=f'{TOTAL_ATTRIBUTE} = :zero',
+                ExpressionAttributeValues={':zero': {'N': '0'}}
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+
+    def repair_aggregates(self, counts, baseline, entity_type='Item', updated_at=None):
+        """
+        走査結果と走査開始時点の集計の差を、集計アイテムに ADD で加える
+
+        集計アイテムを走査結果で置き換えると、走査中に Processor が加えた増減
+        （このジョブ自身の削除による減算を含む）が失われる。差分を加算すれば、
+        走査開始時点の誤差だけを補正し、走査中の増減はそのまま残る。
+        走査開始後、走査がそのアイテムに到達する前に変更されたアイテムは
+        走査結果と Streams の両方に反映されるため、その分だけずれが残る。
+
+        Args:
+            counts: 走査結果（state['counts']）
+            baseline: 走査開始時点の集計（state['baseline']）
+
+        Returns:
+            int: 更新した集計アイテム数
+        """
+        updated_at = int(updated_at if updated_at is not None else time.time())
+        pk = self._stats_key(entity_type)
+        updated = 0
+
+        summary_deltas = {TOTAL_ATTRIBUTE: counts['total'] - baseline['total']}
+        for status in set(counts['status']) | set(baseline['status']):
+            summary_deltas[f'{STATUS_ATTRIBUTE_PREFIX}{status}'] = (
+                counts['status'].get(status, 0) - baseline['status'].get(status, 0)
+            )
+        summary_deltas = {name: delta for name, delta in summary_deltas.items() if delta}
+        if summary_deltas:
+            self._add_counters(pk, SUMMARY_SK, summary_deltas, updated_at)
+            updated += 1
+
+        for day in set(counts['days']) | set(baseline['days']):
+            delta = counts['days'].get(day, 0) - baseline['days'].get(day, 0)
+            if not delta:
+                continue
+            sort_key = f'{DAY_SK_PREFIX}{day}'
+            attributes = self._add_counters(pk, sort_key, {TOTAL_ATTRIBUTE: delta}, updated_at)
+            updated += 1
+            # アイテムがなくなった日の集計アイテムは削除する
+            if attributes.get(TOTAL_ATTRIBUTE, {}).get('N') == '0':
+                self._delete_empty_day(pk, sort_key)
+
+        return updated
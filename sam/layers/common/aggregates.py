@@ -0,0 +1,122 @@
+"""
+集計カウンター
+バッチ内の件数の増減を集約し、集計アイテムごとに1回の ADD 更新で書き込む
+"""
+
+import threading
+from datetime import datetime, timezone
+
+from tracing import span
+
+# 集計アイテムのキー
+#   PK=STATS#<EntityType>, SK=SUMMARY      : 総数と Status 別の件数
+#   PK=STATS#<EntityType>, SK=DAY#<日付>    : CreatedAt の日（UTC）別の件数
+# EntityType 属性は持たせない（EntityTypeIndex に載せないため）
+STATS_PK_PREFIX = 'STATS#'
+SUMMARY_SK = 'SUMMARY'
+DAY_SK_PREFIX = 'DAY#'
+
+TOTAL_ATTRIBUTE = 'ItemCount'
+STATUS_ATTRIBUTE_PREFIX = 'Status#'
+
+
+def day_bucket(created_at):
+    """CreatedAt（UNIX秒）を日付バケット（UTC, YYYY-MM-DD）に変換"""
+    return datetime.fromtimestamp(int(created_at), tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+class AggregateCounters:
+    """
+    集計アイテムへの増減のバッファ
+
+    add_* で増減を記録し、flush() で集計アイテムごとに1回の UpdateItem（ADD）を実行する。
+    """
+
+    def __init__(self):
+        # (PK, SK) -> {属性名: 増減}
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def _add(self, entity_type, sort_key, attribute, delta):
+        key = (f'{STATS_PK_PREFIX}{entity_type}', sort_key)
+        with self._lock:
+            attributes = self._deltas.setdefault(key, {})
+            attributes[attribute] = attributes.get(attribute, 0) + delta
+
+    def add_item(self, image, delta):
+        """
+        アイテムの追加（delta=1）・削除（delta=-1）を記録
+
+        Args:
+            image: パース済みの画像データ（EntityType / Status / CreatedAt を参照）
+            delta: 増減
+        """
+        entity_type = image.get('EntityType')
+        if not entity_type:
+            return
+
+        self._add(entity_type, SUMMARY_SK, TOTAL_ATTRIBUTE, delta)
+
+        status = image.get('Status')
+        if status:
+            self._add(entity_type, SUMMARY_SK, f'{STATUS_ATTRIBUTE_PREFIX}{status}', delta)
+
+        created_at = image.get('CreatedAt')
+        if created_at is not None:
+            self._add(entity_type, f'{DAY_SK_PREFIX}{day_bucket(created_at)}', TOTAL_ATTRIBUTE, delta)
+
+    def add_status_change(self, entity_type, old_status, new_status):
+        """Status の変更を記録"""
+        if not entity_type or old_status == new_status:
+            return
+        if old_status:
+            self._add(entity_type, SUMMARY_SK, f'{STATUS_ATTRIBUTE_PREFIX}{old_status}', -1)
+        if new_status:
+            self._add(entity_type, SUMMARY_SK, f'{STATUS_ATTRIBUTE_PREFIX}{new_status}', 1)
+
+    def merge(self, other):
+        """別のバッファ（1レコード分など）の増減を加算"""
+        with self._lock:
+            for key, attributes in other._deltas.items():
+                target = self._deltas.setdefault(key, {})
+                for name, delta in attributes.items():
+                    target[name] = target.get(name, 0) + delta
+
+    def flush(self, table, updated_at):
+        """
+        集約した増減を書き込んでバッファをリセット
+
+        Args:
+            table: DynamoDB Table リソース
+            updated_at: 集計アイテムに記録する更新時刻（UNIX秒）
+
+        Returns:
+            int: 更新した集計アイテム数
+        """
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+
+        updated = 0
+        for (pk, sk), attributes in deltas.items():
+            attributes = {name: delta for name, delta in attributes.items() if delta}
+            if not attributes:
+                continue
+
+            add_parts = []
+            expression_attribute_names = {}
+            expression_attribute_values = {':updated_at': updated_at}
+            for i, (name, delta) in enumerate(sorted(attributes.items())):
+                add_parts.append(f'#a{i} :a{i}')
+                expression_attribute_names[f'#a{i}'] = name
+                expression_attribute_values[f':a{i}'] = delta
+
+            with span('dynamodb.update_item', purpose='aggregates'):
+                table.update_item(
+                    Key={'PK': pk, 'SK': sk},
+                    UpdateExpression='SET UpdatedAt = :updated_at ADD ' + ', '.join(add_parts),
+                    ExpressionAttributeNames=expression_attribute_names,
+                    ExpressionAttributeValues=expression_attribute_values
+                )
+            updated += 1
+
+        return updated
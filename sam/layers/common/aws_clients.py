@@ -0,0 +1,115 @@
+"""
+AWS クライアントレジストリ
+初回利用時にクライアントを生成し、ウォームコンテナ内で再利用する
+
+boto3 のインポートとクライアント生成（サービスモデルの読み込み）はコールドスタートの
+大部分を占めるため、モジュールのインポート時には何もしない。
+"""
+
+import os
+import threading
+
+_clients = {}
+_resources = {}
+_tables = {}
+_session = None
+_lock = threading.RLock()
+
+
+def client_config():
+    """
+    チューニング済みの botocore 設定
+
+    環境変数で上書きできる:
+        AWS_CONNECT_TIMEOUT: 接続タイムアウト（秒）
+        AWS_READ_TIMEOUT: 読み取りタイムアウト（秒）
+        AWS_MAX_POOL_CONNECTIONS: コネクションプールの最大接続数
+        AWS_MAX_ATTEMPTS: 最大試行回数（アダプティブリトライ）
+    """
+    from botocore.config import Config
+
+    return Config(
+        connect_timeout=float(os.environ.get('AWS_CONNECT_TIMEOUT', 1)),
+        read_timeout=float(os.environ.get('AWS_READ_TIMEOUT', 3)),
+        max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', 50)),
+        tcp_keepalive=True,
+        retries={
+            'mode': 'adaptive',
+            'max_attempts': int(os.environ.get('AWS_MAX_ATTEMPTS', 3))
+        }
+    )
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+
+def get_client(service_name):
+    """
+    低レベルクライアントを取得（スレッドセーフ、生成は初回のみ）
+
+    Args:
+        service_name: サービス名（'dynamodb', 'cloudwatch' など）
+    """
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _get_session().client(service_name, config=client_config())
+                _clients[service_name] = client
+    return client
+
+
+def get_resource(service_name):
+    """
+    リソースを取得（生成は初回のみ）
+
+    リソースはスレッドセーフではないため、複数スレッドからは get_client を使うこと。
+    """
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = _get_session().resource(service_name, config=client_config())
+                _resources[service_name] = resource
+    return resource
+
+
+def get_table(table_name):
+    """DynamoDB Table リソースを取得（生成は初回のみ）"""
+    table = _tables.get(table_name)
+    if table is None:
+        with _lock:
+            table = _tables.get(table_name)
+            if table is None:
+                table = get_resource('dynamodb').Table(table_name)
+                _tables[table_name] = table
+    return table
+
+
+def set_client(service_name, client):
+    """生成済みのクライアントを差し替え（テスト・ベンチマーク用）"""
+    with _lock:
+        _clients[service_name] = client
+
+
+def set_table(table_name, table):
+    """生成済みの Table リソースを差し替え（テスト・ベンチマーク用）"""
+    with _lock:
+        _tables[table_name] = table
+
+
+def reset():
+    """生成済みのクライアントを破棄（テスト・ベンチマーク用）"""
+    global _session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _tables.clear()
+        _session = None
@@ -0,0 +1,122 @@
+"""
+DynamoDB ワイヤー形式と JSON 互換の Python 型の相互変換
+低レベルクライアントの属性値を Decimal を経由せずに1パスで変換する
+"""
+
+import base64
+from decimal import Decimal
+
+
+def _number(text):
+    # 整数はそのまま int（精度を保つ）、小数・指数表記は float
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def _binary(value):
+    # 低レベルクライアントは B をデコード済みの bytes で返す
+    return base64.b64encode(value).decode('ascii')
+
+
+def _deserialize_list(values):
+    return [_deserialize(value) for value in values]
+
+
+def _deserialize_map(attributes):
+    return {key: _deserialize(value) for key, value in attributes.items()}
+
+
+def _deserialize_null(_):
+    return None
+
+
+def _identity(value):
+    return value
+
+
+# 型記述子 -> 変換関数（セット型は JSON 配列として返す）
+_DESERIALIZERS = {
+    'S': _identity,
+    'N': _number,
+    'BOOL': _identity,
+    'NULL': _deserialize_null,
+    'B': _binary,
+    'M': _deserialize_map,
+    'L': _deserialize_list,
+    'SS': list,
+    'NS': lambda values: [_number(value) for value in values],
+    'BS': lambda values: [_binary(value) for value in values],
+}
+
+
+def _deserialize(attribute_value):
+    # 最も多い S 型は関数呼び出しなしで返す
+    value = attribute_value.get('S')
+    if value is not None:
+        return value
+
+    type_descriptor = next(iter(attribute_value))
+    return _DESERIALIZERS[type_descriptor](attribute_value[type_descriptor])
+
+
+def deserialize_item(item):
+    """
+    ワイヤー形式のアイテムを JSON 互換の dict に変換
+
+    Args:
+        item: {属性名: {型記述子: 値}} 形式のアイテム（None 可）
+
+    Returns:
+        dict | None: 変換後のアイテム
+    """
+    if item is None:
+        return None
+    return {key: _deserialize(value) for key, value in item.items()}
+
+
+def deserialize_items(items):
+    """ワイヤー形式のアイテムのリストを変換"""
+    return [{key: _deserialize(value) for key, value in item.items()} for item in items]
+
+
+def serialize_value(value):
+    """
+    Python の値をワイヤー形式の属性値に変換
+
+    Raises:
+        TypeError: 対応していない型の場合
+    """
+    if isinstance(value, str):
+        return {'S': value}
+    # bool は int のサブクラスのため先に判定する
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, float):
+        if value != value or value in (float('inf'), float('-inf')):
+            raise TypeError('Infinity and NaN are not supported')
+        return {'N': repr(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': {key: serialize_value(item) for key, item in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize_value(item) for item in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, (set, frozenset)) and value:
+        sample = next(iter(value))
+        if isinstance(sample, str):
+            return {'SS': list(value)}
+        if isinstance(sample, (bytes, bytearray)):
+            return {'BS': [bytes(item) for item in value]}
+        if isinstance(sample, (int, float, Decimal)) and not isinstance(sample, bool):
+            return {'NS': [serialize_value(item)['N'] for item in value]}
+    raise TypeError(f'Unsupported type for DynamoDB: {type(value).__name__}')
+
+
+def serialize_item(item):
+    """Python の dict をワイヤー形式のアイテムに変換"""
+    return {key: serialize_value(value) for key, value in item.items()}
@@ -0,0 +1,126 @@
+"""
+全文検索インデックス
+Name / Description をトークン化し、シングルテーブル上の転置インデックス（ポスティング）として扱う
+
+Processor Lambda がストリームの変更からポスティングを更新し、API Lambda の
+GET /items/search が同じトークナイザーでクエリを分解してポスティングを読む。
+"""
+
+import math
+import re
+import unicodedata
+
+# ポスティングアイテムのキー
+#   PK=SEARCH#<トークン>, SK=ITEM#<ItemId>, Weight=<重み>
+# EntityType 属性は持たせない（一覧用の GSI・エクスポート・メンテナンスの対象外にするため）
+SEARCH_PK_PREFIX = 'SEARCH#'
+POSTING_SK_PREFIX = 'ITEM#'
+WEIGHT_ATTRIBUTE = 'Weight'
+
+# インデックス対象の属性と重み（Name の一致を Description より高く評価する）
+FIELD_WEIGHTS = {'Name': 3, 'Description': 1}
+
+# トークンの最大長（文字数）。長い英数字列は先頭だけを使う
+MAX_TOKEN_LENGTH = 64
+
+# 々・ひらがな・カタカナ（長音符を含む）・CJK 統合漢字（拡張A・互換漢字を含む）
+_CJK = '\u3005\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+TOKEN_PATTERN = re.compile(f'[{_CJK}]+|[^\\W_{_CJK}]+')
+CJK_PATTERN = re.compile(f'[{_CJK}]')
+
+# BM25 の tf 飽和パラメータ（文書長の正規化は行わない）
+BM25_K1 = 1.2
+
+
+def normalize(text):
+    """NFKC 正規化（全角英数字・半角カナの統一）と小文字化"""
+    return unicodedata.normalize('NFKC', text).lower()
+
+
+def tokenize(text):
+    """
+    テキストをトークン列に分解
+
+    英数字は単語単位、日本語（かな・漢字）は連続部分を文字バイグラムに分解する
+    （1文字だけの場合はその文字）。分かち書きの辞書を持たずに部分一致で検索できる。
+
+    Args:
+        text: 対象テキスト（None 可）
+
+    Returns:
+        list: トークンのリスト（出現順、重複あり）
+    """
+    if not text:
+        return []
+
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(normalize(str(text))):
+        run = match.group()
+        if not CJK_PATTERN.match(run):
+            tokens.append(run[:MAX_TOKEN_LENGTH])
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_terms(text):
+    """検索クエリをトークンに分解（重複を除き出現順）"""
+    return list(dict.fromkeys(tokenize(text)))
+
+
+def term_weights(image, max_terms=None):
+    """
+    アイテムのトークンごとの重み（属性の重み × 出現回数の合計）
+
+    Args:
+        image: アイテム（None 可、Name / Description を参照）
+        max_terms: 保持するトークン数の上限（重みの大きい順、None の場合は無制限）
+
+    Returns:
+        dict: {トークン: 重み}
+    """
+    if not image:
+        return {}
+
+    weights = {}
+    for attribute, field_weight in FIELD_WEIGHTS.items():
+        for token in tokenize(image.get(attribute)):
+            weights[token] = weights.get(token, 0) + field_weight
+
+    if max_terms is not None and len(weights) > max_terms:
+        kept = sorted(weights.items(), key=lambda entry: (-entry[1], entry[0]))[:max_terms]
+        weights = dict(kept)
+    return weights
+
+
+def diff_postings(old_image, new_image, max_terms=None):
+    """
+    変更前後の画像から更新が必要なポスティングを求める
+
+    Returns:
+        tuple: ({書き込むトークン: 重み}, [削除するトークン])
+    """
+    old_weights = term_weights(old_image, max_terms)
+    new_weights = term_weights(new_image, max_terms)
+
+    puts = {term: weight for term, weight in new_weights.items() if old_weights.get(term) != weight}
+    deletes = [term for term in old_weights if term not in new_weights]
+    return puts, deletes
+
+
+def posting_key(term, item_id):
+    """ポスティングアイテムのキー"""
+    return {'PK': f'{SEARCH_PK_PREFIX}{term}', 'SK': f'{POSTING_SK_PREFIX}{item_id}'}
+
+
+def idf(document_count, document_frequency):
+    """BM25 の IDF（常に正の値）"""
+    return math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def term_score(weight, document_count, document_frequency):
+    """1トークン分のスコア（BM25 の tf 飽和 × IDF）"""
+    weight = float(weight)
+    return idf(document_count, document_frequency) * weight * (BM25_K1 + 1) / (weight + BM25_K1)
@@ -0,0 +1,28 @@
+"""
+書き込みシャーディング
+一覧用 GSI のパーティションキーを <EntityType>#<n> に分散し、単一パーティションへの書き込み集中を避ける
+"""
+
+import zlib
+
+# EntityShardIndex のパーティションキー属性（値は <EntityType>#<シャード番号>）
+SHARD_ATTRIBUTE = 'EntityShard'
+
+
+def shard_for(item_id, shard_count):
+    """
+    アイテムIDからシャード番号を決定
+
+    ID のハッシュで決めるため、作成時（API）と補完時（メンテナンス）で同じシャードになる。
+    """
+    return zlib.crc32(item_id.encode('utf-8')) % shard_count
+
+
+def shard_key(entity_type, shard):
+    """シャード番号を EntityShard の値に変換"""
+    return f'{entity_type}#{shard}'
+
+
+def shard_keys(entity_type, shard_count):
+    """全シャードの EntityShard の値（シャード番号順）"""
+    return [shard_key(entity_type, shard) for shard in range(shard_count)]
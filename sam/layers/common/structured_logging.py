@@ -0,0 +1,267 @@
+"""
+構造化ログ
+JSON 形式のログ出力と、呼び出し単位のサンプリング・デバッグ昇格、ペイロードの遅延整形を提供する
+
+ログレベルは呼び出しごとに決め直してルートロガーに設定する。出力されないレベルの
+ログは logging の段階で捨てられ、引数（payload / lazy）は整形されない。
+メッセージは f-string ではなく %s の引数で渡すこと。
+
+    logger = configure_logging()
+
+    def lambda_handler(event, context):
+        begin_invocation(context)
+        try:
+            logger.debug('Received event: %s', payload(event))
+        finally:
+            end_invocation()
+"""
+
+import base64
+import json
+import logging
+import os
+import random
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from decimal import Decimal
+
+# ========================================
+# 設定
+# ========================================
+
+# json: 1行1オブジェクトの JSON / text: 標準のテキスト形式
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+
+# 呼び出しごとのレベル別サンプリング率（例: "DEBUG=0.1,INFO=0.5"）。WARNING 以上は常に出力する
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+
+# 呼び出し全体を DEBUG に昇格させる確率
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0))
+
+# payload() で出力するペイロードの最大文字数
+LOG_MAX_PAYLOAD_LENGTH = int(os.environ.get('LOG_MAX_PAYLOAD_LENGTH', 4096))
+
+# payload() でマスクするキー（大文字小文字を区別しない）
+LOG_REDACT_KEYS = frozenset(
+    key.strip().lower()
+    for key in os.environ.get(
+        'LOG_REDACT_KEYS',
+        'authorization,cookie,set-cookie,x-api-key,x-amz-security-token,password,secret,token'
+    ).split(',')
+    if key.strip()
+)
+
+REDACTED = '[REDACTED]'
+
+# LogRecord の標準属性（これ以外の属性は extra として JSON に含める）
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# 呼び出し単位の状態（Lambda は1コンテナで同時に1呼び出しのみ処理する）
+_invocation = {'request_id': None, 'debug': False}
+_base_level = logging.INFO
+
+
+def parse_sample_rates(text):
+    """'DEBUG=0.1,INFO=0.5' を {logging.DEBUG: 0.1, logging.INFO: 0.5} に変換"""
+    rates = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, rate = part.partition('=')
+        level = logging.getLevelName(name.strip().upper())
+        if not isinstance(level, int):
+            raise ValueError(f'Unknown log level in LOG_SAMPLE_RATES: {name}')
+        rates[level] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+_sample_rates = parse_sample_rates(LOG_SAMPLE_RATES)
+
+# ========================================
+# ペイロードの整形
+# ========================================
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def redact(value):
+    """LOG_REDACT_KEYS に含まれるキーの値をマスク（ネストした dict / list も対象）"""
+    if isinstance(value, Mapping):
+        return {
+            key: REDACTED if str(key).lower() in LOG_REDACT_KEYS and item is not None else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+def truncate(text, max_length=None):
+    """max_length を超える部分を切り詰め、切り詰めた文字数を付記"""
+    max_length = LOG_MAX_PAYLOAD_LENGTH if max_length is None else max_length
+    if max_length <= 0 or len(text) <= max_length:
+        return text
+    return f'{text[:max_length]}...(truncated {len(text) - max_length} chars)'
+
+
+class LazyPayload:
+    """ログ出力時に初めて JSON に整形されるペイロード（payload() で作る）"""
+
+    __slots__ = ('value', 'max_length')
+
+    def __init__(self, value, max_length=None):
+        self.value = value
+        self.max_length = max_length
+
+    def __str__(self):
+        text = json.dumps(redact(self.value), default=_json_default, ensure_ascii=False, separators=(',', ':'))
+        return truncate(text, self.max_length)
+
+
+class LazyValue:
+    """ログ出力時に初めて func() を評価する引数（lazy() で作る）"""
+
+    __slots__ = ('func',)
+
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self):
+        return str(self.func())
+
+
+def payload(value, max_length=None):
+    """
+    ログの引数として渡すペイロード
+
+    JSON への整形とマスク・切り詰めはログが実際に出力されるときにだけ行う。
+
+    Args:
+        value: 整形する値（DynamoDB の Decimal・セット・バイナリも可）
+        max_length: 最大文字数（None の場合は LOG_MAX_PAYLOAD_LENGTH）
+    """
+    return LazyPayload(value, max_length)
+
+
+def lazy(func):
+    """ログが実際に出力されるときにだけ func() を評価する引数"""
+    return LazyValue(func)
+
+
+# ========================================
+# フォーマッター
+# ========================================
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    ログレコードを1行の JSON に整形
+
+    timestamp / level / logger / message / request_id に加え、extra で渡した属性を含める。
+    """
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'aws_request_id', None) or _invocation['request_id']
+        if request_id:
+            entry['request_id'] = request_id
+
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_') and key != 'aws_request_id':
+                entry[key] = value
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=_json_default, ensure_ascii=False)
+
+
+def configure_logging():
+    """
+    ルートロガーを構造化ログ用に設定（何度呼んでもよい）
+
+    Lambda ランタイムが追加したハンドラーのフォーマッターを置き換える。
+
+    Returns:
+        logging.Logger: ルートロガー
+    """
+    global _base_level
+
+    root = logging.getLogger()
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler())
+    if LOG_FORMAT == 'json':
+        for handler in root.handlers:
+            handler.setFormatter(JsonFormatter())
+
+    level = logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    _base_level = level if isinstance(level, int) else logging.INFO
+    root.setLevel(_base_level)
+    return root
+
+
+# ========================================
+# 呼び出し単位のレベル
+# ========================================
+
+
+def begin_invocation(context=None, debug=False):
+    """
+    呼び出しの開始時にこの呼び出しのログレベルを決める
+
+    debug=True または LOG_DEBUG_SAMPLE_RATE の確率で DEBUG に昇格する。
+    それ以外は LOG_LEVEL から始めて、サンプリングで外れたレベルを1段ずつ引き上げる
+    （例: INFO=0.1 なら 9割の呼び出しは WARNING 以上だけを出力する）。
+
+    Args:
+        context: Lambda コンテキスト（aws_request_id をログに含める）
+        debug: この呼び出しを DEBUG に昇格するか
+
+    Returns:
+        int: この呼び出しのログレベル
+    """
+    _invocation['request_id'] = getattr(context, 'aws_request_id', None)
+
+    if debug or (LOG_DEBUG_SAMPLE_RATE and random.random() < LOG_DEBUG_SAMPLE_RATE):
+        return escalate_debug()
+
+    level = _base_level
+    while level < logging.WARNING and random.random() >= _sample_rates.get(level, 1.0):
+        level += 10
+    _invocation['debug'] = False
+    logging.getLogger().setLevel(level)
+    return level
+
+
+def escalate_debug():
+    """呼び出しの残りを DEBUG で出力する（エラー調査用のトグル）"""
+    _invocation['debug'] = True
+    logging.getLogger().setLevel(logging.DEBUG)
+    return logging.DEBUG
+
+
+def is_debug_escalated():
+    """この呼び出しが DEBUG に昇格しているか"""
+    return _invocation['debug']
+
+
+def end_invocation():
+    """呼び出しの終了時に基準のログレベルに戻す"""
+    _invocation['request_id'] = None
+    _invocation['debug'] = False
+    logging.getLogger().setLevel(_base_level)
@@ -0,0 +1,217 @@
+"""
+トレーシング
+処理区間（スパン）の計測を X-Ray サブセグメントと Server-Timing ヘッダーに出力する
+
+X-Ray（aws-xray-sdk）は各関数の requirements.txt でインストールされ、初回のスパンで
+インポートする。X-Ray も Server-Timing も無効な場合、span() は共有の何もしない
+コンテキストマネージャーを返し、traced() で包んだ関数はそのまま呼び出される。
+
+    with span('dynamodb.query', index='StatusIndex'):
+        response = client.query(...)
+
+    @traced('serialize')
+    def dumps_body(body):
+        ...
+
+スレッドプールで実行する関数は bind() で包むと、呼び出し元のセグメントの下に
+サブセグメントが作られる（X-Ray のコンテキストはスレッドごとのため）。
+"""
+
+import functools
+import importlib.util
+import os
+import time
+
+# ========================================
+# 設定
+# ========================================
+
+# auto: X-Ray デーモンのアドレスがある（Tracing: Active の Lambda）かつ SDK がある場合に有効
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'auto').lower()
+
+if TRACING_ENABLED == 'auto':
+    XRAY_ENABLED = (
+        'AWS_XRAY_DAEMON_ADDRESS' in os.environ
+        and importlib.util.find_spec('aws_xray_sdk') is not None
+    )
+else:
+    XRAY_ENABLED = TRACING_ENABLED == 'true'
+
+# Server-Timing の各項目の最大数（ヘッダーが大きくなりすぎないよう、超えた分は出力しない）
+SERVER_TIMING_MAX_ENTRIES = 20
+
+# X-Ray のアノテーションに使える値の型
+_ANNOTATION_TYPES = (str, int, float, bool)
+
+_recorder = None
+
+# 呼び出し単位の状態（Lambda は1コンテナで同時に1呼び出しのみ処理する）
+# _timings: Server-Timing 用に収集中のスパン（名前, ミリ秒）のリスト。収集しない場合は None
+_timings = None
+_started_at = None
+_active = XRAY_ENABLED
+
+
+def get_recorder():
+    """X-Ray レコーダーを取得（インポートは初回のみ）"""
+    global _recorder
+    if _recorder is None:
+        from aws_xray_sdk.core import xray_recorder
+        _recorder = xray_recorder
+    return _recorder
+
+
+# ========================================
+# スパン
+# ========================================
+
+class Span:
+    """
+    1つの処理区間
+
+    X-Ray 有効時はサブセグメントを作り、annotations をアノテーションとして付ける
+    （例外はサブセグメントに記録して再送出する）。Server-Timing の収集中は所要時間を記録する。
+    """
+
+    __slots__ = ('name', 'annotations', 'started_at', 'subsegment_context')
+
+    def __init__(self, name, annotations):
+        self.name = name
+        self.annotations = annotations
+        self.started_at = None
+        self.subsegment_context = None
+
+    def __enter__(self):
+        if XRAY_ENABLED:
+            self.subsegment_context = get_recorder().in_subsegment(self.name)
+            subsegment = self.subsegment_context.__enter__()
+            if subsegment is not None:
+                for key, value in self.annotations.items():
+                    if isinstance(value, _ANNOTATION_TYPES):
+                        subsegment.put_annotation(key, value)
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        timings = _timings
+        if timings is not None:
+            timings.append((self.name, (time.perf_counter() - self.started_at) * 1000))
+        if self.subsegment_context is not None:
+            self.subsegment_context.__exit__(exc_type, exc_value, traceback)
+        return False
+
+
+class _NoopSpan:
+    """トレーシング無効時のスパン（何もしない）"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, **annotations):
+    """
+    処理区間を計測するコンテキストマネージャー
+
+    Args:
+        name: スパン名（X-Ray のサブセグメント名・Server-Timing の項目名。例: 'dynamodb.query'）
+        annotations: X-Ray のアノテーション（str / int / float / bool の値のみ）
+    """
+    if not _active:
+        return _NOOP_SPAN
+    return Span(name, annotations)
+
+
+def traced(name=None):
+    """関数の呼び出しをスパンで囲むデコレーター（name 省略時は関数名）"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def bind(func):
+    """
+    別スレッドで実行する関数に呼び出し元の X-Ray コンテキストを引き継ぐ
+
+    X-Ray 無効時は func をそのまま返す。
+    """
+    if not XRAY_ENABLED:
+        return func
+
+    recorder = get_recorder()
+    entity = recorder.get_trace_entity()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder.set_trace_entity(entity)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            recorder.clear_trace_entities()
+
+    return wrapper
+
+
+# ========================================
+# Server-Timing
+# ========================================
+
+def begin_timings(enabled=True):
+    """呼び出しの開始時に、この呼び出しのスパンを Server-Timing 用に収集するか決める"""
+    global _timings, _started_at, _active
+    _timings = [] if enabled else None
+    _started_at = time.perf_counter()
+    _active = XRAY_ENABLED or enabled
+
+
+def end_timings():
+    """呼び出しの終了時に収集を止める"""
+    global _timings, _started_at, _active
+    _timings = None
+    _started_at = None
+    _active = XRAY_ENABLED
+
+
+def server_timing_header():
+    """
+    収集したスパンを Server-Timing ヘッダーの値に変換
+
+    同じ名前のスパンは所要時間を合計し、回数を desc に付ける。先頭の total は
+    begin_timings() からの経過時間。入れ子のスパン（route.* の中の dynamodb.* など）は
+    それぞれに計上されるため、項目の合計は total を超えることがある。
+
+    Returns:
+        str | None: ヘッダーの値（収集していない場合は None）
+    """
+    if _timings is None:
+        return None
+
+    totals = {}
+    for name, duration in list(_timings):
+        total, count = totals.get(name, (0.0, 0))
+        totals[name] = (total + duration, count + 1)
+
+    entries = [f'total;dur={(time.perf_counter() - _started_at) * 1000:.1f}']
+    for name, (total, count) in list(totals.items())[:SERVER_TIMING_MAX_ENTRIES]:
+        entry = f'{name};dur={total:.1f}'
+        if count > 1:
+            entry += f';desc="x{count}"'
+        entries.append(entry)
+    return ', '.join(entries)
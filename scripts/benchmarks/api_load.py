@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+"""
+API Lambda のローカル負荷試験・レイテンシベンチマーク
+
+lambda_handler をプロセス内で直接呼び出し、DynamoDB クライアントを terraform/dynamodb.tf と
+同じキー・GSI 構成のインメモリ実装（memory_dynamodb）に差し替えて計測する。
+ルートごとに合成イベントを生成し、p50/p95/p99 レイテンシ・CPU 時間・DynamoDB 呼び出し回数と、
+tracemalloc によるリクエストあたりのメモリ割り当て（ピーク・保持）を出力する。
+
+DynamoDB 側の処理時間は含まない（--ddb-latency-ms で呼び出しごとに固定値を加算できる）。
+既定では API Lambda 自身のコスト（ルーティング・変換・シリアライズ）を計測する。
+結果を --json で保存し、別のコミットで --compare に渡すとルートごとの差分を表示する。
+
+使い方:
+    python scripts/benchmarks/api_load.py
+    python scripts/benchmarks/api_load.py --items 20000 --description-bytes 2000 --extra-attributes 20
+    python scripts/benchmarks/api_load.py --route get_item --route list_items --json after.json --compare before.json
+    python scripts/benchmarks/api_load.py --env ITEM_CACHE_SIZE=0 --ddb-latency-ms 5
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from memory_dynamodb import MemoryDynamoDB
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+API_DIR = ROOT_DIR / 'sam' / 'functions' / 'api'
+LAYER_DIR = ROOT_DIR / 'sam' / 'layers' / 'common'
+
+TABLE_NAME = 'benchmark-table'
+DAY_SECONDS = 24 * 60 * 60
+
+# 検索でヒットするよう、名前・説明は固定の語彙から組み立てる
+JAPANESE_WORDS = ('東京', '大阪', '京都', '観光', '名所', '商品', '在庫', '配送', '限定', '新作')
+
+# mixed シナリオのルートと重み（読み取り中心のトラフィック）
+MIXED_WEIGHTS = {
+    'get_item': 50,
+    'list_items': 15,
+    'list_items_status': 5,
+    'search': 10,
+    'get_item_stats': 5,
+    'create_item': 5,
+    'update_item': 5,
+    'health': 5,
+}
+
+
+class BenchmarkContext:
+    """Lambda コンテキストの代わり"""
+
+    function_name = 'api-benchmark'
+    invoked_function_arn = 'arn:aws:lambda:ap-northeast-1:000000000000:function:api-benchmark'
+    memory_limit_in_mb = 256
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def random_text(rng, length):
+    return ''.join(rng.choices(string.ascii_lowercase + ' ', k=length)).strip() or 'x'
+
+
+def build_vocabulary(rng, size):
+    words = {''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(size * 2)}
+    return sorted(words)[:size]
+
+
+# ========================================
+# テーブルの準備
+# ========================================
+
+class Fixture:
+    """
+    ベンチマーク用のテーブルと、イベント生成に使うアイテムの一覧
+
+    アイテムは API の build_new_item で作り（シャード・ステータスのキーも同じ形）、
+    Processor が維持する検索ポスティングと集計アイテムもあわせて書き込む。
+    """
+
+    def __init__(self, api, table, args):
+        self.api = api
+        self.table = table
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.vocabulary = build_vocabulary(self.rng, args.vocabulary)
+        self.now = int(time.time())
+
+        self.items = []
+        # delete_item / batch_delete で消費する ID（他のルートの計測対象とは別に用意する）
+        self.deletable_ids = []
+        self.first_page_cursor = None
+
+    def item_body(self):
+        rng = self.rng
+        name_words = rng.sample(self.vocabulary, 2) + [rng.choice(JAPANESE_WORDS)]
+        description_words = rng.sample(self.vocabulary, 3) + [rng.choice(JAPANESE_WORDS)]
+        description = ' '.join(description_words)
+        if len(description) < self.args.description_bytes:
+            description += ' ' + random_text(rng, self.args.description_bytes - len(description) - 1)
+        return {
+            'name': ' '.join(name_words),
+            'description': description[:self.args.description_bytes],
+            'status': 'active' if rng.random() < self.args.active_ratio else 'inactive',
+        }
+
+    def extra_attributes(self):
+        """アイテムサイズを調整する追加属性（ネストした Map / List を含む）"""
+        rng = self.rng
+        attributes = {}
+        for i in range(self.args.extra_attributes):
+            attributes[f'attr{i:02d}'] = rng.choice((
+                random_text(rng, 24),
+                rng.randint(0, 10 ** 6),
+                rng.random() < 0.5,
+                {'code': random_text(rng, 6), 'count': rng.randint(0, 100), 'tags': [random_text(rng, 5) for _ in range(3)]},
+                [rng.randint(0, 1000) for _ in range(5)],
+            ))
+        return attributes
+
+    def new_item(self):
+        created_at = self.now - self.rng.randint(0, self.args.days * DAY_SECONDS)
+        item = self.api.build_new_item(self.item_body(), created_at)
+        item.update(self.extra_attributes())
+        return item
+
+    def populate(self, deletable):
+        """アイテム・ポスティング・集計アイテムを書き込む"""
+        from aggregates import (DAY_SK_PREFIX, STATS_PK_PREFIX, STATUS_ATTRIBUTE_PREFIX, SUMMARY_SK,
+                                TOTAL_ATTRIBUTE, day_bucket)
+        from ddb_json import serialize_item
+        from search_index import WEIGHT_ATTRIBUTE, posting_key, term_weights
+
+        items = [self.new_item() for _ in range(self.args.items + deletable)]
+        self.items = items[:self.args.items]
+        self.deletable_ids = [item['ItemId'] for item in items[self.args.items:]]
+
+        summary = Counter()
+        daily = Counter()
+        wire_items = []
+        for item in items:
+            wire_items.append(serialize_item(item))
+            for term, weight in term_weights(item, self.args.max_terms_per_item).items():
+                wire_items.append(serialize_item(dict(posting_key(term, item['ItemId']), **{WEIGHT_ATTRIBUTE: weight})))
+            summary[TOTAL_ATTRIBUTE] += 1
+            summary[f"{STATUS_ATTRIBUTE_PREFIX}{item['Status']}"] += 1
+            daily[day_bucket(item['CreatedAt'])] += 1
+
+        stats_pk = f'{STATS_PK_PREFIX}Item'
+        wire_items.append(serialize_item({'PK': stats_pk, 'SK': SUMMARY_SK, 'UpdatedAt': self.now, **summary}))
+        wire_items.extend(
+            serialize_item({'PK': stats_pk, 'SK': f'{DAY_SK_PREFIX}{day}', TOTAL_ATTRIBUTE: count})
+            for day, count in daily.items()
+        )
+        self.table.load(wire_items)
+
+
+# ========================================
+# 合成イベント
+# ========================================
+
+def api_event(method, path, query=None, body=None, path_parameters=None, headers=None):
+    """API Gateway（REST API）のプロキシ統合イベント"""
+    event_headers = {'Content-Type': 'application/json', 'User-Agent': 'api-load-benchmark'}
+    event_headers.update(headers or {})
+    return {
+        'httpMethod': method,
+        'path': path,
+        'resource': path,
+        'headers': event_headers,
+        'multiValueHeaders': {name: [value] for name, value in event_headers.items()},
+        'queryStringParameters': query,
+        'pathParameters': path_parameters,
+        'body': json.dumps(body, ensure_ascii=False) if body is not None else None,
+        'isBase64Encoded': False,
+        'requestContext': {'stage': 'benchmark', 'requestId': str(uuid.uuid4())},
+    }
+
+
+class EventFactory:
+    """ルートごとの合成イベント生成（name -> 関数）"""
+
+    def __init__(self, fixture, args):
+        self.fixture = fixture
+        self.args = args
+        self.rng = random.Random(args.seed + 1)
+
+    def event(self, *args, **kwargs):
+        return api_event(*args, **kwargs)
+
+    def random_item(self):
+        return self.rng.choice(self.fixture.items)
+
+    def take_deletable(self):
+        return self.fixture.deletable_ids.pop()
+
+    def search_query(self):
+        words = [self.rng.choice(self.fixture.vocabulary)]
+        if self.rng.random() < 0.3:
+            words.append(self.rng.choice(JAPANESE_WORDS))
+        return ' '.join(words)
+
+    # --- ルート ---
+
+    def health(self):
+        return self.event('GET', '/health')
+
+    def health_deep(self):
+        return self.event('GET', '/health', query={'mode': 'deep'})
+
+    def list_items(self):
+        return self.event('GET', '/items', query={'limit': str(self.args.page_size)})
+
+    def list_items_next(self):
+        return self.event('GET', '/items', query={'limit': str(self.args.page_size), 'cursor': self.fixture.first_page_cursor})
+
+    def list_items_status(self):
+        return self.event('GET', '/items', query={'limit': str(self.args.page_size), 'status': 'active'})
+
+    def list_items_fields(self):
+        return self.event('GET', '/items', query={'limit': str(self.args.page_size), 'fields': 'ItemId,Name,Status'})
+
+    def get_item(self):
+        item_id = self.random_item()['ItemId']
+        return self.event('GET', f'/items/{item_id}', path_parameters={'id': item_id})
+
+    def get_item_not_modified(self):
+        item = self.random_item()
+        return self.event('GET', f"/items/{item['ItemId']}", path_parameters={'id': item['ItemId']},
+                          headers={'If-None-Match': self.fixture.api.item_etag(item)})
+
+    def get_item_missing(self):
+        item_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        return self.event('GET', f'/items/{item_id}', path_parameters={'id': item_id})
+
+    def get_item_stats(self):
+        return self.event('GET', '/items/stats', query={'days': '30'})
+
+    def search(self):
+        return self.event('GET', '/items/search', query={'q': self.search_query(), 'limit': '20'})
+
+    def create_item(self):
+        return self.event('POST', '/items', body=self.fixture.item_body())
+
+    def update_item(self):
+        item_id = self.random_item()['ItemId']
+        body = {'name': self.fixture.item_body()['name'], 'status': self.rng.choice(('active', 'inactive'))}
+        return self.event('PUT', f'/items/{item_id}', path_parameters={'id': item_id}, body=body)
+
+    def delete_item(self):
+        item_id = self.take_deletable()
+        return self.event('DELETE', f'/items/{item_id}', path_parameters={'id': item_id})
+
+    def batch_get(self):
+        ids = [self.random_item()['ItemId'] for _ in range(self.args.batch_size)]
+        return self.event('POST', '/items:batchGet', body={'ids': list(dict.fromkeys(ids))})
+
+    def batch_create(self):
+        return self.event('POST', '/items:batchCreate',
+                          body={'items': [self.fixture.item_body() for _ in range(self.args.batch_size)]})
+
+    def batch_delete(self):
+        return self.event('POST', '/items:batchDelete',
+                          body={'ids': [self.take_deletable() for _ in range(self.args.batch_size)]})
+
+    def route_not_found(self):
+        return self.event('GET', '/unknown')
+
+    def mixed(self):
+        routes, weights = zip(*MIXED_WEIGHTS.items())
+        return getattr(self, self.rng.choices(routes, weights)[0])()
+
+
+ROUTES = (
+    'health', 'health_deep',
+    'list_items', 'list_items_next', 'list_items_status', 'list_items_fields',
+    'get_item', 'get_item_not_modified', 'get_item_missing', 'get_item_stats', 'search',
+    'create_item', 'update_item', 'delete_item', 'batch_get', 'batch_create', 'batch_delete',
+    'route_not_found', 'mixed',
+)
+
+# ========================================
+# 計測
+# ========================================
+
+def percentile(sorted_values, fraction):
+    """線形補間のパーセンタイル（sorted_values は昇順）"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def invoke(handler, event):
+    return handler(event, BenchmarkContext())
+
+
+def measure_latency(handler, events, table):
+    """イベントを順に実行し、レイテンシ・CPU 時間・ステータス・DynamoDB 呼び出しを集計"""
+    latencies = []
+    statuses = Counter()
+    response_bytes = 0
+    calls_before = Counter(table.calls)
+
+    cpu_started = time.process_time()
+    for event in events:
+        started = time.perf_counter()
+        response = invoke(handler, event)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses[response['statusCode']] += 1
+        response_bytes += len(response.get('body') or '')
+    cpu_ms = (time.process_time() - cpu_started) * 1000
+
+    calls = table.calls - calls_before
+    latencies.sort()
+    count = len(latencies)
+    return {
+        'requests': count,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': statistics.fmean(latencies),
+        'max_ms': latencies[-1],
+        'cpu_ms_per_request': cpu_ms / count,
+        'requests_per_second': count / (sum(latencies) / 1000),
+        'status_codes': {str(code): value for code, value in sorted(statuses.items())},
+        'response_bytes_mean': response_bytes / count,
+        'dynamodb_calls_per_request': sum(calls.values()) / count,
+        'dynamodb_calls': dict(sorted(calls.items())),
+    }
+
+
+def measure_allocations(handler, events, top):
+    """
+    tracemalloc でリクエストあたりのメモリ割り当てを計測
+
+    peak はリクエスト処理中の最大使用量（開始時点からの増分）、retained は処理後も残った量
+    （キャッシュ・コネクションなど）。tracemalloc は処理を大きく遅くするため、レイテンシとは別に実行する。
+    """
+    peaks = []
+    retained = []
+    gc.collect()
+    tracemalloc.start(10)
+    try:
+        baseline = tracemalloc.take_snapshot()
+        for event in events:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            invoke(handler, event)
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    # スタンドイン・ベンチマーク自身の割り当ては除き、Lambda のコード（sam/ 配下）から呼ばれたものだけを数える
+    filters = [
+        tracemalloc.Filter(True, f"{ROOT_DIR / 'sam'}{os.sep}*", all_frames=True),
+        tracemalloc.Filter(False, sys.modules[MemoryDynamoDB.__module__].__file__, all_frames=True),
+    ]
+    top_sites = [
+        {
+            'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'retained_bytes': stat.size_diff,
+            'blocks': stat.count_diff,
+        }
+        for stat in snapshot.filter_traces(filters).compare_to(baseline.filter_traces(filters), 'lineno')[:top]
+        if stat.size_diff > 0
+    ]
+    return {
+        'requests': len(events),
+        'peak_kib_mean': statistics.fmean(peaks) / 1024,
+        'peak_kib_max': max(peaks) / 1024,
+        'retained_bytes_mean': statistics.fmean(retained),
+        'top_retained_sites': top_sites,
+    }
+
+
+def run_route(name, factory, handler, table, args):
+    generate = getattr(factory, name)
+    # イベント生成のコストは計測に含めない
+    warmup_events = [generate() for _ in range(args.warmup)]
+    events = [generate() for _ in range(args.requests)]
+    alloc_events = [generate() for _ in range(args.alloc_requests)]
+
+    for event in warmup_events:
+        invoke(handler, event)
+
+    result = measure_latency(handler, events, table)
+    if alloc_events:
+        result['allocations'] = measure_allocations(handler, alloc_events, args.alloc_top)
+    return result
+
+
+# ========================================
+# 出力
+# ========================================
+
+def git_revision():
+    """計測したツリーのコミット（差分比較用）"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        status = subprocess.run(['git', 'status', '--porcelain', '--', 'sam'], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit.stdout.strip(), 'dirty': bool(status.stdout.strip())}
+
+
+def print_results(results):
+    print(f"{'route':<22} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'cpu ms':>7} "
+          f"{'ddb':>5} {'resp KiB':>8} {'peak KiB':>9}  status")
+    for name, result in results.items():
+        allocations = result.get('allocations', {})
+        peak = f"{allocations['peak_kib_mean']:>9.1f}" if allocations else f"{'-':>9}"
+        statuses = ' '.join(f'{code}x{count}' for code, count in result['status_codes'].items())
+        print(f"{name:<22} {result['requests']:>5} {result['p50_ms']:>8.3f} {result['p95_ms']:>8.3f} "
+              f"{result['p99_ms']:>8.3f} {result['max_ms']:>8.3f} {result['cpu_ms_per_request']:>7.3f} "
+              f"{result['dynamodb_calls_per_request']:>5.1f} {result['response_bytes_mean'] / 1024:>8.1f} {peak}  {statuses}")
+
+
+def print_comparison(baseline, results, threshold):
+    """以前の --json の結果との差分（threshold を超えて悪化したものに ! を付ける）"""
+    previous = baseline['results']
+    revision = baseline.get('environment', {}).get('git', {}).get('commit')
+    print()
+    print(f"Compared with {revision or 'baseline'} (! = slower by more than {threshold:.0%})")
+    print(f"{'route':<22} {'p50':>22} {'p95':>22} {'p99':>22} {'peak KiB':>22}")
+
+    def delta(old, new):
+        if old is None or new is None:
+            return f"{'-':>22}"
+        change = (new - old) / old if old else 0.0
+        mark = '!' if change > threshold else ' '
+        return f"{old:>8.3f} -> {new:>8.3f} {change:>+5.0%}{mark}"
+
+    for name, result in results.items():
+        old = previous.get(name)
+        if old is None:
+            print(f'{name:<22} (new route)')
+            continue
+        old_peak = old.get('allocations', {}).get('peak_kib_mean')
+        new_peak = result.get('allocations', {}).get('peak_kib_mean')
+        print(f"{name:<22} {delta(old['p50_ms'], result['p50_ms'])} {delta(old['p95_ms'], result['p95_ms'])} "
+              f"{delta(old['p99_ms'], result['p99_ms'])} {delta(old_peak, new_peak)}")
+
+
+# ========================================
+# エントリーポイント
+# ========================================
+
+def configure_environment(args):
+    """API Lambda のインポート前に環境変数を設定"""
+    os.environ.update({
+        'DYNAMODB_TABLE': TABLE_NAME,
+        'AWS_DEFAULT_REGION': 'ap-northeast-1',
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'ENVIRONMENT': 'benchmark',
+        'CURSOR_SECRET': 'benchmark-cursor-secret',
+        'LOG_LEVEL': args.log_level,
+        'HEALTH_CHECK_CLOUDWATCH': 'false',
+    })
+    for assignment in args.env:
+        name, _, value = assignment.partition('=')
+        os.environ[name] = value
+
+    if os.environ.get('DYNAMODB_LOW_LEVEL_CLIENT', 'true').lower() != 'true':
+        raise SystemExit('DYNAMODB_LOW_LEVEL_CLIENT=false is not supported (the stand-in replaces the low-level client)')
+
+    sys.path[:0] = [str(API_DIR), str(LAYER_DIR)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--route', choices=ROUTES, action='append', help='計測するルート（省略時は全ルート）')
+    parser.add_argument('--items', type=int, default=2000, help='テーブルのアイテム数')
+    parser.add_argument('--description-bytes', type=int, default=200, help='Description の長さ（文字数）')
+    parser.add_argument('--extra-attributes', type=int, default=0, help='アイテムあたりの追加属性数（Map / List を含む）')
+    parser.add_argument('--active-ratio', type=float, default=0.8, help='Status=active のアイテムの割合')
+    parser.add_argument('--days', type=int, default=90, help='CreatedAt を分布させる日数')
+    parser.add_argument('--vocabulary', type=int, default=500, help='名前・説明に使う語彙の数（検索のヒット率に影響）')
+    parser.add_argument('--max-terms-per-item', type=int, default=256, help='アイテムあたりのポスティング数の上限')
+    parser.add_argument('--page-size', type=int, default=20, help='一覧の limit')
+    parser.add_argument('--batch-size', type=int, default=25, help='バッチ操作あたりのアイテム数')
+    parser.add_argument('--requests', type=int, default=300, help='ルートあたりの計測リクエスト数')
+    parser.add_argument('--warmup', type=int, default=30, help='ルートあたりのウォームアップリクエスト数')
+    parser.add_argument('--alloc-requests', type=int, default=30, help='メモリ割り当てを計測するリクエスト数（0 で無効）')
+    parser.add_argument('--alloc-top', type=int, default=5, help='表示する保持メモリの多い行数')
+    parser.add_argument('--ddb-latency-ms', type=float, default=0.0, help='DynamoDB 呼び出しごとに加える待ち時間')
+    parser.add_argument('--no-json-roundtrip', action='store_true', help='DynamoDB レスポンスの JSON 往復を省く')
+    parser.add_argument('--log-level', default='WARNING', help='API Lambda の LOG_LEVEL')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE', help='API Lambda の環境変数を上書き')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, help='結果を JSON で保存するパス')
+    parser.add_argument('--compare', type=Path, help='比較する以前の --json の結果')
+    parser.add_argument('--threshold', type=float, default=0.10, help='--compare で悪化とみなす割合')
+    args = parser.parse_args()
+
+    configure_environment(args)
+    import aws_clients
+    import index as api
+
+    table = MemoryDynamoDB(TABLE_NAME, latency_ms=args.ddb_latency_ms, json_roundtrip=not args.no_json_roundtrip)
+    aws_clients.set_client('dynamodb', table)
+
+    routes = args.route or list(ROUTES)
+    per_route = args.warmup + args.requests + args.alloc_requests
+    deletable = 0
+    for name in routes:
+        if name == 'delete_item':
+            deletable += per_route
+        elif name == 'batch_delete':
+            deletable += per_route * args.batch_size
+
+    fixture = Fixture(api, table, args)
+    started = time.perf_counter()
+    fixture.populate(deletable)
+    print(f"Loaded {len(table)} table items ({args.items} items) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    factory = EventFactory(fixture, args)
+    if 'list_items_next' in routes:
+        first_page = json.loads(invoke(api.lambda_handler, api_event('GET', '/items', query={'limit': str(args.page_size)}))['body'])
+        fixture.first_page_cursor = first_page.get('next_cursor')
+
+    results = {}
+    for name in routes:
+        results[name] = run_route(name, factory, api.lambda_handler, table, args)
+        print(f"  {name}: p50 {results[name]['p50_ms']:.3f} ms", file=sys.stderr)
+
+    print()
+    print_results(results)
+    if args.alloc_requests and args.alloc_top:
+        print()
+        print('Top retained allocation sites:')
+        for name, result in results.items():
+            for site in result.get('allocations', {}).get('top_retained_sites', []):
+                print(f"  {name:<22} {site['retained_bytes']:>9} B {site['blocks']:>6} blocks  {site['site']}")
+
+    report = {
+        'params': {name: str(value) if isinstance(value, Path) else value for name, value in vars(args).items()},
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'git': git_revision(),
+        },
+        'results': results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.compare:
+        print_comparison(json.loads(args.compare.read_text()), results, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
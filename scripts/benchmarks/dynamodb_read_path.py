@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+API Lambda の読み取り経路（デシリアライズ + JSON レスポンス生成）のマイクロベンチマーク
+
+Query / BatchGetItem の結果（ワイヤー形式）を、従来の Table リソース相当の経路
+（TypeDeserializer で Decimal に変換 → DecimalEncoder で json.dumps）と、
+低レベルクライアント経路（ddb_json で JSON 互換の型に1パスで変換 → json.dumps）で比較する。
+
+使い方:
+    python scripts/benchmarks/dynamodb_read_path.py
+    python scripts/benchmarks/dynamodb_read_path.py --items 100 500 2000 --attributes 20
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+from boto3.dynamodb.types import TypeDeserializer
+
+COMMON_DIR = Path(__file__).resolve().parents[2] / 'sam' / 'layers' / 'common'
+sys.path.insert(0, str(COMMON_DIR))
+
+from ddb_json import deserialize_items  # noqa: E402
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """API Lambda の DecimalEncoder と同じ変換（比較用）"""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+
+def random_text(rng, low, high):
+    return ''.join(rng.choices(string.ascii_letters, k=rng.randint(low, high)))
+
+
+def build_items(count, attributes, seed):
+    """API が返すアイテムに近い形のワイヤー形式アイテムを生成"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        item_id = f'{i:08d}'
+        item = {
+            'PK': {'S': f'ITEM#{item_id}'},
+            'SK': {'S': 'METADATA'},
+            'EntityType': {'S': 'Item'},
+            'ItemId': {'S': item_id},
+            'Name': {'S': random_text(rng, 5, 30)},
+            'Status': {'S': rng.choice(('active', 'inactive'))},
+            'CreatedAt': {'N': str(1700000000 + i)},
+            'UpdatedAt': {'N': str(1700000000 + i)},
+            'Version': {'N': str(rng.randint(1, 20))},
+            'Price': {'N': f'{rng.uniform(0, 1000):.2f}'},
+            'Tags': {'L': [{'S': random_text(rng, 3, 10)} for _ in range(3)]},
+        }
+        for j in range(attributes):
+            item[f'attr{j}'] = rng.choice((
+                {'S': random_text(rng, 5, 40)},
+                {'N': str(rng.randint(0, 10 ** 6))},
+                {'BOOL': rng.random() < 0.5},
+                {'M': {'k': {'S': random_text(rng, 3, 10)}, 'v': {'N': str(rng.randint(0, 100))}}},
+            ))
+        items.append(item)
+    return items
+
+
+def resource_path(items, deserializer=TypeDeserializer()):
+    decoded = [{key: deserializer.deserialize(value) for key, value in item.items()} for item in items]
+    return json.dumps({'items': decoded}, cls=DecimalEncoder, ensure_ascii=False)
+
+
+def client_path(items):
+    return json.dumps({'items': deserialize_items(items)}, ensure_ascii=False)
+
+
+def run(items, number, repeat):
+    cases = {
+        'resource': lambda: resource_path(items),
+        'client': lambda: client_path(items),
+    }
+
+    results = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+        results[name] = best * 1e3  # ms/レスポンス
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[100, 500, 1000], help='1レスポンスあたりのアイテム数')
+    parser.add_argument('--attributes', type=int, default=10, help='アイテムあたりの追加属性数')
+    parser.add_argument('--number', type=int, default=10, help='1計測あたりの実行回数')
+    parser.add_argument('--repeat', type=int, default=5, help='計測回数（最小値を採用）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, help='結果を JSON で保存するパス')
+    args = parser.parse_args()
+
+    print(f"{'items':>6} {'KiB':>8} {'resource ms':>12} {'client ms':>10} {'speedup':>8}")
+    report = {}
+    for count in args.items:
+        items = build_items(count, args.attributes, args.seed)
+        assert json.loads(resource_path(items)) == json.loads(client_path(items))
+
+        size = len(client_path(items))
+        results = run(items, args.number, args.repeat)
+        report[count] = results | {'response_bytes': size}
+        print(f"{count:>6} {size / 1024:>8.1f} {results['resource']:>12.2f} {results['client']:>10.2f} "
+              f"{results['resource'] / results['client']:>7.2f}x")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            'params': vars(args) | {'json': str(args.json)},
+            'results_ms_per_response': report
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
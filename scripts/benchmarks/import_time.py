@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Lambda 関数のコールドスタート初期化プロファイル
+
+各関数の index モジュールを新しいプロセスで `python -X importtime` 付きでインポートし、
+出力をパースして累積時間の大きいモジュールを表にする。
+あわせて、初回リクエストで発生する DynamoDB クライアント生成の時間も計測する。
+
+使い方:
+    python scripts/benchmarks/import_time.py
+    python scripts/benchmarks/import_time.py --top 30 --json import_time.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SAM_DIR = Path(__file__).resolve().parents[2] / 'sam'
+LAYER_DIR = SAM_DIR / 'layers' / 'common'
+FUNCTIONS = {
+    'api': SAM_DIR / 'functions' / 'api',
+    'processor': SAM_DIR / 'functions' / 'processor',
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+# index のインポート後に、初回利用で生成されるクライアントの時間を計測する
+FIRST_USE_SNIPPET = '''
+import time
+started = time.perf_counter()
+import index
+imported = time.perf_counter()
+import aws_clients
+aws_clients.get_table(index.table_name)
+first_use = time.perf_counter()
+print(f"{(imported - started) * 1000:.1f} {(first_use - imported) * 1000:.1f}")
+'''
+
+
+def function_env(function_dir):
+    env = dict(os.environ)
+    env.setdefault('DYNAMODB_TABLE', 'benchmark-table')
+    env.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+    env.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    env.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    # API Lambda はインポート時に必須
+    env.setdefault('CURSOR_SECRET', 'benchmark')
+    env['PYTHONPATH'] = os.pathsep.join([str(function_dir), str(LAYER_DIR)])
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def parse_importtime(stderr):
+    """-X importtime の出力を [{module, self_us, cumulative_us, depth}] に変換"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                'module': module,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': len(indent) // 2,
+            })
+    return rows
+
+
+def profile_function(name, function_dir, top):
+    env = function_env(function_dir)
+
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import index'],
+        cwd=function_dir, env=env, capture_output=True, text=True, check=True
+    )
+    rows = parse_importtime(completed.stderr)
+    index_row = next(row for row in rows if row['module'] == 'index')
+
+    first_use = subprocess.run(
+        [sys.executable, '-c', FIRST_USE_SNIPPET],
+        cwd=function_dir, env=env, capture_output=True, text=True, check=True
+    )
+    import_ms, first_use_ms = (float(value) for value in first_use.stdout.split())
+
+    # index 配下のトップレベル依存（depth=1）を累積時間順に並べる
+    top_level = sorted(
+        (row for row in rows if row['depth'] == 1),
+        key=lambda row: row['cumulative_us'],
+        reverse=True
+    )[:top]
+
+    return {
+        'function': name,
+        'index_cumulative_ms': index_row['cumulative_us'] / 1000,
+        'import_wall_ms': import_ms,
+        'first_client_ms': first_use_ms,
+        'top_imports': top_level,
+    }
+
+
+def print_report(report):
+    print(f"## {report['function']}")
+    print()
+    print(f"- import index (importtime cumulative): {report['index_cumulative_ms']:.1f} ms")
+    print(f"- import index (wall clock): {report['import_wall_ms']:.1f} ms")
+    print(f"- first DynamoDB table resource: {report['first_client_ms']:.1f} ms")
+    print()
+    print('| module | self (ms) | cumulative (ms) |')
+    print('|---|---:|---:|')
+    for row in report['top_imports']:
+        print(f"| {row['module']} | {row['self_us'] / 1000:.1f} | {row['cumulative_us'] / 1000:.1f} |")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--function', choices=sorted(FUNCTIONS), action='append', help='対象の関数（省略時は全関数）')
+    parser.add_argument('--top', type=int, default=15, help='表示するモジュール数')
+    parser.add_argument('--json', type=Path, help='結果を JSON で保存するパス')
+    args = parser.parse_args()
+
+    reports = [
+        profile_function(name, FUNCTIONS[name], args.top)
+        for name in (args.function or sorted(FUNCTIONS))
+    ]
+    for report in reports:
+        print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,860 @@
+"""
+ベンチマーク用のインメモリ DynamoDB（低レベルクライアント互換）
+
+terraform/dynamodb.tf のキースキーマ・GSI 定義を読み込み、同じ PK/SK と GSI の形で
+アイテムを保持する。Lambda 関数が使う操作（GetItem / PutItem / UpdateItem / DeleteItem /
+Query / BatchGetItem / BatchWriteItem）をワイヤー形式（{'S': ...} など）のまま処理する。
+
+式（KeyCondition / Condition / Filter / Update / Projection）は関数が実際に使う範囲を
+サポートし、条件付き書き込みの失敗は botocore の ClientError として送出する。
+パーティションは並べ替え済みのリストで持ち、Query は二分探索で範囲を絞るため、
+スタンドイン自体のコストがテーブルの件数に比例して増えることはない。
+
+    table = MemoryDynamoDB('benchmark-table')
+    aws_clients.set_client('dynamodb', table)
+    aws_clients.set_table('benchmark-table', MemoryTable(table))
+"""
+
+import bisect
+import copy
+import json
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from decimal import Decimal
+from pathlib import Path
+
+from botocore.exceptions import ClientError
+
+TERRAFORM_TABLE = Path(__file__).resolve().parents[2] / 'terraform' / 'dynamodb.tf'
+
+# BatchGetItem / BatchWriteItem の1リクエストあたりの上限
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+
+TableSchema = namedtuple('TableSchema', 'hash_key range_key attribute_types indexes')
+IndexSchema = namedtuple('IndexSchema', 'name hash_key range_key')
+
+# ========================================
+# スキーマ
+# ========================================
+
+_BLOCK_PATTERN = re.compile(r'global_secondary_index\s*\{(.*?)\n\s*\}', re.S)
+_ATTRIBUTE_PATTERN = re.compile(r'attribute\s*\{\s*name\s*=\s*"(\w+)"\s*type\s*=\s*"(\w)"', re.S)
+
+
+def _setting(text, name):
+    match = re.search(rf'^\s*{name}\s*=\s*"([^"]+)"', text, re.M)
+    return match.group(1) if match else None
+
+
+def load_table_schema(path=TERRAFORM_TABLE):
+    """
+    dynamodb.tf の aws_dynamodb_table からキースキーマと GSI を読み込む
+
+    Returns:
+        TableSchema: (hash_key, range_key, {属性名: 型}, [IndexSchema])
+    """
+    text = Path(path).read_text(encoding='utf-8')
+    start = text.index('resource "aws_dynamodb_table"')
+    text = text[start:]
+
+    indexes = [
+        IndexSchema(_setting(block, 'name'), _setting(block, 'hash_key'), _setting(block, 'range_key'))
+        for block in _BLOCK_PATTERN.findall(text)
+    ]
+    table_text = _BLOCK_PATTERN.sub('', text)
+    return TableSchema(
+        hash_key=_setting(table_text, 'hash_key'),
+        range_key=_setting(table_text, 'range_key'),
+        attribute_types=dict(_ATTRIBUTE_PATTERN.findall(text)),
+        indexes=indexes
+    )
+
+
+# ========================================
+# 値の比較
+# ========================================
+
+def comparable(value):
+    """ワイヤー形式のスカラー値を比較可能な Python の値に変換（S / N / B 以外は None）"""
+    if 'S' in value:
+        return value['S']
+    if 'N' in value:
+        return Decimal(value['N'])
+    if 'B' in value:
+        return value['B']
+    return None
+
+
+def _format_number(number):
+    """Decimal を N 型の文字列に変換（整数は指数表記にしない）"""
+    if number == number.to_integral_value():
+        return str(number.quantize(Decimal(1)))
+    return str(number.normalize())
+
+
+# ========================================
+# 式
+# ========================================
+
+_TOKEN_PATTERN = re.compile(r'\s*(?:(<>|<=|>=|[=<>(),+\-\[\].])|(:\w+)|(#?\w+))')
+_KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'ADD', 'REMOVE', 'DELETE'}
+
+
+def _validation_error(message, operation):
+    return ClientError({'Error': {'Code': 'ValidationException', 'Message': message}}, operation)
+
+
+class _Parser:
+    """
+    式のパーサー
+
+    構文木はタプルで表す:
+        ('path', 名前) / ('value', ワイヤー値) / ('size', パス)
+        ('cmp', 演算子, 左, 右) / ('between', 値, 下限, 上限) / ('in', 値, [候補])
+        ('func', 関数名, [引数]) / ('and', 左, 右) / ('or', 左, 右) / ('not', 式)
+    """
+
+    def __init__(self, expression, names, values, operation):
+        self.tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = _TOKEN_PATTERN.match(expression, position)
+            if match is None:
+                raise _validation_error(f'Invalid expression: {expression}', operation)
+            self.tokens.append(next(group for group in match.groups() if group is not None))
+            position = match.end()
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+        self.operation = operation
+        self.expression = expression
+
+    def error(self, message):
+        return _validation_error(f'{message}: {self.expression}', self.operation)
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def peek_keyword(self):
+        token = self.peek()
+        return token.upper() if token is not None and token.upper() in _KEYWORDS else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected is not None and token.upper() != expected):
+            raise self.error(f'Expected {expected or "token"}')
+        self.position += 1
+        return token
+
+    def done(self):
+        return self.position >= len(self.tokens)
+
+    # --- オペランド ---
+
+    def name(self, token):
+        if token.startswith('#'):
+            if token not in self.names:
+                raise self.error(f'Undefined attribute name {token}')
+            return self.names[token]
+        return token
+
+    def path(self):
+        token = self.take()
+        if token.startswith(':') or not re.match(r'#?\w+$', token):
+            raise self.error('Expected attribute path')
+        if self.peek() in ('.', '['):
+            raise self.error('Nested attribute paths are not supported')
+        return ('path', self.name(token))
+
+    def operand(self):
+        token = self.peek()
+        if token is None:
+            raise self.error('Unexpected end of expression')
+        if token.startswith(':'):
+            self.take()
+            if token not in self.values:
+                raise self.error(f'Undefined attribute value {token}')
+            return ('value', self.values[token])
+        if token.lower() in ('size', 'if_not_exists', 'list_append') and self.tokens[self.position + 1:self.position + 2] == ['(']:
+            function = self.take().lower()
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                args.append(self.operand())
+            self.take(')')
+            return (function, *args)
+        return self.path()
+
+    # --- 条件式 ---
+
+    def condition(self):
+        node = self.conjunction()
+        while self.peek_keyword() == 'OR':
+            self.take()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.peek_keyword() == 'AND':
+            self.take()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self):
+        if self.peek_keyword() == 'NOT':
+            self.take()
+            return ('not', self.negation())
+        return self.primary()
+
+    def primary(self):
+        token = self.peek()
+        if token == '(':
+            self.take()
+            node = self.condition()
+            self.take(')')
+            return node
+
+        if token is not None and token.lower() in CONDITION_FUNCTIONS and self.tokens[self.position + 1:self.position + 2] == ['(']:
+            function = self.take().lower()
+            self.take('(')
+            args = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                args.append(self.operand())
+            self.take(')')
+            return ('func', function, args)
+
+        left = self.operand()
+        keyword = self.peek_keyword()
+        if keyword == 'BETWEEN':
+            self.take()
+            low = self.operand()
+            self.take('AND')
+            return ('between', left, low, self.operand())
+        if keyword == 'IN':
+            self.take()
+            self.take('(')
+            candidates = [self.operand()]
+            while self.peek() == ',':
+                self.take(',')
+                candidates.append(self.operand())
+            self.take(')')
+            return ('in', left, candidates)
+
+        operator = self.take()
+        if operator not in ('=', '<>', '<', '<=', '>', '>='):
+            raise self.error(f'Unexpected token {operator}')
+        return ('cmp', operator, left, self.operand())
+
+    # --- 更新式 ---
+
+    def update_actions(self):
+        """更新式を [(アクション, パス, 値の式)] に変換"""
+        actions = []
+        while not self.done():
+            clause = self.take()
+            clause = clause.upper()
+            if clause not in ('SET', 'ADD', 'REMOVE', 'DELETE'):
+                raise self.error(f'Unexpected token {clause}')
+            while True:
+                path = self.path()
+                if clause == 'SET':
+                    self.take('=')
+                    value = self.operand()
+                    if self.peek() in ('+', '-'):
+                        value = (self.take(), value, self.operand())
+                elif clause == 'REMOVE':
+                    value = None
+                else:
+                    value = self.operand()
+                actions.append((clause, path[1], value))
+                if self.peek() != ',':
+                    break
+                self.take(',')
+        return actions
+
+    def projection(self):
+        """射影式を属性名のリストに変換"""
+        names = [self.path()[1]]
+        while self.peek() == ',':
+            self.take(',')
+            names.append(self.path()[1])
+        return names
+
+
+def parse_condition(expression, names, values, operation):
+    parser = _Parser(expression, names, values, operation)
+    node = parser.condition()
+    if not parser.done():
+        raise parser.error(f'Unexpected token {parser.peek()}')
+    return node
+
+
+def _type_of(value):
+    return next(iter(value))
+
+
+def evaluate_operand(node, item):
+    """オペランドをワイヤー値（存在しなければ None）に評価"""
+    kind = node[0]
+    if kind == 'value':
+        return node[1]
+    if kind == 'path':
+        return item.get(node[1])
+    if kind == 'size':
+        value = evaluate_operand(node[1], item)
+        if value is None:
+            return None
+        data_type = _type_of(value)
+        data = value[data_type]
+        return {'N': str(len(data if data_type != 'N' else value['N']))}
+    if kind == 'if_not_exists':
+        current = evaluate_operand(node[1], item)
+        return current if current is not None else evaluate_operand(node[2], item)
+    if kind == 'list_append':
+        return {'L': evaluate_operand(node[1], item)['L'] + evaluate_operand(node[2], item)['L']}
+    if kind in ('+', '-'):
+        left = Decimal(evaluate_operand(node[1], item)['N'])
+        right = Decimal(evaluate_operand(node[2], item)['N'])
+        return {'N': _format_number(left + right if kind == '+' else left - right)}
+    raise ValueError(f'Unsupported operand: {kind}')
+
+
+def _compare(operator, left, right):
+    if left is None or right is None:
+        return operator == '<>' and (left is None) != (right is None)
+    if operator in ('=', '<>'):
+        if _type_of(left) != _type_of(right):
+            return operator == '<>'
+        left_value, right_value = comparable(left), comparable(right)
+        equal = left == right if left_value is None else left_value == right_value
+        return equal if operator == '=' else not equal
+    if _type_of(left) != _type_of(right) or comparable(left) is None:
+        return False
+    left_value, right_value = comparable(left), comparable(right)
+    return {
+        '<': left_value < right_value,
+        '<=': left_value <= right_value,
+        '>': left_value > right_value,
+        '>=': left_value >= right_value,
+    }[operator]
+
+
+def _contains(container, value):
+    data_type = _type_of(container)
+    if data_type == 'S':
+        return 'S' in value and value['S'] in container['S']
+    if data_type in ('SS', 'NS', 'BS'):
+        return next(iter(value.values())) in container[data_type]
+    if data_type == 'L':
+        return value in container['L']
+    return False
+
+
+CONDITION_FUNCTIONS = {
+    'attribute_exists': lambda item, path: evaluate_operand(path, item) is not None,
+    'attribute_not_exists': lambda item, path: evaluate_operand(path, item) is None,
+    'attribute_type': lambda item, path, data_type: (
+        evaluate_operand(path, item) is not None
+        and _type_of(evaluate_operand(path, item)) == evaluate_operand(data_type, item)['S']
+    ),
+    'begins_with': lambda item, path, prefix: (
+        (value := evaluate_operand(path, item)) is not None
+        and 'S' in value and value['S'].startswith(evaluate_operand(prefix, item)['S'])
+    ),
+    'contains': lambda item, path, value: (
+        (container := evaluate_operand(path, item)) is not None
+        and _contains(container, evaluate_operand(value, item))
+    ),
+}
+
+
+def evaluate_condition(node, item):
+    """条件式の構文木をアイテムに対して評価"""
+    kind = node[0]
+    if kind == 'and':
+        return evaluate_condition(node[1], item) and evaluate_condition(node[2], item)
+    if kind == 'or':
+        return evaluate_condition(node[1], item) or evaluate_condition(node[2], item)
+    if kind == 'not':
+        return not evaluate_condition(node[1], item)
+    if kind == 'cmp':
+        return _compare(node[1], evaluate_operand(node[2], item), evaluate_operand(node[3], item))
+    if kind == 'between':
+        value = evaluate_operand(node[1], item)
+        return _compare('>=', value, evaluate_operand(node[2], item)) and _compare('<=', value, evaluate_operand(node[3], item))
+    if kind == 'in':
+        value = evaluate_operand(node[1], item)
+        return any(_compare('=', value, evaluate_operand(candidate, item)) for candidate in node[2])
+    if kind == 'func':
+        return CONDITION_FUNCTIONS[node[1]](item, *node[2])
+    raise ValueError(f'Unsupported condition: {kind}')
+
+
+def _flatten_and(node):
+    if node[0] == 'and':
+        return _flatten_and(node[1]) + _flatten_and(node[2])
+    return [node]
+
+
+def _apply_update(item, actions):
+    """更新アクションを適用した新しいアイテムを返す（右辺は更新前のアイテムで評価する）"""
+    resolved = [
+        (action, name, None if value is None else evaluate_operand(value, item))
+        for action, name, value in actions
+    ]
+
+    updated = dict(item)
+    for action, name, value in resolved:
+        if action == 'SET':
+            updated[name] = value
+        elif action == 'REMOVE':
+            updated.pop(name, None)
+        elif action == 'ADD':
+            current = updated.get(name)
+            if current is None:
+                updated[name] = value
+            elif 'N' in value:
+                updated[name] = {'N': _format_number(Decimal(current['N']) + Decimal(value['N']))}
+            else:
+                data_type = _type_of(value)
+                updated[name] = {data_type: list(dict.fromkeys(current[data_type] + value[data_type]))}
+        elif action == 'DELETE':
+            current = updated.get(name)
+            if current is not None:
+                data_type = _type_of(value)
+                remaining = [member for member in current[data_type] if member not in value[data_type]]
+                if remaining:
+                    updated[name] = {data_type: remaining}
+                else:
+                    updated.pop(name)
+    return updated
+
+
+# ========================================
+# インデックス
+# ========================================
+
+class _Index:
+    """
+    テーブル本体または GSI の1つ分
+
+    パーティションキーの値ごとに (ソートキー, テーブルのキー) の並べ替え済みリストを持つ。
+    """
+
+    def __init__(self, name, hash_key, range_key, table_keys):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.table_keys = table_keys
+        self.partitions = {}
+
+    def entry(self, item):
+        """アイテムのエントリ（キー属性を持たないアイテムはインデックスに載らない）"""
+        hash_value = item.get(self.hash_key)
+        if hash_value is None:
+            return None, None
+        if self.range_key is None:
+            sort_value = None
+        else:
+            range_value = item.get(self.range_key)
+            if range_value is None:
+                return None, None
+            sort_value = comparable(range_value)
+        table_key = tuple(comparable(item[name]) for name in self.table_keys)
+        return comparable(hash_value), (sort_value, table_key)
+
+    def add(self, item):
+        partition_key, entry = self.entry(item)
+        if partition_key is not None:
+            bisect.insort(self.partitions.setdefault(partition_key, []), entry)
+
+    def remove(self, item):
+        partition_key, entry = self.entry(item)
+        if partition_key is None:
+            return
+        partition = self.partitions[partition_key]
+        position = bisect.bisect_left(partition, entry)
+        del partition[position]
+        if not partition:
+            del self.partitions[partition_key]
+
+    def key_of(self, item):
+        """LastEvaluatedKey（テーブルのキー + インデックスのキー）"""
+        names = dict.fromkeys(self.table_keys + tuple(name for name in (self.hash_key, self.range_key) if name))
+        return {name: item[name] for name in names}
+
+
+# ========================================
+# クライアント
+# ========================================
+
+class MemoryDynamoDB:
+    """
+    低レベル DynamoDB クライアント互換のインメモリテーブル
+
+    Args:
+        table_name: 受け付けるテーブル名
+        schema: TableSchema（None の場合は terraform/dynamodb.tf から読み込む）
+        latency_ms: 各 API 呼び出しに加える固定の待ち時間（ネットワーク・サービス側の処理時間の代わり）
+        json_roundtrip: レスポンスを JSON で往復させる（botocore のレスポンスのパースに近いコストを加える）
+    """
+
+    def __init__(self, table_name, schema=None, latency_ms=0.0, json_roundtrip=True):
+        self.table_name = table_name
+        self.schema = schema or load_table_schema()
+        self.latency = latency_ms / 1000
+        self.json_roundtrip = json_roundtrip
+
+        table_keys = tuple(name for name in (self.schema.hash_key, self.schema.range_key) if name)
+        self._items = {}
+        self._table_index = _Index(None, self.schema.hash_key, self.schema.range_key, table_keys)
+        self._indexes = {
+            index.name: _Index(index.name, index.hash_key, index.range_key, table_keys)
+            for index in self.schema.indexes
+        }
+        self._lock = threading.Lock()
+
+        # 操作ごとの呼び出し回数
+        self.calls = Counter()
+
+    def __len__(self):
+        return len(self._items)
+
+    # --- 内部処理 ---
+
+    def _key(self, key, operation):
+        names = self._table_index.table_keys
+        if set(key) != set(names):
+            raise _validation_error('The provided key element does not match the schema', operation)
+        return tuple(comparable(key[name]) for name in names)
+
+    def _check_table(self, table_name, operation):
+        if table_name != self.table_name:
+            raise ClientError({
+                'Error': {'Code': 'ResourceNotFoundException', 'Message': f'Requested resource not found: {table_name}'}
+            }, operation)
+
+    def _check_key_types(self, item, operation):
+        """キー属性（テーブル・GSI）の型がスキーマと一致するか確認"""
+        for name, data_type in self.schema.attribute_types.items():
+            value = item.get(name)
+            if value is not None and _type_of(value) != data_type:
+                raise _validation_error(
+                    f'One or more parameter values were invalid: Type mismatch for key {name}', operation
+                )
+
+    def _store(self, key, item):
+        old = self._items.get(key)
+        if old is not None:
+            self._unindex(old)
+        if item is None:
+            self._items.pop(key, None)
+        else:
+            self._items[key] = item
+            self._table_index.add(item)
+            for index in self._indexes.values():
+                index.add(item)
+        return old
+
+    def _unindex(self, item):
+        self._table_index.remove(item)
+        for index in self._indexes.values():
+            index.remove(item)
+
+    def _check_condition(self, params, item, operation):
+        expression = params.get('ConditionExpression')
+        if not expression:
+            return
+        node = parse_condition(expression, params.get('ExpressionAttributeNames'),
+                               params.get('ExpressionAttributeValues'), operation)
+        if not evaluate_condition(node, item or {}):
+            response = {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}}
+            if item is not None and params.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD':
+                response['Item'] = copy.deepcopy(item)
+            raise ClientError(response, operation)
+
+    def _project(self, item, params, operation):
+        expression = params.get('ProjectionExpression')
+        if not expression:
+            return item
+        names = _Parser(expression, params.get('ExpressionAttributeNames'), None, operation).projection()
+        return {name: item[name] for name in names if name in item}
+
+    def _respond(self, operation, response):
+        self.calls[operation] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.json_roundtrip:
+            return json.loads(json.dumps(response))
+        return copy.deepcopy(response)
+
+    # --- シード ---
+
+    def load(self, items):
+        """ワイヤー形式のアイテムを一括で書き込む（呼び出し回数・待ち時間は加えない）"""
+        with self._lock:
+            for item in items:
+                self._check_key_types(item, 'PutItem')
+                self._store(self._key({name: item[name] for name in self._table_index.table_keys}, 'PutItem'), dict(item))
+
+    def items(self):
+        """保持している全アイテム（ワイヤー形式のコピー）"""
+        with self._lock:
+            return [copy.deepcopy(item) for item in self._items.values()]
+
+    # --- 単一アイテムの操作 ---
+
+    def get_item(self, TableName, Key, **params):
+        self._check_table(TableName, 'GetItem')
+        with self._lock:
+            item = self._items.get(self._key(Key, 'GetItem'))
+            response = {} if item is None else {'Item': self._project(item, params, 'GetItem')}
+        return self._respond('GetItem', response)
+
+    def put_item(self, TableName, Item, **params):
+        self._check_table(TableName, 'PutItem')
+        self._check_key_types(Item, 'PutItem')
+        with self._lock:
+            key = self._key({name: Item[name] for name in self._table_index.table_keys}, 'PutItem')
+            old = self._items.get(key)
+            self._check_condition(params, old, 'PutItem')
+            self._store(key, copy.deepcopy(Item))
+            response = {'Attributes': old} if old is not None and params.get('ReturnValues') == 'ALL_OLD' else {}
+        return self._respond('PutItem', response)
+
+    def update_item(self, TableName, Key, UpdateExpression, **params):
+        self._check_table(TableName, 'UpdateItem')
+        parser = _Parser(UpdateExpression, params.get('ExpressionAttributeNames'),
+                         params.get('ExpressionAttributeValues'), 'UpdateItem')
+        actions = parser.update_actions()
+        with self._lock:
+            key = self._key(Key, 'UpdateItem')
+            old = self._items.get(key)
+            self._check_condition(params, old, 'UpdateItem')
+
+            new = _apply_update(old if old is not None else dict(Key), actions)
+            self._check_key_types(new, 'UpdateItem')
+            self._store(key, new)
+
+            return_values = params.get('ReturnValues', 'NONE')
+            if return_values == 'ALL_NEW':
+                response = {'Attributes': new}
+            elif return_values == 'ALL_OLD':
+                response = {'Attributes': old} if old is not None else {}
+            elif return_values in ('UPDATED_NEW', 'UPDATED_OLD'):
+                source = new if return_values == 'UPDATED_NEW' else (old or {})
+                response = {'Attributes': {name: source[name] for _, name, _ in actions if name in source}}
+            else:
+                response = {}
+        return self._respond('UpdateItem', response)
+
+    def delete_item(self, TableName, Key, **params):
+        self._check_table(TableName, 'DeleteItem')
+        with self._lock:
+            key = self._key(Key, 'DeleteItem')
+            old = self._items.get(key)
+            self._check_condition(params, old, 'DeleteItem')
+            self._store(key, None)
+            response = {'Attributes': old} if old is not None and params.get('ReturnValues') == 'ALL_OLD' else {}
+        return self._respond('DeleteItem', response)
+
+    # --- Query ---
+
+    def _key_range(self, index, node, operation):
+        """キー条件を (パーティションキーの値, ソートキーの条件) に分解"""
+        partition_value = None
+        range_condition = None
+        for condition in _flatten_and(node):
+            if (condition[0] == 'cmp' and condition[1] == '=' and condition[2] == ('path', index.hash_key)
+                    and condition[3][0] == 'value'):
+                partition_value = comparable(condition[3][1])
+            elif range_condition is None and index.range_key is not None:
+                range_condition = condition
+            else:
+                raise _validation_error('Invalid KeyConditionExpression', operation)
+        if partition_value is None:
+            raise _validation_error('Query condition missed key schema element', operation)
+        return partition_value, range_condition
+
+    def _bounds(self, partition, index, condition):
+        """ソートキーの条件を満たすエントリの範囲 [start, stop)"""
+        if condition is None:
+            return 0, len(partition)
+
+        def sort_key(entry):
+            return entry[0]
+
+        def value(node):
+            return comparable(node[1])
+
+        kind = condition[0]
+        if kind == 'func' and condition[1] == 'begins_with' and condition[2][0] == ('path', index.range_key):
+            prefix = value(condition[2][1])
+            start = bisect.bisect_left(partition, prefix, key=sort_key)
+            stop = start
+            while stop < len(partition) and partition[stop][0].startswith(prefix):
+                stop += 1
+            return start, stop
+        if kind == 'between' and condition[1] == ('path', index.range_key):
+            return (bisect.bisect_left(partition, value(condition[2]), key=sort_key),
+                    bisect.bisect_right(partition, value(condition[3]), key=sort_key))
+        if kind == 'cmp' and condition[2] == ('path', index.range_key):
+            operator, bound = condition[1], value(condition[3])
+            if operator == '=':
+                return (bisect.bisect_left(partition, bound, key=sort_key),
+                        bisect.bisect_right(partition, bound, key=sort_key))
+            if operator == '<':
+                return 0, bisect.bisect_left(partition, bound, key=sort_key)
+            if operator == '<=':
+                return 0, bisect.bisect_right(partition, bound, key=sort_key)
+            if operator == '>':
+                return bisect.bisect_right(partition, bound, key=sort_key), len(partition)
+            if operator == '>=':
+                return bisect.bisect_left(partition, bound, key=sort_key), len(partition)
+        raise _validation_error('Invalid KeyConditionExpression', 'Query')
+
+    def query(self, TableName, KeyConditionExpression, **params):
+        self._check_table(TableName, 'Query')
+        index_name = params.get('IndexName')
+        index = self._table_index if index_name is None else self._indexes.get(index_name)
+        if index is None:
+            raise _validation_error(f'The table does not have the specified index: {index_name}', 'Query')
+
+        names = params.get('ExpressionAttributeNames')
+        values = params.get('ExpressionAttributeValues')
+        key_condition = parse_condition(KeyConditionExpression, names, values, 'Query')
+        filter_expression = params.get('FilterExpression')
+        filter_condition = parse_condition(filter_expression, names, values, 'Query') if filter_expression else None
+        limit = params.get('Limit')
+        forward = params.get('ScanIndexForward', True)
+
+        with self._lock:
+            partition_value, range_condition = self._key_range(index, key_condition, 'Query')
+            partition = index.partitions.get(partition_value, [])
+            start, stop = self._bounds(partition, index, range_condition)
+
+            exclusive_start_key = params.get('ExclusiveStartKey')
+            if exclusive_start_key:
+                _, start_entry = index.entry(exclusive_start_key)
+                if forward:
+                    start = max(start, bisect.bisect_right(partition, start_entry))
+                else:
+                    stop = min(stop, bisect.bisect_left(partition, start_entry))
+
+            entries = partition[start:stop] if forward else partition[start:stop][::-1]
+            evaluated = entries if limit is None else entries[:limit]
+
+            items = []
+            for _, table_key in evaluated:
+                item = self._items[table_key]
+                if filter_condition is None or evaluate_condition(filter_condition, item):
+                    items.append(self._project(item, params, 'Query'))
+
+            response = {'Items': items, 'Count': len(items), 'ScannedCount': len(evaluated)}
+            if limit is not None and len(entries) > limit:
+                response['LastEvaluatedKey'] = index.key_of(self._items[evaluated[-1][1]])
+        return self._respond('Query', response)
+
+    # --- バッチ操作 ---
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        with self._lock:
+            for table_name, request in RequestItems.items():
+                self._check_table(table_name, 'BatchGetItem')
+                if len(request['Keys']) > BATCH_GET_LIMIT:
+                    raise _validation_error('Too many items requested for the BatchGetItem call', 'BatchGetItem')
+                found = []
+                for key in request['Keys']:
+                    item = self._items.get(self._key(key, 'BatchGetItem'))
+                    if item is not None:
+                        found.append(self._project(item, request, 'BatchGetItem'))
+                responses[table_name] = found
+        return self._respond('BatchGetItem', {'Responses': responses, 'UnprocessedKeys': {}})
+
+    def batch_write_item(self, RequestItems):
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                self._check_table(table_name, 'BatchWriteItem')
+                if len(requests) > BATCH_WRITE_LIMIT:
+                    raise _validation_error(
+                        'Too many items requested for the BatchWriteItem call', 'BatchWriteItem'
+                    )
+                for request in requests:
+                    if 'PutRequest' in request:
+                        item = request['PutRequest']['Item']
+                        self._check_key_types(item, 'BatchWriteItem')
+                        key = self._key({name: item[name] for name in self._table_index.table_keys}, 'BatchWriteItem')
+                        self._store(key, copy.deepcopy(item))
+                    else:
+                        self._store(self._key(request['DeleteRequest']['Key'], 'BatchWriteItem'), None)
+        return self._respond('BatchWriteItem', {'UnprocessedItems': {}})
+
+
+# ========================================
+# Table リソース互換
+# ========================================
+
+class MemoryTable:
+    """
+    boto3 Table リソース互換のアダプター
+
+    Python の値（数値は Decimal）とワイヤー形式を boto3 の TypeSerializer / TypeDeserializer で
+    変換して MemoryDynamoDB に委譲する。呼び出し回数は委譲先の calls に数える。
+    式は文字列で指定すること（boto3.dynamodb.conditions には対応しない）。
+    """
+
+    _PARAMS = ('Key', 'Item', 'ExclusiveStartKey')
+    _RESULTS = ('Item', 'Attributes', 'LastEvaluatedKey')
+
+    def __init__(self, client):
+        from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+        self.client = client
+        self.name = client.table_name
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+    def _serialize(self, values):
+        return {name: self._serializer.serialize(value) for name, value in values.items()}
+
+    def _deserialize(self, values):
+        return {name: self._deserializer.deserialize(value) for name, value in values.items()}
+
+    def _request(self, operation, **params):
+        request = {'TableName': self.name}
+        for name, value in params.items():
+            if name in self._PARAMS or name == 'ExpressionAttributeValues':
+                value = self._serialize(value)
+            request[name] = value
+
+        response = getattr(self.client, operation)(**request)
+
+        for name in self._RESULTS:
+            if name in response:
+                response[name] = self._deserialize(response[name])
+        if 'Items' in response:
+            response['Items'] = [self._deserialize(item) for item in response['Items']]
+        return response
+
+    def get_item(self, **params):
+        return self._request('get_item', **params)
+
+    def put_item(self, **params):
+        return self._request('put_item', **params)
+
+    def update_item(self, **params):
+        return self._request('update_item', **params)
+
+    def delete_item(self, **params):
+        return self._request('delete_item', **params)
+
+    def query(self, **params):
+        return self._request('query', **params)
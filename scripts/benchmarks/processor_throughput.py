@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Processor Lambda のスループット計測ハーネス
+
+DynamoDB Streams（NEW_AND_OLD_IMAGES）のバッチを合成して lambda_handler に渡し、
+バッチサイズごとに records/sec・レコードあたりの CPU 時間・バッチあたりのピークメモリ・
+外部 API 呼び出し回数（DynamoDB / CloudWatch）を計測する。
+
+ストリームは生成したアイテムの状態を保持しながら INSERT / MODIFY / REMOVE を --mix の比率で
+生成するため、MODIFY / REMOVE の OldImage は直前の NewImage と一致する。アイテムはネストした
+Map / List を含み、サイズは --description-bytes / --nested-attributes / --nesting-depth で調整する。
+
+AWS クライアントは呼び出しを数えるスタンドインに差し替える（DynamoDB は memory_dynamodb、
+CloudWatch は PutMetricData を数えるだけ）。--arrival-rate を指定すると、シャードあたりの
+到着レートに対して各 BatchSize が追いつくか・バッチが埋まるまでの時間
+（MaximumBatchingWindowInSeconds の目安）も表示する。
+
+使い方:
+    python scripts/benchmarks/processor_throughput.py
+    python scripts/benchmarks/processor_throughput.py --batch-sizes 10 100 500 1000 --mix INSERT=0.2,MODIFY=0.7,REMOVE=0.1
+    python scripts/benchmarks/processor_throughput.py --ddb-latency-ms 5 --env PROCESSOR_CONCURRENCY=1 --arrival-rate 200
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from memory_dynamodb import MemoryDynamoDB, MemoryTable
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+PROCESSOR_DIR = ROOT_DIR / 'sam' / 'functions' / 'processor'
+LAYER_DIR = ROOT_DIR / 'sam' / 'layers' / 'common'
+
+TABLE_NAME = 'benchmark-table'
+REGION = 'ap-northeast-1'
+STREAM_ARN = f'arn:aws:dynamodb:{REGION}:000000000000:table/{TABLE_NAME}/stream/2026-01-01T00:00:00.000'
+
+# Lambda の同期呼び出しペイロードの上限（これを超えるバッチはイベントソースマッピングが分割する）
+MAX_PAYLOAD_BYTES = 6 * 1024 * 1024
+
+EVENT_NAMES = ('INSERT', 'MODIFY', 'REMOVE')
+JAPANESE_WORDS = ('東京', '大阪', '京都', '観光', '名所', '商品', '在庫', '配送', '限定', '新作')
+
+
+class BenchmarkContext:
+    """Lambda コンテキストの代わり（残り時間は生成時点から減っていく）"""
+
+    function_name = 'processor-benchmark'
+    invoked_function_arn = f'arn:aws:lambda:{REGION}:000000000000:function:processor-benchmark'
+    memory_limit_in_mb = 256
+
+    def __init__(self, timeout_seconds):
+        self.aws_request_id = str(uuid.uuid4())
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+class CountingCloudWatch:
+    """PutMetricData の呼び出し回数とデータポイント数を数える CloudWatch クライアント"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.datums = 0
+
+    def put_metric_data(self, Namespace, MetricData):
+        self.calls['PutMetricData'] += 1
+        self.datums += len(MetricData)
+        return {}
+
+
+class OutputCounter:
+    """標準出力（EMF）とログの書き込みを捨てて、行数とバイト数だけを数える"""
+
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text.encode('utf-8'))
+        self.lines += text.count('\n')
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+# ========================================
+# ストリームの生成
+# ========================================
+
+def random_text(rng, length):
+    return ''.join(rng.choices(string.ascii_lowercase + ' ', k=length)).strip() or 'x'
+
+
+def parse_mix(text):
+    """'INSERT=0.5,MODIFY=0.4,REMOVE=0.1' を {イベント名: 重み} に変換"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip().upper()
+        if name not in EVENT_NAMES:
+            raise argparse.ArgumentTypeError(f'Unknown event name in --mix: {name}')
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('--mix must have a positive weight')
+    return mix
+
+
+class StreamGenerator:
+    """
+    テーブルの状態を保持しながら DynamoDB Streams のレコードを生成
+
+    MODIFY / REMOVE は生存しているアイテムを対象にし、OldImage には直前の NewImage を使う。
+    生存アイテムがない場合は INSERT を生成する。
+    """
+
+    def __init__(self, args, serialize_item, seed):
+        self.args = args
+        self.serialize_item = serialize_item
+        self.rng = random.Random(seed)
+        self.vocabulary = sorted({
+            ''.join(self.rng.choices(string.ascii_lowercase, k=self.rng.randint(4, 9)))
+            for _ in range(args.vocabulary * 2)
+        })[:args.vocabulary]
+        self.events, self.weights = zip(*args.mix.items())
+
+        self.live = {}
+        self.live_ids = []
+        self.hot_ids = []
+        self.sequence = 10 ** 20
+        self.clock = int(time.time())
+
+        for _ in range(args.live_items):
+            item = self.new_item()
+            self._add_live(item)
+        self.hot_ids = self.live_ids[:args.hot_keys]
+
+    # --- アイテム ---
+
+    def nested_value(self, depth):
+        rng = self.rng
+        if depth <= 0:
+            return rng.choice((random_text(rng, 12), rng.randint(0, 10 ** 6), rng.random() < 0.5))
+        if rng.random() < 0.5:
+            return {f'k{i}': self.nested_value(depth - 1) for i in range(3)}
+        return [self.nested_value(depth - 1) for _ in range(3)]
+
+    def text(self, words, length):
+        value = ' '.join(self.rng.sample(self.vocabulary, words) + [self.rng.choice(JAPANESE_WORDS)])
+        if len(value) < length:
+            value += ' ' + random_text(self.rng, length - len(value) - 1)
+        return value[:length]
+
+    def new_item(self):
+        """API の build_new_item と同じ形のアイテム（+ ネストした追加属性）"""
+        rng = self.rng
+        item_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        self.clock += 1
+        status = rng.choice(('active', 'active', 'active', 'inactive'))
+        item = {
+            'PK': f'ITEM#{item_id}',
+            'SK': 'METADATA',
+            'EntityType': 'Item',
+            'ItemId': item_id,
+            'Name': self.text(2, 40),
+            'Description': self.text(3, self.args.description_bytes),
+            'Status': status,
+            'EntityStatus': f'Item#{status}',
+            'EntityShard': f'Item#{rng.randrange(8)}',
+            'CreatedAt': self.clock,
+            'UpdatedAt': self.clock,
+            'Version': 1,
+            'GSI1PK': f'ITEM#{item_id}',
+            'GSI1SK': f'CREATED#{self.clock}',
+            'Tags': [rng.choice(self.vocabulary) for _ in range(3)],
+        }
+        for i in range(self.args.nested_attributes):
+            item[f'attr{i:02d}'] = self.nested_value(self.args.nesting_depth)
+        return item
+
+    def modified(self, item):
+        """MODIFY 後のアイテム（Status / Name / Description / ネスト属性のいずれかを変更）"""
+        rng = self.rng
+        self.clock += 1
+        new = dict(item, UpdatedAt=self.clock, Version=item['Version'] + 1)
+        change = rng.random()
+        if change < 0.3:
+            new['Status'] = 'inactive' if item['Status'] == 'active' else 'active'
+            new['EntityStatus'] = f"Item#{new['Status']}"
+        elif change < 0.6:
+            new['Name'] = self.text(2, 40)
+        elif change < 0.8:
+            new['Description'] = self.text(3, self.args.description_bytes)
+        elif self.args.nested_attributes:
+            name = f'attr{rng.randrange(self.args.nested_attributes):02d}'
+            new[name] = self.nested_value(self.args.nesting_depth)
+        return new
+
+    def _add_live(self, item):
+        self.live[item['ItemId']] = item
+        self.live_ids.append(item['ItemId'])
+
+    def _pick_live(self):
+        if self.hot_ids and self.rng.random() < self.args.hot_key_ratio:
+            candidates = [item_id for item_id in self.hot_ids if item_id in self.live]
+            if candidates:
+                return self.rng.choice(candidates)
+        # 削除済みの ID は遅延して取り除く
+        while self.live_ids:
+            position = self.rng.randrange(len(self.live_ids))
+            item_id = self.live_ids[position]
+            if item_id in self.live:
+                return item_id
+            self.live_ids[position] = self.live_ids[-1]
+            self.live_ids.pop()
+        return None
+
+    # --- レコード ---
+
+    def record(self, event_name, old, new):
+        self.sequence += self.rng.randint(1, 100)
+        image = new or old
+        dynamodb = {
+            'ApproximateCreationDateTime': self.clock,
+            'Keys': self.serialize_item({'PK': image['PK'], 'SK': image['SK']}),
+            'SequenceNumber': str(self.sequence),
+            'StreamViewType': 'NEW_AND_OLD_IMAGES',
+        }
+        if new is not None:
+            dynamodb['NewImage'] = self.serialize_item(new)
+        if old is not None:
+            dynamodb['OldImage'] = self.serialize_item(old)
+        dynamodb['SizeBytes'] = len(json.dumps(dynamodb, ensure_ascii=False).encode('utf-8'))
+        return {
+            'eventID': uuid.UUID(int=self.rng.getrandbits(128)).hex,
+            'eventName': event_name,
+            'eventVersion': '1.1',
+            'eventSource': 'aws:dynamodb',
+            'awsRegion': REGION,
+            'dynamodb': dynamodb,
+            'eventSourceARN': STREAM_ARN,
+        }
+
+    def internal_record(self):
+        """Processor 自身の書き込み（集計アイテム）のレコード（Processor はスキップする）"""
+        self.clock += 1
+        old = {'PK': 'STATS#Item', 'SK': 'SUMMARY', 'ItemCount': len(self.live), 'UpdatedAt': self.clock - 1}
+        return self.record('MODIFY', old, dict(old, ItemCount=len(self.live) + 1, UpdatedAt=self.clock))
+
+    def next_record(self):
+        if self.args.internal_ratio and self.rng.random() < self.args.internal_ratio:
+            return self.internal_record()
+
+        event_name = self.rng.choices(self.events, self.weights)[0]
+        item_id = None if event_name == 'INSERT' else self._pick_live()
+        if item_id is None:
+            item = self.new_item()
+            self._add_live(item)
+            return self.record('INSERT', None, item)
+
+        old = self.live[item_id]
+        if event_name == 'REMOVE':
+            del self.live[item_id]
+            return self.record('REMOVE', old, None)
+
+        new = self.modified(old)
+        self.live[item_id] = new
+        return self.record('MODIFY', old, new)
+
+    def batch(self, size, previous=None):
+        """1バッチ分のイベント（--duplicate-ratio の割合で前のバッチのレコードを再送する）"""
+        records = []
+        if previous and self.args.duplicate_ratio:
+            replay = int(size * self.args.duplicate_ratio)
+            records.extend(previous[-replay:] if replay else [])
+        while len(records) < size:
+            records.append(self.next_record())
+        return {'Records': records}
+
+
+# ========================================
+# 計測
+# ========================================
+
+def install_clients(aws_clients, args):
+    """呼び出しを数えるスタンドインを AWS クライアントレジストリに設定"""
+    dynamodb = MemoryDynamoDB(TABLE_NAME, latency_ms=args.ddb_latency_ms, json_roundtrip=not args.no_json_roundtrip)
+    cloudwatch = CountingCloudWatch()
+    aws_clients.set_client('dynamodb', dynamodb)
+    aws_clients.set_client('cloudwatch', cloudwatch)
+    aws_clients.set_table(TABLE_NAME, MemoryTable(dynamodb))
+    return dynamodb, cloudwatch
+
+
+def call_counts(dynamodb, cloudwatch):
+    counts = Counter({f'dynamodb.{name}': count for name, count in dynamodb.calls.items()})
+    counts.update({f'cloudwatch.{name}': count for name, count in cloudwatch.calls.items()})
+    return counts
+
+
+def invoke(handler, event, args, output):
+    with contextlib.redirect_stdout(output):
+        return handler(event, BenchmarkContext(args.timeout_seconds))
+
+
+def measure_batch_size(batch_size, processor, aws_clients, args, output):
+    """1つのバッチサイズについて、合成したバッチを順に処理して集計"""
+    from ddb_json import serialize_item
+
+    dynamodb, cloudwatch = install_clients(aws_clients, args)
+    # eventID が前のバッチサイズと重複すると冪等性のメモリキャッシュでスキップされるため、シードを分ける
+    generator = StreamGenerator(args, serialize_item, seed=f'{args.seed}-{batch_size}')
+
+    batches = []
+    previous = None
+    for _ in range(args.warmup + args.batches + args.alloc_batches):
+        event = generator.batch(batch_size, previous['Records'] if previous else None)
+        batches.append(event)
+        previous = event
+    warmup = batches[:args.warmup]
+    measured = batches[args.warmup:args.warmup + args.batches]
+    alloc_batches = batches[args.warmup + args.batches:]
+
+    for event in warmup:
+        invoke(processor.lambda_handler, event, args, output)
+
+    calls_before = call_counts(dynamodb, cloudwatch)
+    datums_before = cloudwatch.datums
+    output_before = (output.lines, output.bytes)
+    wall_ms = []
+    failures = 0
+    event_names = Counter()
+    payload_bytes = []
+
+    cpu_started = time.process_time()
+    for event in measured:
+        event_names.update(record['eventName'] for record in event['Records'])
+        payload_bytes.append(len(json.dumps(event, ensure_ascii=False).encode('utf-8')))
+        started = time.perf_counter()
+        response = invoke(processor.lambda_handler, event, args, output)
+        wall_ms.append((time.perf_counter() - started) * 1000)
+        failures += bool(response['batchItemFailures'])
+    cpu_ms = (time.process_time() - cpu_started) * 1000
+
+    calls = call_counts(dynamodb, cloudwatch) - calls_before
+    records = batch_size * len(measured)
+    wall_ms.sort()
+
+    result = {
+        'batch_size': batch_size,
+        'batches': len(measured),
+        'records': records,
+        'event_names': dict(sorted(event_names.items())),
+        'records_per_second': records / (sum(wall_ms) / 1000),
+        'batch_ms_p50': statistics.median(wall_ms),
+        'batch_ms_max': wall_ms[-1],
+        'batch_ms_mean': statistics.fmean(wall_ms),
+        'cpu_us_per_record': cpu_ms * 1000 / records,
+        'failed_batches': failures,
+        'payload_kib_mean': statistics.fmean(payload_bytes) / 1024,
+        'payload_over_limit': sum(size > MAX_PAYLOAD_BYTES for size in payload_bytes),
+        'calls_per_batch': {name: count / len(measured) for name, count in sorted(calls.items())},
+        'total_calls_per_batch': sum(calls.values()) / len(measured),
+        'metric_datums_per_batch': (cloudwatch.datums - datums_before) / len(measured),
+        'output_lines_per_batch': (output.lines - output_before[0]) / len(measured),
+        'output_bytes_per_record': (output.bytes - output_before[1]) / records,
+    }
+    if alloc_batches:
+        result['peak_kib_per_batch'] = measure_peak_memory(processor.lambda_handler, alloc_batches, args, output)
+    return result
+
+
+def measure_peak_memory(handler, batches, args, output):
+    """tracemalloc でバッチ処理中のピークメモリ（開始時点からの増分）を計測し、最大値を返す"""
+    peaks = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for event in batches:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            invoke(handler, event, args, output)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return max(peaks) / 1024
+
+
+# ========================================
+# 出力
+# ========================================
+
+def print_results(results):
+    print(f"{'batch':>6} {'rec/s':>9} {'p50 ms':>9} {'max ms':>9} {'cpu us/rec':>10} {'peak KiB':>9} "
+          f"{'calls/batch':>11} {'payload KiB':>11} {'log B/rec':>9} {'failed':>6}")
+    for result in results:
+        peak = result.get('peak_kib_per_batch')
+        print(f"{result['batch_size']:>6} {result['records_per_second']:>9.0f} {result['batch_ms_p50']:>9.2f} "
+              f"{result['batch_ms_max']:>9.2f} {result['cpu_us_per_record']:>10.1f} "
+              f"{peak if peak is not None else float('nan'):>9.1f} {result['total_calls_per_batch']:>11.1f} "
+              f"{result['payload_kib_mean']:>11.1f} {result['output_bytes_per_record']:>9.0f} {result['failed_batches']:>6}")
+
+    print()
+    print('Outbound calls per batch:')
+    for result in results:
+        calls = ', '.join(f'{name}={count:.1f}' for name, count in result['calls_per_batch'].items())
+        print(f"  {result['batch_size']:>6}: {calls}")
+
+    over_limit = [result['batch_size'] for result in results if result['payload_over_limit']]
+    if over_limit:
+        print()
+        print(f"Batch sizes {over_limit} produced events over the 6 MB invocation payload limit")
+
+
+def print_tuning(results, arrival_rate, parallelization_factor):
+    """
+    シャードあたりの到着レートに対する BatchSize ごとの余裕と、バッチが埋まるまでの時間
+
+    capacity は1シャードあたりの処理能力（同時実行 = ParallelizationFactor でバッチを
+    連続して処理した場合）。headroom が 1 を下回るとイテレーターの遅延が増え続ける。
+    fill は到着レートでバッチが埋まるまでの秒数で、MaximumBatchingWindowInSeconds を
+    これより短くすると部分的なバッチで呼び出される（上限 300 秒）。
+    """
+    print()
+    print(f'Tuning at {arrival_rate:g} records/s per shard (ParallelizationFactor={parallelization_factor}):')
+    print(f"{'batch':>6} {'capacity rec/s':>14} {'headroom':>9} {'fill s':>8}")
+    for result in results:
+        capacity = result['batch_size'] / (result['batch_ms_mean'] / 1000) * parallelization_factor
+        print(f"{result['batch_size']:>6} {capacity:>14.0f} {capacity / arrival_rate:>8.1f}x "
+              f"{min(result['batch_size'] / arrival_rate, 300):>8.1f}")
+
+
+# ========================================
+# エントリーポイント
+# ========================================
+
+def configure_environment(args):
+    """Processor Lambda のインポート前に環境変数を設定"""
+    os.environ.update({
+        'DYNAMODB_TABLE': TABLE_NAME,
+        'AWS_DEFAULT_REGION': REGION,
+        'AWS_ACCESS_KEY_ID': 'benchmark',
+        'AWS_SECRET_ACCESS_KEY': 'benchmark',
+        'ENVIRONMENT': 'benchmark',
+        'LOG_LEVEL': args.log_level,
+        'METRICS_MODE': args.metrics_mode,
+    })
+    for assignment in args.env:
+        name, _, value = assignment.partition('=')
+        os.environ[name] = value
+    sys.path[:0] = [str(PROCESSOR_DIR), str(LAYER_DIR)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 100, 500, 1000], help='計測する BatchSize')
+    parser.add_argument('--batches', type=int, default=20, help='バッチサイズあたりの計測バッチ数')
+    parser.add_argument('--warmup', type=int, default=2, help='バッチサイズあたりのウォームアップバッチ数')
+    parser.add_argument('--alloc-batches', type=int, default=2, help='ピークメモリを計測するバッチ数（0 で無効）')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('INSERT=0.5,MODIFY=0.4,REMOVE=0.1'),
+                        help='INSERT / MODIFY / REMOVE の比率')
+    parser.add_argument('--live-items', type=int, default=1000, help='開始時点で存在するアイテム数（MODIFY / REMOVE の対象）')
+    parser.add_argument('--hot-keys', type=int, default=0, help='更新が集中するアイテム数（0 で無効）')
+    parser.add_argument('--hot-key-ratio', type=float, default=0.5, help='MODIFY / REMOVE のうちホットキーを対象にする割合')
+    parser.add_argument('--internal-ratio', type=float, default=0.0, help='Processor 自身の書き込み（スキップされる）の割合')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0, help='前のバッチから再送するレコードの割合')
+    parser.add_argument('--description-bytes', type=int, default=200, help='Description の長さ（文字数）')
+    parser.add_argument('--nested-attributes', type=int, default=5, help='アイテムあたりのネストした追加属性の数')
+    parser.add_argument('--nesting-depth', type=int, default=2, help='追加属性の Map / List のネストの深さ')
+    parser.add_argument('--vocabulary', type=int, default=500, help='Name / Description に使う語彙の数')
+    parser.add_argument('--ddb-latency-ms', type=float, default=0.0, help='DynamoDB 呼び出しごとに加える待ち時間')
+    parser.add_argument('--no-json-roundtrip', action='store_true', help='DynamoDB レスポンスの JSON 往復を省く')
+    parser.add_argument('--metrics-mode', choices=('emf', 'api'), default='emf', help='Processor の METRICS_MODE')
+    parser.add_argument('--log-level', default='INFO', help='Processor の LOG_LEVEL（出力は数えるだけで捨てる）')
+    parser.add_argument('--timeout-seconds', type=float, default=60, help='Lambda のタイムアウト（残り時間の計算用）')
+    parser.add_argument('--arrival-rate', type=float, help='シャードあたりの到着レート（records/s）。指定時は BatchSize の目安を表示')
+    parser.add_argument('--parallelization-factor', type=int, default=1, help='イベントソースマッピングの ParallelizationFactor')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE', help='Processor の環境変数を上書き')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, help='結果を JSON で保存するパス')
+    args = parser.parse_args()
+
+    configure_environment(args)
+    import aws_clients
+    import index as processor
+
+    # ログはハンドラーの出力先を差し替えて数える（EMF の標準出力は invoke で差し替える）
+    output = OutputCounter()
+    for handler in processor.logger.handlers:
+        handler.setStream(output)
+
+    results = []
+    for batch_size in args.batch_sizes:
+        results.append(measure_batch_size(batch_size, processor, aws_clients, args, output))
+        print(f"  batch {batch_size}: {results[-1]['records_per_second']:.0f} records/s", file=sys.stderr)
+
+    print()
+    print_results(results)
+    if args.arrival_rate:
+        print_tuning(results, args.arrival_rate, args.parallelization_factor)
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            'params': {
+                name: str(value) if isinstance(value, Path) else value
+                for name, value in vars(args).items()
+            },
+            'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+            'results': results,
+        }, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
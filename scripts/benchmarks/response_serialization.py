@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+API レスポンスのシリアライズのマイクロベンチマーク
+
+GET /items 相当のレスポンスボディを、従来の json.dumps + DecimalEncoder と
+serialization モジュールのバックエンド（stdlib / orjson）でシリアライズした場合の
+所要時間とバイト数を記録する（圧縮は API Gateway で行うため対象外）。
+
+使い方:
+    python scripts/benchmarks/response_serialization.py
+    python scripts/benchmarks/response_serialization.py --items 20 100 1000
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[2] / 'sam' / 'functions' / 'api'
+sys.path.insert(0, str(API_DIR))
+
+import serialization  # noqa: E402
+
+
+class DecimalEncoder(json.JSONEncoder):
+    """変更前の create_response が使っていたエンコーダー（比較用）"""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super(DecimalEncoder, self).default(obj)
+
+
+def legacy_dumps(body):
+    return json.dumps(body, cls=DecimalEncoder, ensure_ascii=False)
+
+
+def build_body(count, seed):
+    """Table リソース経由で読んだ場合と同じく数値を Decimal で持つレスポンスボディ"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        item_id = f'{i:08d}'
+        items.append({
+            'PK': f'ITEM#{item_id}',
+            'SK': 'METADATA',
+            'EntityType': 'Item',
+            'ItemId': item_id,
+            'Name': ''.join(rng.choices(string.ascii_letters, k=rng.randint(5, 30))),
+            'Description': 'サンプルの説明文 ' * rng.randint(1, 5),
+            'Status': rng.choice(('active', 'inactive')),
+            'CreatedAt': Decimal(1700000000 + i),
+            'UpdatedAt': Decimal(1700000000 + i),
+            'Version': Decimal(rng.randint(1, 20)),
+            'Price': Decimal(f'{rng.uniform(0, 1000):.2f}'),
+        })
+    return {'items': items, 'count': count, 'next_cursor': None}
+
+
+def measure(func, number, repeat):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e3  # ms
+
+
+def run(body, number, repeat):
+    backends = {'legacy': legacy_dumps}
+    for name in ('stdlib', 'orjson'):
+        try:
+            backends[name] = serialization.get_serializer(name)[1]
+        except ValueError:
+            print(f'# {name} is not available, skipped')
+
+    results = {}
+    for name, dumps in backends.items():
+        text = dumps(body)
+        data = text.encode('utf-8')
+        results[name] = {
+            'serialize_ms': measure(lambda: dumps(body), number, repeat),
+            'bytes': len(data),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[20, 100, 1000], help='1レスポンスあたりのアイテム数')
+    parser.add_argument('--number', type=int, default=20, help='1計測あたりの実行回数')
+    parser.add_argument('--repeat', type=int, default=5, help='計測回数（最小値を採用）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, help='結果を JSON で保存するパス')
+    args = parser.parse_args()
+
+    report = {}
+    for count in args.items:
+        body = build_body(count, args.seed)
+        results = run(body, args.number, args.repeat)
+        report[count] = results
+
+        baseline = results['legacy']
+        print(f"items={count}")
+        print(f"  {'case':<16} {'ms':>10} {'speedup':>8} {'bytes':>10} {'ratio':>7}")
+        for name, result in results.items():
+            print(f"  {name:<16} {result['serialize_ms']:>10.3f} "
+                  f"{baseline['serialize_ms'] / result['serialize_ms']:>7.2f}x "
+                  f"{result['bytes']:>10} {result['bytes'] / baseline['bytes']:>7.2f}")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            'params': vars(args) | {'json': str(args.json)},
+            'results': report
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+DynamoDB Streams 画像デシリアライザーのマイクロベンチマーク
+
+従来の parse_dynamodb_image（in チェックの連鎖）と、Processor Lambda の
+テーブル駆動デシリアライザー（一括変換 / LazyImage）を大きなネストした画像で比較する。
+
+使い方:
+    python scripts/benchmarks/stream_deserializer.py
+    python scripts/benchmarks/stream_deserializer.py --attributes 200 --depth 3 --list-length 50
+"""
+
+import argparse
+import json
+import random
+import string
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+PROCESSOR_DIR = Path(__file__).resolve().parents[2] / 'sam' / 'functions' / 'processor'
+sys.path.insert(0, str(PROCESSOR_DIR))
+
+from stream_image import LazyImage, deserialize_image  # noqa: E402
+
+
+def legacy_parse_dynamodb_image(image):
+    """変更前の parse_dynamodb_image（比較用）"""
+    if not image:
+        return None
+
+    result = {}
+    for key, value in image.items():
+        if 'S' in value:
+            result[key] = value['S']
+        elif 'N' in value:
+            result[key] = Decimal(value['N'])
+        elif 'BOOL' in value:
+            result[key] = value['BOOL']
+        elif 'M' in value:
+            result[key] = legacy_parse_dynamodb_image(value['M'])
+        elif 'L' in value:
+            result[key] = [legacy_parse_dynamodb_image({'item': item})['item'] for item in value['L']]
+        elif 'NULL' in value:
+            result[key] = None
+
+    return result
+
+
+def random_scalar(rng):
+    kind = rng.choice(('S', 'N', 'BOOL', 'NULL'))
+    if kind == 'S':
+        return {'S': ''.join(rng.choices(string.ascii_letters, k=rng.randint(5, 40)))}
+    if kind == 'N':
+        return {'N': str(rng.randint(0, 10 ** 9))}
+    if kind == 'BOOL':
+        return {'BOOL': rng.random() < 0.5}
+    return {'NULL': True}
+
+
+def random_value(rng, depth, list_length):
+    """ネストした M / L を含むランダムな属性値を生成"""
+    if depth <= 0:
+        return random_scalar(rng)
+
+    kind = rng.choice(('scalar', 'M', 'L'))
+    if kind == 'M':
+        return {'M': {
+            f'field{i}': random_value(rng, depth - 1, list_length)
+            for i in range(rng.randint(2, 8))
+        }}
+    if kind == 'L':
+        return {'L': [random_value(rng, depth - 1, list_length) for _ in range(list_length)]}
+    return random_scalar(rng)
+
+
+def build_image(attributes, depth, list_length, seed):
+    rng = random.Random(seed)
+    image = {
+        'PK': {'S': 'ITEM#benchmark'},
+        'SK': {'S': 'METADATA'},
+        'EntityType': {'S': 'Item'},
+        'ItemId': {'S': 'benchmark'},
+        'Status': {'S': 'active'},
+    }
+    for i in range(attributes):
+        image[f'attr{i}'] = random_value(rng, depth, list_length)
+    return image
+
+
+def run(image, number, repeat):
+    cases = {
+        'legacy': lambda: legacy_parse_dynamodb_image(image),
+        'table_driven': lambda: deserialize_image(image),
+        # ハンドラーが EntityType / ItemId / Status だけを読むケース
+        'lazy_3_attrs': lambda: (lambda lazy: (lazy.get('EntityType'), lazy.get('ItemId'), lazy.get('Status')))(LazyImage(image)),
+        'lazy_full': lambda: LazyImage(image).to_dict(),
+    }
+
+    results = {}
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=number, repeat=repeat)) / number
+        results[name] = best * 1e6  # µs/画像
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--attributes', type=int, default=100, help='トップレベル属性数')
+    parser.add_argument('--depth', type=int, default=3, help='M / L のネストの深さ')
+    parser.add_argument('--list-length', type=int, default=10, help='L の要素数')
+    parser.add_argument('--number', type=int, default=50, help='1計測あたりの実行回数')
+    parser.add_argument('--repeat', type=int, default=5, help='計測回数（最小値を採用）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', type=Path, help='結果を JSON で保存するパス')
+    args = parser.parse_args()
+
+    image = build_image(args.attributes, args.depth, args.list_length, args.seed)
+    assert legacy_parse_dynamodb_image(image) == deserialize_image(image)
+
+    size = len(json.dumps(image))
+    results = run(image, args.number, args.repeat)
+    baseline = results['legacy']
+
+    print(f"image: {args.attributes} attributes, depth={args.depth}, list_length={args.list_length}, {size / 1024:.1f} KiB")
+    print(f"{'case':<14} {'µs/image':>12} {'speedup':>8}")
+    for name, micros in results.items():
+        print(f"{name:<14} {micros:>12.1f} {baseline / micros:>7.2f}x")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            'params': vars(args) | {'json': str(args.json), 'image_bytes': size},
+            'results_us_per_image': results
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -189,10 +189,19 @@ deploy_sam() {
     SECURITY_GROUP_ID=$(jq -r '.lambda_security_group_id.value' terraform-outputs.json)
     LAMBDA_API_ROLE_ARN=$(jq -r '.lambda_api_role_arn.value' terraform-outputs.json)
     LAMBDA_PROCESSOR_ROLE_ARN=$(jq -r '.lambda_processor_role_arn.value' terraform-outputs.json)
+    LAMBDA_SCHEDULED_ROLE_ARN=$(jq -r '.lambda_scheduled_role_arn.value' terraform-outputs.json)
     DYNAMODB_TABLE_NAME=$(jq -r '.dynamodb_table_name.value' terraform-outputs.json)
     DYNAMODB_STREAM_ARN=$(jq -r '.dynamodb_stream_arn.value // ""' terraform-outputs.json)
     LOG_RETENTION_DAYS=$(jq -r '.log_retention_days.value' terraform-outputs.json)
     LAMBDA_INSIGHTS_LAYER_ARN=$(jq -r '.lambda_insights_layer_arn.value // ""' terraform-outputs.json)
+    EXPORT_BUCKET_NAME=$(jq -r '.exports_bucket.value // ""' terraform-outputs.json)
+    CURSOR_SECRET=$(jq -r '.cursor_secret.value // ""' terraform-outputs.json)
+    MAINTENANCE_INACTIVE_ACTION=$(jq -r '.maintenance_inactive_action.value // "none"' terraform-outputs.json)
+
+    if [ -z "$CURSOR_SECRET" ]; then
+        log_error "cursor_secret is missing from terraform-outputs.json (run terraform apply first)"
+        exit 1
+    fi
 
     log_info "S3 Bucket: $S3_BUCKET"
     log_info "VPC ID: $VPC_ID"
@@ -216,10 +225,14 @@ deploy_sam() {
             SecurityGroupId="$SECURITY_GROUP_ID" \
             LambdaApiRoleArn="$LAMBDA_API_ROLE_ARN" \
             LambdaProcessorRoleArn="$LAMBDA_PROCESSOR_ROLE_ARN" \
+            LambdaScheduledRoleArn="$LAMBDA_SCHEDULED_ROLE_ARN" \
             DynamoDBTableName="$DYNAMODB_TABLE_NAME" \
             DynamoDBStreamArn="$DYNAMODB_STREAM_ARN" \
             LogRetentionDays="$LOG_RETENTION_DAYS" \
-            LambdaInsightsLayerArn="$LAMBDA_INSIGHTS_LAYER_ARN"
+            LambdaInsightsLayerArn="$LAMBDA_INSIGHTS_LAYER_ARN" \
+            ExportBucketName="$EXPORT_BUCKET_NAME" \
+            CursorSecret="$CURSOR_SECRET" \
+            MaintenanceInactiveAction="$MAINTENANCE_INACTIVE_ACTION"
 
     # API Endpoint の取得
     API_ENDPOINT=$(aws cloudformation describe-stacks \
@@ -261,6 +274,7 @@ if [ "$DEPLOY_MODE" = "all" ] || [ "$DEPLOY_MODE" = "sam" ]; then
     log_info "Next steps:"
     log_info "  1. Test the API:"
     log_info "     curl ${API_ENDPOINT}/health"
+    log_info "     curl \"${API_ENDPOINT}/health?mode=deep\"  # 依存サービスのプローブ"
     log_info ""
     log_info "  2. View CloudWatch Dashboard:"
     log_info "     https://console.aws.amazon.com/cloudwatch/home?region=${AWS_REGION}#dashboards:"
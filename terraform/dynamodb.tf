@@ -53,6 +53,16 @@ resource "aws_dynamodb_table" "main" {
     type = "N" # Number (UNIX timestamp)
   }
 
+  attribute {
+    name = "EntityStatus"
+    type = "S" # EntityType#Status
+  }
+
+  attribute {
+    name = "EntityShard"
+    type = "S" # EntityType#<シャード番号>
+  }
+
   # ========================================
   # グローバルセカンダリインデックス (GSI)
   # ========================================
@@ -69,6 +79,8 @@ resource "aws_dynamodb_table" "main" {
   }
 
   # GSI2: エンティティタイプ別クエリ用
+  # Item はすべて EntityType = "Item" の単一パーティションに載るため、一覧は EntityShardIndex を使う。
+  # 既存アイテムへの EntityShard の補完（Scheduled の maintenance タスク）が済むまでは残しておく
   global_secondary_index {
     name            = "EntityTypeIndex"
     hash_key        = "EntityType"
@@ -79,6 +91,29 @@ resource "aws_dynamodb_table" "main" {
     write_capacity = var.dynamodb_billing_mode == "PROVISIONED" ? var.dynamodb_write_capacity : null
   }
 
+  # GSI3: ステータス別クエリ用（EntityStatus を持つアイテムだけが載るスパースインデックス）
+  global_secondary_index {
+    name            = "StatusIndex"
+    hash_key        = "EntityStatus"
+    range_key       = "CreatedAt"
+    projection_type = "ALL"
+
+    read_capacity  = var.dynamodb_billing_mode == "PROVISIONED" ? var.dynamodb_read_capacity : null
+    write_capacity = var.dynamodb_billing_mode == "PROVISIONED" ? var.dynamodb_write_capacity : null
+  }
+
+  # GSI4: 書き込みシャーディングした一覧用（EntityShard = Item#0〜Item#<ITEM_SHARD_COUNT-1>）
+  # GET /items は全シャードを並列にクエリして CreatedAt の降順にマージする
+  global_secondary_index {
+    name            = "EntityShardIndex"
+    hash_key        = "EntityShard"
+    range_key       = "CreatedAt"
+    projection_type = "ALL"
+
+    read_capacity  = var.dynamodb_billing_mode == "PROVISIONED" ? var.dynamodb_read_capacity : null
+    write_capacity = var.dynamodb_billing_mode == "PROVISIONED" ? var.dynamodb_write_capacity : null
+  }
+
   # ========================================
   # TTL設定（有効期限管理）
   # ========================================
@@ -228,3 +263,23 @@ resource "aws_appautoscaling_policy" "dynamodb_table_write_policy" {
 #   - 特定ユーザーの全注文: PK = "USER#123" AND SK begins_with "ORDER#"
 #   - 特定注文の詳細: GSI1PK = "ORDER#456"
 #   - 最近の全注文: EntityType = "Order" AND CreatedAt > timestamp
+#
+# アイテム（API）:
+#   PK: ITEM#<item_id>
+#   SK: METADATA
+#   EntityType: Item
+#   Status: active
+#   EntityStatus: Item#active  （StatusIndex のキー、Status の変更時に更新）
+#   EntityShard: Item#3        （EntityShardIndex のキー、ItemId のハッシュで決まり変わらない）
+#
+# クエリ例:
+#   - active なアイテムを新しい順に: StatusIndex で EntityStatus = "Item#active"（ScanIndexForward = false）
+#   - 全アイテムを新しい順に: EntityShardIndex で EntityShard = "Item#0"〜"Item#7" を並列にクエリしてマージ
+#
+# 検索インデックスのポスティング（Processor が Name / Description の変更から更新）:
+#   PK: SEARCH#<トークン>      （英数字は単語、日本語は文字バイグラム）
+#   SK: ITEM#<item_id>
+#   Weight: 4                 （Name の出現 × 3 + Description の出現 × 1）
+#
+# クエリ例:
+#   - トークンを含むアイテム: PK = "SEARCH#東京"（GET /items/search は全トークンの積集合をスコア順に返す）
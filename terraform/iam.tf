@@ -38,6 +38,13 @@ resource "aws_iam_role_policy" "lambda_api_dynamodb" {
   policy = data.aws_iam_policy_document.lambda_dynamodb_access.json
 }
 
+# ヘルスチェックの CloudWatch プローブ用（HEALTH_CHECK_CLOUDWATCH=true の場合に使用）
+resource "aws_iam_role_policy" "lambda_api_health" {
+  name   = "${local.resource_prefix}-lambda-api-health-policy"
+  role   = aws_iam_role.lambda_api.id
+  policy = data.aws_iam_policy_document.lambda_health_probe.json
+}
+
 # X-Ray トレーシング用
 resource "aws_iam_role_policy_attachment" "lambda_api_xray" {
   role       = aws_iam_role.lambda_api.name
@@ -81,11 +88,75 @@ resource "aws_iam_role_policy" "lambda_processor_streams" {
   policy = data.aws_iam_policy_document.lambda_streams_access.json
 }
 
+# DynamoDB 読み書き権限（キャッシュ無効化スタンプ、冪等性台帳、検索インデックスなど）
+resource "aws_iam_role_policy" "lambda_processor_dynamodb" {
+  name   = "${local.resource_prefix}-lambda-processor-dynamodb-policy"
+  role   = aws_iam_role.lambda_processor.id
+  policy = data.aws_iam_policy_document.lambda_processor_dynamodb_access.json
+}
+
 resource "aws_iam_role_policy_attachment" "lambda_processor_xray" {
   role       = aws_iam_role.lambda_processor.name
   policy_arn = "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
 }
 
+# カスタムメトリクスの送信権限（METRICS_MODE=api の場合に PutMetricData を呼び出す）
+resource "aws_iam_role_policy" "lambda_processor_metrics" {
+  name   = "${local.resource_prefix}-lambda-processor-metrics-policy"
+  role   = aws_iam_role.lambda_processor.id
+  policy = data.aws_iam_policy_document.lambda_put_metrics.json
+}
+
+# ========================================
+# Lambda実行ロール - Scheduled Function用
+# ========================================
+
+# エクスポート・アーカイブ（S3）と自身の再呼び出しの権限はこのロールにのみ付与する
+resource "aws_iam_role" "lambda_scheduled" {
+  name               = "${local.resource_prefix}-lambda-scheduled-role"
+  assume_role_policy = data.aws_iam_policy_document.lambda_assume_role.json
+
+  tags = {
+    Name = "${local.resource_prefix}-lambda-scheduled-role"
+  }
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_scheduled_basic" {
+  role       = aws_iam_role.lambda_scheduled.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_scheduled_vpc" {
+  role       = aws_iam_role.lambda_scheduled.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole"
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_scheduled_insights" {
+  count = var.enable_lambda_insights ? 1 : 0
+
+  role       = aws_iam_role.lambda_scheduled.name
+  policy_arn = "arn:aws:iam::aws:policy/CloudWatchLambdaInsightsExecutionRolePolicy"
+}
+
+# DynamoDB 権限（並列 Scan、アーカイブ後の削除、インデックスキーの補完、集計の再計算）
+resource "aws_iam_role_policy" "lambda_scheduled_dynamodb" {
+  name   = "${local.resource_prefix}-lambda-scheduled-dynamodb-policy"
+  role   = aws_iam_role.lambda_scheduled.id
+  policy = data.aws_iam_policy_document.lambda_scheduled_dynamodb_access.json
+}
+
+# テーブルエクスポート・アーカイブ用
+resource "aws_iam_role_policy" "lambda_scheduled_exports" {
+  name   = "${local.resource_prefix}-lambda-scheduled-exports-policy"
+  role   = aws_iam_role.lambda_scheduled.id
+  policy = data.aws_iam_policy_document.lambda_exports_access.json
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_scheduled_xray" {
+  role       = aws_iam_role.lambda_scheduled.name
+  policy_arn = "arn:aws:iam::aws:policy/AWSXRayDaemonWriteAccess"
+}
+
 # ========================================
 # IAMポリシードキュメント
 # ========================================
@@ -153,6 +224,113 @@ data "aws_iam_policy_document" "lambda_dynamodb_access" {
   # }
 }
 
+# Processor 用 DynamoDB アクセスポリシー
+data "aws_iam_policy_document" "lambda_processor_dynamodb_access" {
+  statement {
+    effect = "Allow"
+    actions = [
+      "dynamodb:GetItem",
+      "dynamodb:BatchGetItem",
+      "dynamodb:PutItem",
+      "dynamodb:UpdateItem",
+      # 検索インデックスのポスティングの追加・削除
+      "dynamodb:BatchWriteItem"
+    ]
+    resources = [
+      aws_dynamodb_table.main.arn
+    ]
+  }
+}
+
+# Scheduled 用 DynamoDB アクセスポリシー
+data "aws_iam_policy_document" "lambda_scheduled_dynamodb_access" {
+  statement {
+    effect = "Allow"
+    actions = [
+      "dynamodb:Scan",
+      # 集計アイテム（STATS#）の読み込み・差分の加算・件数0の日別アイテムの削除
+      "dynamodb:Query",
+      "dynamodb:UpdateItem",
+      "dynamodb:DeleteItem",
+      "dynamodb:BatchWriteItem"
+    ]
+    resources = [
+      aws_dynamodb_table.main.arn
+    ]
+  }
+}
+
+# テーブルエクスポート・アーカイブ用 S3 アクセスポリシー
+data "aws_iam_policy_document" "lambda_exports_access" {
+  # パート・チェックポイント・マニフェストの読み書き
+  statement {
+    effect = "Allow"
+    actions = [
+      "s3:GetObject",
+      "s3:PutObject"
+    ]
+    resources = [
+      "${aws_s3_bucket.exports.arn}/exports/*",
+      "${aws_s3_bucket.exports.arn}/archive/*"
+    ]
+  }
+
+  # 未作成のチェックポイントを 403 ではなく 404 として扱うために必要
+  statement {
+    effect = "Allow"
+    actions = [
+      "s3:ListBucket"
+    ]
+    resources = [
+      aws_s3_bucket.exports.arn
+    ]
+    condition {
+      test     = "StringLike"
+      variable = "s3:prefix"
+      values   = ["exports/*", "archive/*"]
+    }
+  }
+
+  # 時間切れ時の自身の再呼び出し（Scheduled Function）
+  statement {
+    effect = "Allow"
+    actions = [
+      "lambda:InvokeFunction"
+    ]
+    resources = [
+      "arn:aws:lambda:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:function:${local.lambda_function_prefix}-scheduled"
+    ]
+  }
+}
+
+# ヘルスチェック用 CloudWatch アクセスポリシー（ListMetrics はリソースを指定できない）
+data "aws_iam_policy_document" "lambda_health_probe" {
+  statement {
+    effect = "Allow"
+    actions = [
+      "cloudwatch:ListMetrics"
+    ]
+    resources = ["*"]
+  }
+}
+
+# カスタムメトリクス送信ポリシー（PutMetricData はリソースを指定できないため名前空間で制限する）
+data "aws_iam_policy_document" "lambda_put_metrics" {
+  statement {
+    effect = "Allow"
+    actions = [
+      "cloudwatch:PutMetricData"
+    ]
+    resources = ["*"]
+
+    condition {
+      test     = "StringEquals"
+      variable = "cloudwatch:namespace"
+      values   = [var.metrics_namespace]
+    }
+  }
+}
+
 # DynamoDB Streams アクセスポリシー
 data "aws_iam_policy_document" "lambda_streams_access" {
   statement {
@@ -244,7 +422,8 @@ data "aws_iam_policy_document" "cloudformation_execution" {
     ]
     resources = [
       aws_iam_role.lambda_api.arn,
-      aws_iam_role.lambda_processor.arn
+      aws_iam_role.lambda_processor.arn,
+      aws_iam_role.lambda_scheduled.arn
     ]
     condition {
       test     = "StringEquals"
@@ -262,7 +441,8 @@ data "aws_iam_policy_document" "cloudformation_execution" {
     ]
     resources = [
       aws_iam_role.lambda_api.arn,
-      aws_iam_role.lambda_processor.arn
+      aws_iam_role.lambda_processor.arn,
+      aws_iam_role.lambda_scheduled.arn
     ]
   }
 
@@ -10,6 +10,10 @@ terraform {
       source  = "hashicorp/aws"
       version = "~> 5.0"
     }
+    random = {
+      source  = "hashicorp/random"
+      version = "~> 3.0"
+    }
   }
 }
 
@@ -40,6 +44,9 @@ locals {
   # S3バケット名（グローバルでユニークである必要がある）
   sam_artifacts_bucket_name = "${local.resource_prefix}-sam-artifacts-${data.aws_caller_identity.current.account_id}"
 
+  # テーブルエクスポート保存用S3バケット名
+  exports_bucket_name = "${local.resource_prefix}-exports-${data.aws_caller_identity.current.account_id}"
+
   # Lambda関数名のプレフィックス
   lambda_function_prefix = local.resource_prefix
 
@@ -62,4 +69,4 @@ data "aws_region" "current" {}
 # ========================================
 
 # 今回は単一ファイルではなく、各リソースを別ファイルに分割しています
-# vpc.tf, iam.tf, s3.tf, dynamodb.tf, cloudwatch.tf を参照してください
+# vpc.tf, iam.tf, s3.tf, dynamodb.tf, cloudwatch.tf, secrets.tf を参照してください
@@ -61,6 +61,16 @@ output "lambda_processor_role_name" {
   value       = aws_iam_role.lambda_processor.name
 }
 
+output "lambda_scheduled_role_arn" {
+  description = "Lambda Scheduled Function用IAMロールARN"
+  value       = aws_iam_role.lambda_scheduled.arn
+}
+
+output "lambda_scheduled_role_name" {
+  description = "Lambda Scheduled Function用IAMロール名"
+  value       = aws_iam_role.lambda_scheduled.name
+}
+
 output "cloudformation_execution_role_arn" {
   description = "CloudFormation実行ロールARN（SAMデプロイ用）"
   value       = aws_iam_role.cloudformation_execution.arn
@@ -80,6 +90,27 @@ output "sam_artifacts_bucket_arn" {
   value       = aws_s3_bucket.sam_artifacts.arn
 }
 
+output "exports_bucket" {
+  description = "テーブルエクスポート保存用S3バケット名"
+  value       = aws_s3_bucket.exports.id
+}
+
+output "cursor_secret" {
+  description = "カーソル署名用の秘密鍵（SAM の CursorSecret パラメータ）"
+  value       = random_password.cursor_secret.result
+  sensitive   = true
+}
+
+output "cursor_secret_parameter_name" {
+  description = "カーソル署名用の秘密鍵を保存した SSM パラメータ名"
+  value       = aws_ssm_parameter.cursor_secret.name
+}
+
+output "maintenance_inactive_action" {
+  description = "定期メンテナンスでの inactive アイテムの処理"
+  value       = var.maintenance_inactive_action
+}
+
 # ========================================
 # DynamoDB関連
 # ========================================
@@ -169,16 +200,19 @@ output "resource_prefix" {
 output "sam_parameters" {
   description = "SAMデプロイ用のパラメータ（JSON形式）"
   value = jsonencode({
-    Environment            = var.environment
-    VpcId                  = aws_vpc.main.id
-    SubnetIds              = join(",", aws_subnet.private[*].id)
-    SecurityGroupId        = aws_security_group.lambda.id
-    LambdaApiRoleArn       = aws_iam_role.lambda_api.arn
-    LambdaProcessorRoleArn = aws_iam_role.lambda_processor.arn
-    DynamoDBTableName      = aws_dynamodb_table.main.name
-    DynamoDBStreamArn      = var.enable_dynamodb_streams ? aws_dynamodb_table.main.stream_arn : ""
-    LogRetentionDays       = var.log_retention_days
-    LambdaInsightsLayerArn = local.lambda_insights_layer_arn
+    Environment               = var.environment
+    VpcId                     = aws_vpc.main.id
+    SubnetIds                 = join(",", aws_subnet.private[*].id)
+    SecurityGroupId           = aws_security_group.lambda.id
+    LambdaApiRoleArn          = aws_iam_role.lambda_api.arn
+    LambdaProcessorRoleArn    = aws_iam_role.lambda_processor.arn
+    LambdaScheduledRoleArn    = aws_iam_role.lambda_scheduled.arn
+    DynamoDBTableName         = aws_dynamodb_table.main.name
+    DynamoDBStreamArn         = var.enable_dynamodb_streams ? aws_dynamodb_table.main.stream_arn : ""
+    LogRetentionDays          = var.log_retention_days
+    LambdaInsightsLayerArn    = local.lambda_insights_layer_arn
+    ExportBucketName          = aws_s3_bucket.exports.id
+    MaintenanceInactiveAction = var.maintenance_inactive_action
   })
 }
 
@@ -202,9 +236,13 @@ output "sam_deploy_command" {
         SecurityGroupId=${aws_security_group.lambda.id} \
         LambdaApiRoleArn=${aws_iam_role.lambda_api.arn} \
         LambdaProcessorRoleArn=${aws_iam_role.lambda_processor.arn} \
+        LambdaScheduledRoleArn=${aws_iam_role.lambda_scheduled.arn} \
+        CursorSecret="$(aws ssm get-parameter --with-decryption --name ${aws_ssm_parameter.cursor_secret.name} --query Parameter.Value --output text)" \
         DynamoDBTableName=${aws_dynamodb_table.main.name} \
         DynamoDBStreamArn=${var.enable_dynamodb_streams ? aws_dynamodb_table.main.stream_arn : ""} \
-        LogRetentionDays=${var.log_retention_days}
+        LogRetentionDays=${var.log_retention_days} \
+        ExportBucketName=${aws_s3_bucket.exports.id} \
+        MaintenanceInactiveAction=${var.maintenance_inactive_action}
   EOT
 }
 
@@ -192,6 +192,59 @@ data "aws_iam_policy_document" "sam_artifacts_bucket_policy" {
   }
 }
 
+# ========================================
+# S3バケット - テーブルエクスポート保存用
+# ========================================
+
+# Scheduled Function が DynamoDB テーブルを NDJSON で書き出す
+resource "aws_s3_bucket" "exports" {
+  bucket = local.exports_bucket_name
+
+  tags = {
+    Name    = local.exports_bucket_name
+    Purpose = "DynamoDB table exports"
+  }
+
+  force_destroy = var.environment == "prod" ? false : true
+}
+
+resource "aws_s3_bucket_public_access_block" "exports" {
+  bucket = aws_s3_bucket.exports.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "exports" {
+  bucket = aws_s3_bucket.exports.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+    bucket_key_enabled = true
+  }
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "exports" {
+  bucket = aws_s3_bucket.exports.id
+
+  rule {
+    id     = "expire-old-exports"
+    status = "Enabled"
+
+    filter {
+      prefix = "exports/"
+    }
+
+    expiration {
+      days = var.export_retention_days
+    }
+  }
+}
+
 # ========================================
 # S3バケット - ロギング（オプション）
 # ========================================
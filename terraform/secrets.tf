@@ -0,0 +1,21 @@
+# ========================================
+# カーソル署名用の秘密鍵（API の GET /items ページネーション）
+# ========================================
+
+# 再生成すると発行済みのカーソルは検証できなくなる（クライアントは先頭から取り直す）
+resource "random_password" "cursor_secret" {
+  length  = 64
+  special = false
+}
+
+# 運用時の参照用（SAM へは deploy.sh が CursorSecret パラメータとして渡す）
+resource "aws_ssm_parameter" "cursor_secret" {
+  name        = "/${var.project_name}/${var.environment}/cursor-secret"
+  description = "HMAC key for signing GET /items pagination cursors"
+  type        = "SecureString"
+  value       = random_password.cursor_secret.result
+
+  tags = {
+    Name = "${local.resource_prefix}-cursor-secret"
+  }
+}
@@ -132,6 +132,12 @@ variable "enable_lambda_insights" {
   default     = false # 本番環境では true 推奨
 }
 
+variable "metrics_namespace" {
+  description = "Lambda 関数がカスタムメトリクスを書き込む CloudWatch 名前空間（関数の METRICS_NAMESPACE と同じ値）"
+  type        = string
+  default     = "TerraformSAMDemo"
+}
+
 # ========================================
 # タグ設定
 # ========================================
@@ -161,6 +167,23 @@ variable "s3_lifecycle_days" {
   default     = 90
 }
 
+variable "export_retention_days" {
+  description = "テーブルエクスポート（NDJSON）の保持日数"
+  type        = number
+  default     = 30
+}
+
+variable "maintenance_inactive_action" {
+  description = "定期メンテナンスでの inactive アイテムの処理（none / archive / purge）"
+  type        = string
+  default     = "none" # archive はエクスポート用バケットに書き出してから削除する
+
+  validation {
+    condition     = contains(["none", "archive", "purge"], var.maintenance_inactive_action)
+    error_message = "maintenance_inactive_action must be none, archive or purge."
+  }
+}
+
 # ========================================
 # セキュリティ設定
 # ========================================
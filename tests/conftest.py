@@ -0,0 +1,49 @@
+"""
+テスト共通設定
+
+Lambda 関数の index モジュールは関数ごとに同名のため、関数ディレクトリと共通レイヤーを
+パスに追加したうえで別名（<関数名>_index）として読み込む。
+モジュールレベルの状態（キャッシュ・メトリクスのバッファ）を持ち越さないよう、テストごとに読み込み直す。
+"""
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SAM_DIR = Path(__file__).resolve().parents[1] / 'sam'
+LAYER_DIR = SAM_DIR / 'layers' / 'common'
+
+# index のインポート時に参照される設定（AWS には接続しない）
+os.environ.setdefault('DYNAMODB_TABLE', 'test-table')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'ap-northeast-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'test')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'test')
+os.environ.setdefault('CURSOR_SECRET', 'test-cursor-secret')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('TRACING_ENABLED', 'false')
+
+
+def load_function(name):
+    """sam/functions/<name>/index.py を読み込む"""
+    function_dir = SAM_DIR / 'functions' / name
+    for path in (str(LAYER_DIR), str(function_dir)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    spec = importlib.util.spec_from_file_location(f'{name}_index', function_dir / 'index.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def api():
+    return load_function('api')
+
+
+@pytest.fixture
+def processor():
+    return load_function('processor')
@@ -0,0 +1,218 @@
+"""API Lambda のテスト"""
+
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+
+
+class FakeDynamoDB:
+    """テストに必要な操作だけを持つ低レベルクライアント（アイテムはワイヤー形式で保持）"""
+
+    def __init__(self):
+        self.items = {}
+
+    @staticmethod
+    def _key(key):
+        return key['PK']['S'], key['SK']['S']
+
+    def get_item(self, TableName, Key, **kwargs):
+        item = self.items.get(self._key(Key))
+        return {'Item': item} if item is not None else {}
+
+    def put_item(self, TableName, Item, **kwargs):
+        self.items[self._key(Item)] = Item
+        return {}
+
+    def _check_condition(self, Key, values):
+        """条件式は解釈せず、存在確認と If-Match の前提条件だけを評価する"""
+        item = self.items.get(self._key(Key))
+        if item is None:
+            passed = False
+        elif ':expected_version' in values:
+            passed = item.get('Version') == values[':expected_version']
+        elif ':expected_updated_at' in values:
+            passed = 'Version' not in item and item.get('UpdatedAt') == values[':expected_updated_at']
+        else:
+            passed = True
+        if not passed:
+            error = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+            if item is not None:
+                error['Item'] = item
+            raise ClientError(error, 'UpdateItem')
+
+    def update_item(self, TableName, Key, ExpressionAttributeValues, **kwargs):
+        # 更新式は解釈せず、Name の変更と Version の加算だけを反映する
+        self._check_condition(Key, ExpressionAttributeValues)
+        item = dict(self.items[self._key(Key)])
+        if ':name' in ExpressionAttributeValues:
+            item['Name'] = ExpressionAttributeValues[':name']
+        item['Version'] = {'N': str(int(item.get('Version', {'N': '0'})['N']) + 1)}
+        self.items[self._key(Key)] = item
+        return {'Attributes': item}
+
+    def query(self, TableName, ExpressionAttributeValues, ScanIndexForward=True, Limit=None, **kwargs):
+        # PK の一致と SK の前方一致（集計の日別アイテム）のみ
+        pk = ExpressionAttributeValues[':pk']['S']
+        prefix = ExpressionAttributeValues.get(':day_prefix', {'S': ''})['S']
+        items = sorted(
+            (item for (item_pk, item_sk), item in self.items.items() if item_pk == pk and item_sk.startswith(prefix)),
+            key=lambda item: item['SK']['S'],
+            reverse=not ScanIndexForward
+        )
+        return {'Items': items[:Limit]}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        for requests in RequestItems.values():
+            for request in requests:
+                self.put_item(None, request['PutRequest']['Item'])
+        return {}
+
+
+@pytest.fixture
+def dynamodb(api, monkeypatch):
+    client = FakeDynamoDB()
+    monkeypatch.setattr(api, 'USE_LOW_LEVEL_CLIENT', True)
+    monkeypatch.setattr(api, 'get_dynamodb_client', lambda: client)
+    return client
+
+
+def call(api, method, path, body=None, query=None, headers=None):
+    response = request(api, method, path, body, query, headers)
+    return response['statusCode'], json.loads(response['body']) if response.get('body') else None
+
+
+def request(api, method, path, body=None, query=None, headers=None):
+    path_parameters = {'id': path.rsplit('/', 1)[-1]} if path.count('/') > 1 else None
+    return api.lambda_handler({
+        'httpMethod': method,
+        'path': path,
+        'body': json.dumps(body) if body is not None else None,
+        'queryStringParameters': query,
+        'headers': headers or {},
+        'pathParameters': path_parameters,
+    }, None)
+
+
+def assert_no_internal_attributes(api, item):
+    assert not set(item) & api.INTERNAL_ATTRIBUTES, item
+
+
+# ========================================
+# 書き込みレスポンスの属性
+# ========================================
+
+def test_create_item_response_has_no_internal_attributes(api, dynamodb):
+    status, body = call(api, 'POST', '/items', {'name': 'a'})
+
+    assert status == 201
+    assert body['item']['Name'] == 'a'
+    assert_no_internal_attributes(api, body['item'])
+
+
+def test_update_item_response_has_no_internal_attributes(api, dynamodb):
+    _, created = call(api, 'POST', '/items', {'name': 'a'})
+
+    status, body = call(api, 'PUT', f"/items/{created['item']['ItemId']}", {'name': 'b'})
+
+    assert status == 200
+    assert body['item']['Name'] == 'b'
+    assert_no_internal_attributes(api, body['item'])
+
+
+def test_batch_create_items_response_has_no_internal_attributes(api, dynamodb):
+    status, body = call(api, 'POST', '/items:batchCreate', {'items': [{'name': 'a'}, {'name': 'b'}]})
+
+    assert status == 200
+    assert body['created'] == 2
+    for result in body['results']:
+        assert_no_internal_attributes(api, result['item'])
+
+
+# ========================================
+# 集計値
+# ========================================
+
+@pytest.mark.parametrize('days', ['-5', '-1', 'abc'])
+def test_get_item_stats_rejects_invalid_days(api, dynamodb, days):
+    status, body = call(api, 'GET', '/items/stats', query={'days': days})
+
+    assert status == 400
+    assert body['error'] == 'Bad request'
+    assert 'days' in body['message']
+
+
+def test_get_item_stats_returns_recent_days(api, dynamodb):
+    for day, count in (('2026-01-01', 3), ('2026-01-02', 5), ('2026-01-03', 7)):
+        dynamodb.put_item(None, {'PK': {'S': 'STATS#Item'}, 'SK': {'S': f'DAY#{day}'}, 'ItemCount': {'N': str(count)}})
+
+    status, body = call(api, 'GET', '/items/stats', query={'days': '2'})
+
+    assert status == 200
+    assert body['daily'] == [{'date': '2026-01-03', 'count': 7}, {'date': '2026-01-02', 'count': 5}]
+
+
+# ========================================
+# 条件付き更新（If-Match）
+# ========================================
+
+def put_legacy_item(dynamodb, item_id, updated_at):
+    """Version を持たない古いアイテム"""
+    dynamodb.put_item(None, {
+        'PK': {'S': f'ITEM#{item_id}'},
+        'SK': {'S': 'METADATA'},
+        'EntityType': {'S': 'Item'},
+        'ItemId': {'S': item_id},
+        'Name': {'S': 'legacy'},
+        'CreatedAt': {'N': str(updated_at)},
+        'UpdatedAt': {'N': str(updated_at)},
+    })
+
+
+def test_update_legacy_item_with_its_weak_etag(api, dynamodb):
+    put_legacy_item(dynamodb, 'legacy', 1700000000)
+
+    etag = request(api, 'GET', '/items/legacy')['headers']['ETag']
+    assert etag == 'W/"t1700000000"'
+
+    status, body = call(api, 'PUT', '/items/legacy', {'name': 'renamed'}, headers={'If-Match': etag})
+    assert status == 200
+    assert body['item']['Name'] == 'renamed'
+
+    # 更新後は Version が付くため、同じ ETag では更新できない
+    status, body = call(api, 'PUT', '/items/legacy', {'name': 'again'}, headers={'If-Match': etag})
+    assert status == 412
+    assert body['current_version'] == 1
+
+
+def test_update_legacy_item_with_stale_weak_etag(api, dynamodb):
+    put_legacy_item(dynamodb, 'legacy', 1700000000)
+
+    status, body = call(api, 'PUT', '/items/legacy', {'name': 'renamed'}, headers={'If-Match': 'W/"t1600000000"'})
+
+    assert status == 412
+    assert body['error'] == 'Precondition failed'
+
+
+@pytest.mark.parametrize('if_match', ['"abc"', 'W/"tabc"'])
+def test_update_item_rejects_unknown_etag(api, dynamodb, if_match):
+    put_legacy_item(dynamodb, 'legacy', 1700000000)
+
+    status, body = call(api, 'PUT', '/items/legacy', {'name': 'renamed'}, headers={'If-Match': if_match})
+
+    assert status == 400
+    assert 'If-Match' in body['message']
+
+
+def test_update_item_with_version_etag(api, dynamodb):
+    response = request(api, 'POST', '/items', {'name': 'a'})
+    item_id = json.loads(response['body'])['item']['ItemId']
+    etag = response['headers']['ETag']
+
+    status, _ = call(api, 'PUT', f'/items/{item_id}', {'name': 'b'}, headers={'If-Match': etag})
+    assert status == 200
+
+    status, body = call(api, 'PUT', f'/items/{item_id}', {'name': 'c'}, headers={'If-Match': etag})
+    assert status == 412
+    assert body['current_version'] == 2
@@ -0,0 +1,95 @@
+"""Processor Lambda（Streams のバッチ処理）のテスト"""
+
+import json
+import threading
+import time
+
+
+def stream_record(event_name, item_id, sequence_number):
+    image = {
+        'PK': {'S': f'ITEM#{item_id}'},
+        'SK': {'S': 'METADATA'},
+        'EntityType': {'S': 'Item'},
+        'ItemId': {'S': item_id},
+        'Status': {'S': 'active'},
+        'CreatedAt': {'N': '1700000000'},
+    }
+    return {
+        'eventID': f'event-{sequence_number}',
+        'eventName': event_name,
+        'dynamodb': {
+            'SequenceNumber': sequence_number,
+            'Keys': {'PK': image['PK'], 'SK': image['SK']},
+            'NewImage': image,
+            'OldImage': image,
+        },
+    }
+
+
+def emitted_metrics(processor, monkeypatch):
+    """バッファのメトリクスを EMF で書き出し、{メトリクス名: 値} にまとめる"""
+    documents = []
+    monkeypatch.setattr(processor.metrics, 'writer', lambda line: documents.append(json.loads(line)))
+    processor.metrics.flush()
+
+    values = {}
+    for document in documents:
+        for metric in document['_aws']['CloudWatchMetrics'][0]['Metrics']:
+            values[metric['Name']] = document[metric['Name']]
+    return values
+
+
+def join_record_group_workers():
+    for thread in threading.enumerate():
+        if thread.name.startswith('record-group'):
+            thread.join(timeout=5)
+
+
+def test_late_record_group_does_not_emit_metrics(processor, monkeypatch):
+    monkeypatch.setattr(processor, 'IDEMPOTENCY_ENABLED', False)
+    monkeypatch.setattr(processor, 'SEARCH_INDEX_ENABLED', False)
+    monkeypatch.setattr(processor, 'PROCESSOR_CONCURRENCY', 2)
+    monkeypatch.setattr(processor, 'RECORD_TIMEOUT_MS', 0)
+
+    release = threading.Event()
+    process_record = processor.process_record
+
+    def slow_process_record(record, counters, record_metrics=None):
+        if record['dynamodb']['Keys']['PK']['S'] == 'ITEM#slow':
+            release.wait(timeout=5)
+        return process_record(record, counters, record_metrics)
+
+    monkeypatch.setattr(processor, 'process_record', slow_process_record)
+
+    records = [stream_record('INSERT', 'fast', '1'), stream_record('INSERT', 'slow', '2')]
+    outcomes = processor.run_record_groups(
+        records, processor.group_records_by_key(records), time.monotonic() + 0.2
+    )
+
+    # 打ち切り後にワーカーを完了させる
+    release.set()
+    join_record_group_workers()
+
+    assert outcomes[0][0] == 'success'
+    assert outcomes[1] is None
+
+    values = emitted_metrics(processor, monkeypatch)
+    assert values['ItemsCreated'] == 1
+    assert len(values['RecordProcessingTime']) == 1
+
+
+def test_failed_record_metrics_are_emitted(processor, monkeypatch):
+    monkeypatch.setattr(processor, 'IDEMPOTENCY_ENABLED', False)
+
+    def failing_process_record(record, counters, record_metrics=None):
+        raise ValueError('boom')
+
+    monkeypatch.setattr(processor, 'process_record', failing_process_record)
+
+    records = [stream_record('INSERT', 'a', '1')]
+    outcomes = processor.run_record_groups(records, processor.group_records_by_key(records), float('inf'))
+
+    assert outcomes[0][0] == 'failed'
+    values = emitted_metrics(processor, monkeypatch)
+    assert values['ProcessingErrors'] == 1
+    assert len(values['RecordProcessingTime']) == 1